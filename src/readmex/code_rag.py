@@ -15,10 +15,13 @@
 import ast
 import hashlib
 import json
+import os
 import pickle
+import shutil
+import threading
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, astuple
 from collections import defaultdict
 import re
 
@@ -42,13 +45,48 @@ from rich.progress import Progress, SpinnerColumn, TextColumn
 
 # 导入配置模块
 try:
-    from .config import get_embedding_config
+    from .config import get_embedding_config, get_rag_config, get_parallel_parse_threshold
+    from .utils.text_index import BM25Index
+    from .utils.query_engine import BatchedQueryEngine
+    from .utils.web_embedding import WebEmbeddingClient
+    from .utils.batch_encoding import encode_sorted_batches
+    from .utils.dedup import group_duplicate_texts
+    from .utils.context_packer import pack_context
+    from .utils.hash_embedding import HASHING_MODEL_NAME, HashingEmbeddingModel
+    from .utils.embedding_server import DEFAULT_IDLE_TIMEOUT, DEFAULT_PORT as DEFAULT_WORKER_PORT, connect_embedding_worker
+    from .utils.rag_service import RAGServiceClient, connect_rag_service
+    from .utils.source_cache import ParsedSource, SourceCache
+    from .utils.vector_index import build_index, choose_index_strategy, numpy_top_k, benchmark_index_strategies
 except ImportError:
     # 如果是直接运行此文件，使用相对导入
     import sys
     from pathlib import Path
     sys.path.append(str(Path(__file__).parent))
-    from config import get_embedding_config
+    from config import get_embedding_config, get_rag_config, get_parallel_parse_threshold
+    from utils.text_index import BM25Index
+    from utils.query_engine import BatchedQueryEngine
+    from utils.web_embedding import WebEmbeddingClient
+    from utils.batch_encoding import encode_sorted_batches
+    from utils.dedup import group_duplicate_texts
+    from utils.context_packer import pack_context
+    from utils.hash_embedding import HASHING_MODEL_NAME, HashingEmbeddingModel
+    from utils.embedding_server import DEFAULT_IDLE_TIMEOUT, DEFAULT_PORT as DEFAULT_WORKER_PORT, connect_embedding_worker
+    from utils.rag_service import RAGServiceClient, connect_rag_service
+    from utils.source_cache import ParsedSource, SourceCache
+    from utils.vector_index import build_index, choose_index_strategy, numpy_top_k, benchmark_index_strategies
+
+
+# 嵌入缓存格式版本，格式变化时递增以使旧缓存失效
+EMBEDDING_CACHE_VERSION = 2
+
+# 代码块提取结果缓存版本，提取逻辑变化时递增
+CODE_BLOCK_CACHE_VERSION = 1
+
+# 项目根目录下文件所在分片的名称
+ROOT_SHARD = "."
+
+# 上下文中完整形式代码块的最大代码长度
+CONTEXT_CODE_MAX_CHARS = 1500
 
 
 @dataclass
@@ -89,18 +127,276 @@ class CodeRelation:
             self.metadata = {}
 
 
+class CodeBlockExtractor(ast.NodeVisitor):
+    """单文件代码块提取器
+    
+    对每个文件只做一次作用域感知的AST遍历，同时计算代码块、依赖、复杂度、签名和装饰器。
+    每个函数/方法（包括 async 函数和嵌套定义）只生成一个代码块：类体内直接定义的函数
+    为 method，其余为 function。调用和控制流只计入最内层的函数。
+    
+    不依赖CodeRAG实例状态，可以在子进程中独立运行。
+    """
+    
+    def __init__(self):
+        self.code_blocks: Dict[str, CodeBlock] = {}
+        self.file_path = ''
+        self.module_name = ''
+        self.lines: List[str] = []
+        self.source: Optional[ParsedSource] = None
+        # 当前作用域链（ClassDef / FunctionDef / AsyncFunctionDef 节点）
+        self._scope: List[ast.AST] = []
+        # 当前所在函数的统计帧: (依赖dict, 复杂度列表)
+        self._frames: List[Tuple[Dict[str, None], List[int]]] = []
+    
+    def extract_file(self, file_path: Path, module_name: str) -> List[CodeBlock]:
+        """从单个文件提取代码块"""
+        return self.extract_parsed(ParsedSource.from_file(file_path), module_name)
+    
+    def extract_source(self, content: str, file_path: str, module_name: str) -> List[CodeBlock]:
+        """从源码文本提取代码块"""
+        return self.extract_parsed(ParsedSource(file_path, content), module_name)
+    
+    def extract_parsed(self, source: ParsedSource, module_name: str) -> List[CodeBlock]:
+        """从共享的解析结果提取代码块"""
+        self.code_blocks = {}
+        self.file_path = source.path
+        self.module_name = module_name
+        self.lines = source.lines
+        self.source = source
+        self._scope = []
+        self._frames = []
+        
+        self.visit(source.tree)
+        
+        return list(self.code_blocks.values())
+    
+    def _generate_block_id(self, file_path: str, name: str, line_start: int) -> str:
+        """生成代码块唯一ID"""
+        content = f"{file_path}:{name}:{line_start}"
+        return hashlib.md5(content.encode()).hexdigest()[:12]
+    
+    def _source_segment(self, node: ast.AST) -> Tuple[int, int, str]:
+        """获取节点的起止行号和源码"""
+        start_line = node.lineno
+        end_line = getattr(node, 'end_lineno', None) or node.lineno
+        return start_line, end_line, self.source.segment(start_line, end_line)
+    
+    @staticmethod
+    def _unparse_all(nodes: List[ast.AST]) -> List[str]:
+        return [ast.unparse(n) for n in nodes] if hasattr(ast, 'unparse') else []
+    
+    # 导入语句
+    def visit_Import(self, node: ast.AST):
+        """提取导入语句"""
+        import_content = self.lines[node.lineno - 1].strip()
+        
+        block_id = self._generate_block_id(self.file_path, f"import_{node.lineno}", node.lineno)
+        
+        self.code_blocks[block_id] = CodeBlock(
+            id=block_id,
+            type='import',
+            name=import_content,
+            content=import_content,
+            file_path=self.file_path,
+            module=self.module_name,
+            line_start=node.lineno,
+            line_end=node.lineno,
+            metadata={'import_type': 'from' if isinstance(node, ast.ImportFrom) else 'direct'}
+        )
+    
+    visit_ImportFrom = visit_Import
+    
+    # 类定义
+    def visit_ClassDef(self, node: ast.ClassDef):
+        """提取类代码块，并在类作用域内继续遍历"""
+        start_line, end_line, class_content = self._source_segment(node)
+        
+        # 提取方法
+        methods = [n.name for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+        
+        block_id = self._generate_block_id(self.file_path, node.name, start_line)
+        
+        self.code_blocks[block_id] = CodeBlock(
+            id=block_id,
+            type='class',
+            name=node.name,
+            content=class_content,
+            file_path=self.file_path,
+            module=self.module_name,
+            line_start=start_line,
+            line_end=end_line,
+            docstring=ast.get_docstring(node),
+            metadata={
+                'methods': methods,
+                'bases': self._unparse_all(node.bases),
+                'decorators': self._unparse_all(node.decorator_list),
+                'qualname': self._qualname(node.name)
+            }
+        )
+        
+        self._scope.append(node)
+        self.generic_visit(node)
+        self._scope.pop()
+    
+    # 函数 / 方法定义
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        """提取函数或方法代码块，依赖和复杂度在遍历函数体时累计"""
+        start_line, end_line, func_content = self._source_segment(node)
+        
+        parent = self._scope[-1] if self._scope else None
+        is_method = isinstance(parent, ast.ClassDef)
+        name = f"{parent.name}.{node.name}" if is_method else node.name
+        
+        metadata = {
+            'args': [arg.arg for arg in node.args.args],
+            'returns': bool(node.returns),
+            'is_async': isinstance(node, ast.AsyncFunctionDef),
+            'decorators': self._unparse_all(node.decorator_list),
+            'qualname': self._qualname(node.name)
+        }
+        if is_method:
+            metadata = {'class': parent.name, 'method_name': node.name, **metadata}
+        
+        block_id = self._generate_block_id(self.file_path, name, start_line)
+        
+        block = CodeBlock(
+            id=block_id,
+            type='method' if is_method else 'function',
+            name=name,
+            content=func_content,
+            file_path=self.file_path,
+            module=self.module_name,
+            line_start=start_line,
+            line_end=end_line,
+            docstring=ast.get_docstring(node),
+            signature=self._generate_function_signature(node),
+            metadata=metadata
+        )
+        # 先登记代码块，保证外层定义排在嵌套定义之前
+        self.code_blocks[block_id] = block
+        
+        dependencies: Dict[str, None] = {}
+        complexity = [1]  # 基础复杂度
+        self._frames.append((dependencies, complexity))
+        self._scope.append(node)
+        self.generic_visit(node)
+        self._scope.pop()
+        self._frames.pop()
+        
+        block.dependencies = list(dependencies)
+        block.complexity = complexity[0]
+    
+    visit_AsyncFunctionDef = visit_FunctionDef
+    
+    # 依赖（函数调用）
+    def visit_Call(self, node: ast.Call):
+        """记录当前函数调用的其他函数"""
+        if self._frames:
+            dependencies = self._frames[-1][0]
+            if isinstance(node.func, ast.Name):
+                dependencies[node.func.id] = None
+            elif isinstance(node.func, ast.Attribute) and hasattr(ast, 'unparse'):
+                dependencies[ast.unparse(node.func)] = None
+        self.generic_visit(node)
+    
+    # 复杂度: 简化的圈复杂度，基础为1，每个控制流语句+1，每个布尔运算+(操作数-1)
+    # 参考标准: 1-5 简单, 6-10 中等, >10 高复杂度(建议重构)
+    def _visit_branch(self, node: ast.AST):
+        """控制流语句增加1点复杂度"""
+        if self._frames:
+            self._frames[-1][1][0] += 1
+        self.generic_visit(node)
+    
+    visit_If = visit_While = visit_For = visit_AsyncFor = _visit_branch
+    visit_Try = visit_With = visit_AsyncWith = _visit_branch
+    
+    def visit_BoolOp(self, node: ast.BoolOp):
+        """布尔运算增加复杂度，例如: a and b and c 的复杂度为2(操作数数量-1)"""
+        if self._frames:
+            self._frames[-1][1][0] += len(node.values) - 1
+        self.generic_visit(node)
+    
+    def _qualname(self, name: str) -> str:
+        """生成包含外层作用域的限定名"""
+        return '.'.join([scope.name for scope in self._scope] + [name])
+    
+    def _generate_function_signature(self, node: ast.FunctionDef) -> str:
+        """生成函数签名"""
+        args = []
+        
+        # 普通参数
+        for arg in node.args.args:
+            arg_str = arg.arg
+            if arg.annotation:
+                if hasattr(ast, 'unparse'):
+                    arg_str += f": {ast.unparse(arg.annotation)}"
+            args.append(arg_str)
+        
+        # 默认参数
+        defaults = node.args.defaults
+        if defaults:
+            for i, default in enumerate(defaults):
+                arg_index = len(args) - len(defaults) + i
+                if hasattr(ast, 'unparse'):
+                    args[arg_index] += f" = {ast.unparse(default)}"
+        
+        # 返回类型
+        return_annotation = ""
+        if node.returns and hasattr(ast, 'unparse'):
+            return_annotation = f" -> {ast.unparse(node.returns)}"
+        
+        prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+        return f"{prefix} {node.name}({', '.join(args)}){return_annotation}:"
+
+
+def _extract_file_blocks_worker(task: Tuple[str, str]) -> Tuple[List[tuple], Optional[str]]:
+    """进程池任务：提取单个文件的代码块
+    
+    Args:
+        task: (文件路径, 模块名)
+        
+    Returns:
+        Tuple[List[tuple], Optional[str]]: 以元组形式序列化的代码块列表，以及错误信息
+    """
+    file_path, module_name = task
+    try:
+        blocks = CodeBlockExtractor().extract_file(Path(file_path), module_name)
+        return [astuple(block) for block in blocks], None
+    except Exception as e:
+        return [], str(e)
+
+
+def _extract_cached_file_blocks(source_cache: SourceCache, task: Tuple[str, str]) -> Tuple[List[tuple], Optional[str]]:
+    """当前进程内提取单个文件的代码块，复用共享的解析结果"""
+    file_path, module_name = task
+    try:
+        blocks = CodeBlockExtractor().extract_parsed(source_cache.get(file_path), module_name)
+        return [astuple(block) for block in blocks], None
+    except Exception as e:
+        return [], str(e)
+
+
 class CodeRAG:
     """代码RAG系统核心类"""
     
-    def __init__(self, project_dir: str, cache_dir: str = None, model_name: str = None, use_local_embedding: bool = None):
+    def __init__(self, project_dir: str, cache_dir: str = None, model_name: str = None, use_local_embedding: bool = None,
+                 source_cache: SourceCache = None, shard: str = None, console: Console = None,
+                 check_dependencies: bool = True):
         self.project_dir = Path(project_dir)
         self.cache_dir = Path(cache_dir) if cache_dir else self.project_dir / ".rag_cache"
-        self.cache_dir.mkdir(exist_ok=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 分片：只处理项目中的某个顶层目录（ROOT_SHARD 表示项目根目录下的文件）
+        self.shard = shard
+        
+        # 源文件解析缓存（可与WebsiteGenerator共享）
+        self.source_cache = source_cache or SourceCache(self.cache_dir)
         
-        self.console = Console()
+        self.console = console or Console()
         
         # 获取embedding配置
         self.embedding_config = get_embedding_config()
+        self.rag_config = get_rag_config()
         
         # 确定是否使用本地embedding
         if use_local_embedding is not None:
@@ -108,30 +404,64 @@ class CodeRAG:
         else:
             self.use_local_embedding = self.embedding_config.get('local_embedding', True)
         
+        # 内置哈希嵌入后端（无需下载模型）
+        self.use_hashing_embedding = (
+            model_name.startswith(HASHING_MODEL_NAME) if model_name is not None
+            else self.use_local_embedding and self.embedding_config.get('backend') == 'hashing'
+        )
+        
         # 设置模型名称
         if model_name is not None:
             self.model_name = model_name
+        elif self.use_hashing_embedding:
+            self.model_name = self._create_hashing_model().name
         elif self.use_local_embedding:
             self.model_name = "Kwaipilot/OASIS-code-embedding-1.5B"  # 默认本地模型
         else:
             self.model_name = self.embedding_config.get('model_name', 'text-embedding-3-small')
         
         self.embedding_model = None
+        self._web_embedding_client: Optional[WebEmbeddingClient] = None
         self.index = None
+        self.index_strategy: Optional[str] = None
         
         # 数据存储
         self.code_blocks: Dict[str, CodeBlock] = {}
         self.relations: List[CodeRelation] = []
         self.embeddings: Optional[np.ndarray] = None
         self.id_to_index: Dict[str, int] = {}
+        # 每个向量行对应的代码块ID（嵌入文本相同或近似相同的代码块共享一行）
+        self.index_to_ids: List[List[str]] = []
+        
+        # 并发语义检索的微批处理引擎（延迟创建）
+        self.query_engine: Optional[BatchedQueryEngine] = None
+        self._query_engine_lock = threading.Lock()
+        
+        # `readmex rag serve` 常驻服务（使用同一缓存目录时自动发现，延迟连接）
+        self.use_rag_service = self.rag_config.get('service', True)
+        self._rag_service: Optional[RAGServiceClient] = None
+        self._rag_service_checked = False
+        # 并发查询共用一次服务连接；服务失效时只由一个线程回退并重建本地向量索引
+        self._rag_service_lock = threading.RLock()
+        
+        # 文本检索倒排索引（延迟构建，与code_blocks增量同步）
+        self.text_index: Optional[BM25Index] = None
+        self._text_index_synced = False
+        self._text_index_lock = threading.Lock()
         
         # 缓存文件路径
         self.blocks_cache_file = self.cache_dir / "code_blocks.pkl"
+        self.source_manifest_file = self.cache_dir / "source_manifest.json"
         self.relations_cache_file = self.cache_dir / "relations.pkl"
-        self.embeddings_cache_file = self.cache_dir / "embeddings.pkl"
+        self.embeddings_cache_file = self.cache_dir / "embeddings.npy"
+        self.embeddings_meta_file = self.cache_dir / "embeddings_meta.json"
+        self.legacy_embeddings_cache_file = self.cache_dir / "embeddings.pkl"
         self.index_cache_file = self.cache_dir / "faiss_index.bin"
+        self.text_index_cache_file = self.cache_dir / "text_index.pkl"
+        self.hash_embedding_state_file = self.cache_dir / "hash_embedding.npz"
         
-        self._check_dependencies()
+        if check_dependencies:
+            self._check_dependencies()
     
     def _check_dependencies(self):
         """检查依赖包"""
@@ -146,7 +476,10 @@ class CodeRAG:
             
         if missing_deps:
             self.console.print(f"[yellow]警告: 缺少RAG高级功能依赖包: {', '.join(missing_deps)}[/yellow]")
-            self.console.print("[yellow]将使用基础文本匹配模式[/yellow]")
+            if np is None:
+                self.console.print("[yellow]将使用基础文本匹配模式[/yellow]")
+            elif SentenceTransformer is None:
+                self.console.print("[yellow]将使用内置哈希嵌入模型[/yellow]")
             self.console.print("[dim]如需完整RAG功能，请运行: pip install sentence-transformers numpy faiss-cpu[/dim]")
             return False
         return True
@@ -157,6 +490,13 @@ class CodeRAG:
             return True
             
         if self.use_local_embedding:
+            if self.use_hashing_embedding:
+                return self._load_hashing_model()
+            
+            # 优先复用常驻服务中已加载的模型
+            if self.embedding_config.get('worker') and self._connect_embedding_worker():
+                return True
+            
             # 使用本地模型
             if SentenceTransformer is not None:
                 try:
@@ -167,8 +507,8 @@ class CodeRAG:
                     self.console.print(f"[red]加载本地嵌入模型失败: {e}[/red]")
                     return False
             else:
-                self.console.print("[red]缺少sentence-transformers依赖包，无法使用本地embedding模型[/red]")
-                return False
+                self.console.print("[yellow]缺少sentence-transformers依赖包，使用内置哈希嵌入模型[/yellow]")
+                return self._load_hashing_model()
         else:
             # 使用web模型
             try:
@@ -180,10 +520,47 @@ class CodeRAG:
                 self.console.print(f"[red]配置Web嵌入模型失败: {e}[/red]")
                 return False
     
-    def _generate_block_id(self, file_path: str, name: str, line_start: int) -> str:
-        """生成代码块唯一ID"""
-        content = f"{file_path}:{name}:{line_start}"
-        return hashlib.md5(content.encode()).hexdigest()[:12]
+    def _create_hashing_model(self) -> HashingEmbeddingModel:
+        return HashingEmbeddingModel(
+            dimension=self.embedding_config.get('hash_dimension', 512),
+            reduction=self.embedding_config.get('hash_reduction', 'projection')
+        )
+    
+    def _load_hashing_model(self) -> bool:
+        """加载内置哈希嵌入模型，优先恢复与嵌入缓存一起保存的拟合状态"""
+        try:
+            model = self._create_hashing_model()
+            if self.hash_embedding_state_file.exists():
+                try:
+                    saved = HashingEmbeddingModel.load(self.hash_embedding_state_file)
+                    if saved.name == model.name:
+                        model = saved
+                except Exception as e:
+                    self.console.print(f"[yellow]加载哈希嵌入状态失败: {e}[/yellow]")
+        except Exception as e:
+            self.console.print(f"[red]创建哈希嵌入模型失败: {e}[/red]")
+            return False
+        
+        self.embedding_model = model
+        self.model_name = model.name
+        self.use_hashing_embedding = True
+        self.console.print(f"[green]已加载内置哈希嵌入模型: {self.model_name}[/green]")
+        return True
+    
+    def _connect_embedding_worker(self) -> bool:
+        """连接（必要时启动）本地嵌入常驻服务，失败时回退到进程内加载"""
+        client = connect_embedding_worker(
+            self.model_name,
+            port=self.embedding_config.get('worker_port', DEFAULT_WORKER_PORT),
+            idle_timeout=self.embedding_config.get('worker_idle_timeout', DEFAULT_IDLE_TIMEOUT)
+        )
+        if client is None:
+            self.console.print("[yellow]本地嵌入服务不可用，回退到进程内加载模型[/yellow]")
+            return False
+        
+        self.embedding_model = client
+        self.console.print(f"[green]已连接本地嵌入服务: {self.model_name} ({client.base_url})[/green]")
+        return True
     
     def extract_code_blocks(self, force_refresh: bool = False) -> Dict[str, CodeBlock]:
         """提取项目中的所有代码块"""
@@ -193,7 +570,10 @@ class CodeRAG:
         self.console.print("[blue]开始提取代码块...[/blue]")
         self.code_blocks.clear()
         
-        python_files = list(self.project_dir.rglob('*.py'))
+        python_files = self._python_files()
+        tasks = [(str(file_path), self._get_module_name(file_path)) for file_path in python_files]
+        
+        threshold = get_parallel_parse_threshold()
         
         with Progress(
             SpinnerColumn(),
@@ -202,270 +582,32 @@ class CodeRAG:
         ) as progress:
             task = progress.add_task("提取代码块", total=len(python_files))
             
-            for file_path in python_files:
-                try:
-                    self._extract_file_blocks(file_path)
-                    progress.advance(task)
-                except Exception as e:
-                    self.console.print(f"[red]处理文件 {file_path} 时出错: {e}[/red]")
-                    progress.advance(task)
+            # 未变化的文件直接使用缓存结果，其余文件超过阈值时多进程解析
+            results = self.source_cache.map_extract(
+                tasks,
+                key_fn=lambda t: f"code_blocks:{CODE_BLOCK_CACHE_VERSION}:{t[0]}:{t[1]}",
+                local_fn=lambda t: _extract_cached_file_blocks(self.source_cache, t),
+                worker=_extract_file_blocks_worker,
+                threshold=threshold,
+                console=self.console
+            )
+            
+            for (file_path, _), (serialized_blocks, error) in zip(tasks, results):
+                if error is not None:
+                    self.console.print(f"[red]解析文件 {file_path} 失败: {error}[/red]")
+                for values in serialized_blocks:
+                    block = CodeBlock(*values)
+                    self.code_blocks[block.id] = block
+                progress.advance(task)
         
         self._extract_relations()
         self._save_to_cache()
+        self._text_index_synced = False
+        self._ensure_text_index()
         
         self.console.print(f"[green]提取完成，共 {len(self.code_blocks)} 个代码块[/green]")
         return self.code_blocks
     
-    def _extract_file_blocks(self, file_path: Path):
-        """从单个文件提取代码块"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            tree = ast.parse(content)
-            module_name = self._get_module_name(file_path)
-            
-            # 提取导入语句
-            self._extract_imports(tree, file_path, module_name, content)
-            
-            # 提取函数和类
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    self._extract_function_block(node, file_path, module_name, content)
-                elif isinstance(node, ast.ClassDef):
-                    self._extract_class_block(node, file_path, module_name, content)
-                    
-        except Exception as e:
-            self.console.print(f"[red]解析文件 {file_path} 失败: {e}[/red]")
-    
-    def _extract_imports(self, tree: ast.AST, file_path: Path, module_name: str, content: str):
-        """提取导入语句"""
-        lines = content.split('\n')
-        
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.Import, ast.ImportFrom)):
-                import_content = lines[node.lineno - 1].strip()
-                
-                block_id = self._generate_block_id(str(file_path), f"import_{node.lineno}", node.lineno)
-                
-                block = CodeBlock(
-                    id=block_id,
-                    type='import',
-                    name=import_content,
-                    content=import_content,
-                    file_path=str(file_path),
-                    module=module_name,
-                    line_start=node.lineno,
-                    line_end=node.lineno,
-                    metadata={'import_type': 'from' if isinstance(node, ast.ImportFrom) else 'direct'}
-                )
-                
-                self.code_blocks[block_id] = block
-    
-    def _extract_function_block(self, node: ast.FunctionDef, file_path: Path, module_name: str, content: str):
-        """提取函数代码块"""
-        lines = content.split('\n')
-        
-        # 提取函数内容
-        start_line = node.lineno
-        end_line = getattr(node, 'end_lineno', node.lineno)
-        func_content = '\n'.join(lines[start_line-1:end_line])
-        
-        # 提取文档字符串
-        docstring = ast.get_docstring(node)
-        
-        # 生成函数签名
-        signature = self._generate_function_signature(node)
-        
-        # 计算复杂度
-        complexity = self._calculate_complexity(node)
-        
-        # 提取依赖（函数调用）
-        dependencies = self._extract_function_dependencies(node)
-        
-        block_id = self._generate_block_id(str(file_path), node.name, start_line)
-        
-        block = CodeBlock(
-            id=block_id,
-            type='function',
-            name=node.name,
-            content=func_content,
-            file_path=str(file_path),
-            module=module_name,
-            line_start=start_line,
-            line_end=end_line,
-            docstring=docstring,
-            signature=signature,
-            dependencies=dependencies,
-            complexity=complexity,
-            metadata={
-                'args': [arg.arg for arg in node.args.args],
-                'returns': bool(node.returns),
-                'is_async': isinstance(node, ast.AsyncFunctionDef),
-                'decorators': [ast.unparse(d) for d in node.decorator_list] if hasattr(ast, 'unparse') else []
-            }
-        )
-        
-        self.code_blocks[block_id] = block
-    
-    def _extract_class_block(self, node: ast.ClassDef, file_path: Path, module_name: str, content: str):
-        """提取类代码块"""
-        lines = content.split('\n')
-        
-        # 提取类内容
-        start_line = node.lineno
-        end_line = getattr(node, 'end_lineno', node.lineno)
-        class_content = '\n'.join(lines[start_line-1:end_line])
-        
-        # 提取文档字符串
-        docstring = ast.get_docstring(node)
-        
-        # 提取方法
-        methods = [n.name for n in node.body if isinstance(n, ast.FunctionDef)]
-        
-        # 提取基类
-        bases = [ast.unparse(base) for base in node.bases] if hasattr(ast, 'unparse') else []
-        
-        block_id = self._generate_block_id(str(file_path), node.name, start_line)
-        
-        block = CodeBlock(
-            id=block_id,
-            type='class',
-            name=node.name,
-            content=class_content,
-            file_path=str(file_path),
-            module=module_name,
-            line_start=start_line,
-            line_end=end_line,
-            docstring=docstring,
-            metadata={
-                'methods': methods,
-                'bases': bases,
-                'decorators': [ast.unparse(d) for d in node.decorator_list] if hasattr(ast, 'unparse') else []
-            }
-        )
-        
-        self.code_blocks[block_id] = block
-        
-        # 提取类中的方法
-        for method_node in node.body:
-            if isinstance(method_node, ast.FunctionDef):
-                self._extract_method_block(method_node, node.name, file_path, module_name, content)
-    
-    def _extract_method_block(self, node: ast.FunctionDef, class_name: str, file_path: Path, module_name: str, content: str):
-        """提取方法代码块"""
-        lines = content.split('\n')
-        
-        start_line = node.lineno
-        end_line = getattr(node, 'end_lineno', node.lineno)
-        method_content = '\n'.join(lines[start_line-1:end_line])
-        
-        docstring = ast.get_docstring(node)
-        signature = self._generate_function_signature(node)
-        complexity = self._calculate_complexity(node)
-        dependencies = self._extract_function_dependencies(node)
-        
-        block_id = self._generate_block_id(str(file_path), f"{class_name}.{node.name}", start_line)
-        
-        block = CodeBlock(
-            id=block_id,
-            type='method',
-            name=f"{class_name}.{node.name}",
-            content=method_content,
-            file_path=str(file_path),
-            module=module_name,
-            line_start=start_line,
-            line_end=end_line,
-            docstring=docstring,
-            signature=signature,
-            dependencies=dependencies,
-            complexity=complexity,
-            metadata={
-                'class': class_name,
-                'method_name': node.name,
-                'args': [arg.arg for arg in node.args.args],
-                'returns': bool(node.returns),
-                'is_async': isinstance(node, ast.AsyncFunctionDef),
-                'decorators': [ast.unparse(d) for d in node.decorator_list] if hasattr(ast, 'unparse') else []
-            }
-        )
-        
-        self.code_blocks[block_id] = block
-    
-    def _generate_function_signature(self, node: ast.FunctionDef) -> str:
-        """生成函数签名"""
-        args = []
-        
-        # 普通参数
-        for arg in node.args.args:
-            arg_str = arg.arg
-            if arg.annotation:
-                if hasattr(ast, 'unparse'):
-                    arg_str += f": {ast.unparse(arg.annotation)}"
-            args.append(arg_str)
-        
-        # 默认参数
-        defaults = node.args.defaults
-        if defaults:
-            for i, default in enumerate(defaults):
-                arg_index = len(args) - len(defaults) + i
-                if hasattr(ast, 'unparse'):
-                    args[arg_index] += f" = {ast.unparse(default)}"
-        
-        # 返回类型
-        return_annotation = ""
-        if node.returns and hasattr(ast, 'unparse'):
-            return_annotation = f" -> {ast.unparse(node.returns)}"
-        
-        return f"def {node.name}({', '.join(args)}){return_annotation}:"
-    
-    def _extract_function_dependencies(self, node: ast.FunctionDef) -> List[str]:
-        """提取函数依赖（调用的其他函数）"""
-        dependencies = []
-        
-        for child in ast.walk(node):
-            if isinstance(child, ast.Call):
-                if isinstance(child.func, ast.Name):
-                    dependencies.append(child.func.id)
-                elif isinstance(child.func, ast.Attribute):
-                    if hasattr(ast, 'unparse'):
-                        dependencies.append(ast.unparse(child.func))
-        
-        return list(set(dependencies))  # 去重
-    
-    def _calculate_complexity(self, node: ast.FunctionDef) -> int:
-        """计算函数复杂度
-        
-        使用简化的圈复杂度(Cyclomatic Complexity)计算方法，评估代码的复杂程度。
-        复杂度计算标准:
-        - 基础复杂度为1
-        - 每个控制流语句(if/while/for/try/with)增加1点复杂度
-        - 每个布尔运算(and/or)增加相应的复杂度
-        
-        复杂度参考标准:
-        1-5: 简单函数
-        6-10: 中等复杂
-        >10: 高复杂度,建议重构
-        
-        Args:
-            node: AST函数节点
-            
-        Returns:
-            int: 计算出的复杂度分数
-        """
-        complexity = 1  # 基础复杂度
-        
-        for child in ast.walk(node):
-            # 控制流语句增加复杂度
-            if isinstance(child, (ast.If, ast.While, ast.For, ast.Try, ast.With)):
-                complexity += 1
-            # 布尔运算(and/or)增加复杂度
-            elif isinstance(child, ast.BoolOp):
-                # 例如: a and b and c 的复杂度为2(操作数数量-1)
-                complexity += len(child.values) - 1
-        
-        return complexity
-    
     def _extract_relations(self):
         """提取代码块之间的关系"""
         self.relations.clear()
@@ -496,6 +638,25 @@ class CodeRAG:
                         )
                         self.relations.append(relation)
     
+    def _python_files(self) -> List[Path]:
+        """项目（或当前分片）中的Python文件，排序保证串行/并行模式下合并结果一致"""
+        if self.shard is None:
+            return sorted(self.project_dir.rglob('*.py'))
+        if self.shard == ROOT_SHARD:
+            return sorted(self.project_dir.glob('*.py'))
+        return sorted((self.project_dir / self.shard).rglob('*.py'))
+    
+    def _compute_source_fingerprint(self) -> str:
+        """根据文件路径、大小和修改时间计算源文件指纹，用于判断代码块缓存是否过期"""
+        digest = hashlib.md5()
+        for file_path in self._python_files():
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            digest.update(f"{file_path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8', errors='surrogatepass'))
+        return digest.hexdigest()
+    
     def _get_module_name(self, file_path: Path) -> str:
         """获取模块名"""
         try:
@@ -506,50 +667,28 @@ class CodeRAG:
     
     def build_embeddings(self, force_rebuild: bool = False) -> bool:
         """构建代码块的向量嵌入"""
+        if not force_rebuild and self._use_service_index():
+            return True
+        
         if not self._load_embedding_model():
             self.console.print("[yellow]向量嵌入功能不可用，将使用文本匹配模式[/yellow]")
             return False
-            
-        if not force_rebuild and self._load_embeddings_from_cache():
-            return True
         
         if not self.code_blocks:
             self.console.print("[yellow]没有代码块数据，请先运行 extract_code_blocks()[/yellow]")
             return False
         
+        if not force_rebuild and self._load_embeddings_from_cache():
+            return True
+        
         self.console.print("[blue]开始构建向量嵌入...[/blue]")
         
-        # 准备文本数据
-        texts = []
-        block_ids = []
-        
-        for block_id, block in self.code_blocks.items():
-            # 构建用于嵌入的文本
-            text_parts = []
-            
-            # 添加名称和类型
-            text_parts.append(f"Type: {block.type}")
-            text_parts.append(f"Name: {block.name}")
-            
-            # 添加签名（如果有）
-            if block.signature:
-                text_parts.append(f"Signature: {block.signature}")
-            
-            # 添加文档字符串
-            if block.docstring:
-                text_parts.append(f"Documentation: {block.docstring}")
-            
-            # 添加代码内容（截取前500字符）
-            content_preview = block.content[:500] if len(block.content) > 500 else block.content
-            text_parts.append(f"Code: {content_preview}")
-            
-            # 添加依赖信息
-            if block.dependencies:
-                text_parts.append(f"Dependencies: {', '.join(block.dependencies)}")
-            
-            text = "\n".join(text_parts)
-            texts.append(text)
-            block_ids.append(block_id)
+        # 准备文本数据：相同（及近似相同）的嵌入文本只编码一次，向量由组内代码块共享
+        block_ids = list(self.code_blocks.keys())
+        all_texts = [self._build_embedding_text(self.code_blocks[block_id]) for block_id in block_ids]
+        groups = group_duplicate_texts(all_texts, self.rag_config.get('near_duplicate_threshold', 0.0))
+        texts = [all_texts[group[0]] for group in groups]
+        row_block_ids = [[block_ids[i] for i in group] for group in groups]
         
         # 生成嵌入
         try:
@@ -562,18 +701,37 @@ class CodeRAG:
                 TextColumn("[progress.description]{task.description}"),
                 console=self.console
             ) as progress:
-                task = progress.add_task("生成向量嵌入", total=1)
+                task = progress.add_task("生成向量嵌入", total=len(texts))
                 
-                if self.use_local_embedding:
-                    # 使用本地模型
-                    self.embeddings = self.embedding_model.encode(texts, show_progress_bar=False)
+                if isinstance(self.embedding_model, HashingEmbeddingModel):
+                    # 哈希嵌入需要在当前语料上拟合IDF
+                    embeddings = self.embedding_model.fit_transform(texts)
+                elif self.use_local_embedding:
+                    # 使用本地模型：按长度排序分批（减少padding），可多进程编码
+                    embeddings = encode_sorted_batches(
+                        self.embedding_model,
+                        texts,
+                        batch_size=self.embedding_config.get('batch_size', 32),
+                        num_processes=self.embedding_config.get('processes', 1),
+                        progress_callback=lambda done, total: progress.update(task, completed=done),
+                        console=self.console
+                    )
                 else:
-                    # 使用web模型
-                    self.embeddings = self._get_web_embeddings(texts)
-                    
-                self.id_to_index = {block_id: i for i, block_id in enumerate(block_ids)}
+                    # 使用web模型（并发分批请求，中断后重跑时跳过已完成的批次）
+                    embeddings = self._get_web_embeddings(
+                        texts,
+                        resume=True,
+                        progress_callback=lambda done, total: progress.update(
+                            task, description=f"生成向量嵌入 ({done}/{total} 批)"
+                        )
+                    )
                 
-                progress.advance(task)
+                # 归一化向量，使内积等价于余弦相似度
+                self.embeddings = self._normalize_embeddings(embeddings)
+                self._set_id_mapping(row_block_ids)
+                self._reset_query_cache()
+                
+                progress.update(task, completed=len(texts))
             
             # 构建FAISS索引
             if faiss is not None:
@@ -581,6 +739,9 @@ class CodeRAG:
             
             self._save_embeddings_to_cache()
             
+            duplicates = len(block_ids) - len(texts)
+            if duplicates:
+                self.console.print(f"[dim]合并了 {duplicates} 个重复代码块的嵌入[/dim]")
             self.console.print(f"[green]向量嵌入构建完成，共 {len(texts)} 个向量[/green]")
             return True
             
@@ -588,68 +749,143 @@ class CodeRAG:
             self.console.print(f"[red]构建向量嵌入失败: {e}[/red]")
             return False
     
-    def _get_web_embeddings(self, texts: List[str]) -> np.ndarray:
-        """使用web API获取文本嵌入"""
+    def _build_embedding_text(self, block: CodeBlock) -> str:
+        """构建用于嵌入的代码块文本"""
+        text_parts = []
+        
+        # 添加名称和类型
+        text_parts.append(f"Type: {block.type}")
+        text_parts.append(f"Name: {block.name}")
+        
+        # 添加签名（如果有）
+        if block.signature:
+            text_parts.append(f"Signature: {block.signature}")
+        
+        # 添加文档字符串
+        if block.docstring:
+            text_parts.append(f"Documentation: {block.docstring}")
+        
+        # 添加代码内容（截取前500字符）
+        content_preview = block.content[:500] if len(block.content) > 500 else block.content
+        text_parts.append(f"Code: {content_preview}")
+        
+        # 添加依赖信息
+        if block.dependencies:
+            text_parts.append(f"Dependencies: {', '.join(block.dependencies)}")
+        
+        return "\n".join(text_parts)
+    
+    @staticmethod
+    def _normalize_embeddings(embeddings) -> np.ndarray:
+        """L2归一化向量矩阵"""
+        embeddings = np.array(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(1, -1)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.maximum(norms, 1e-12)
+        return embeddings
+    
+    def _compute_blocks_fingerprint(self) -> str:
+        """计算当前代码块集合的指纹（与顺序无关），用于校验嵌入缓存是否过期"""
+        digest = hashlib.md5()
+        for block_id in sorted(self.code_blocks):
+            text = self._build_embedding_text(self.code_blocks[block_id])
+            digest.update(block_id.encode())
+            digest.update(hashlib.md5(text.encode('utf-8', errors='ignore')).digest())
+        return digest.hexdigest()
+    
+    def _set_id_mapping(self, row_block_ids: List[List[str]]):
+        """设置代码块ID与向量行号之间的双向映射"""
+        self.index_to_ids = [list(ids) for ids in row_block_ids]
+        self.id_to_index = {block_id: i for i, ids in enumerate(self.index_to_ids) for block_id in ids}
+    
+    def _get_web_embeddings(self, texts: List[str], resume: bool = False, progress_callback=None) -> np.ndarray:
+        """使用web API获取文本嵌入
+        
+        Args:
+            texts: 文本列表
+            resume: 是否使用批次检查点，构建中断后重跑时跳过已完成的批次
+            progress_callback: 每完成一个批次调用一次 (已完成批次数, 总批次数)
+        """
         try:
-            import requests
-            import json
-            
-            # 获取配置
+            return self._get_web_embedding_client().embed(texts, resume=resume, progress_callback=progress_callback)
+        except Exception as e:
+            self.console.print(f"[red]获取web embedding失败: {e}[/red]")
+            raise
+    
+    def _get_web_embedding_client(self) -> WebEmbeddingClient:
+        """获取复用连接池的web嵌入客户端（延迟创建）"""
+        if self._web_embedding_client is None:
             api_key = self.embedding_config.get('api_key')
-            base_url = self.embedding_config.get('base_url', 'https://api.openai.com/v1')
-            model_name = self.embedding_config.get('model_name', 'text-embedding-3-small')
-            
             if not api_key:
                 raise ValueError("缺少embedding API key")
             
-            # 准备请求
-            url = f"{base_url.rstrip('/')}/embeddings"
-            headers = {
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            embeddings = []
-            
-            # 批量处理文本（避免单次请求过大）
-            batch_size = 100  # 每批处理100个文本
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i:i + batch_size]
-                
-                data = {
-                    'input': batch_texts,
-                    'model': model_name
-                }
-                
-                response = requests.post(url, headers=headers, json=data, timeout=60)
-                response.raise_for_status()
-                
-                result = response.json()
-                
-                # 提取嵌入向量
-                batch_embeddings = [item['embedding'] for item in result['data']]
-                embeddings.extend(batch_embeddings)
-            
-            return np.array(embeddings, dtype=np.float32)
-            
-        except Exception as e:
-            self.console.print(f"[red]获取web embedding失败: {e}[/red]")
-            raise
+            self._web_embedding_client = WebEmbeddingClient(
+                api_key=api_key,
+                base_url=self.embedding_config.get('base_url', 'https://api.openai.com/v1'),
+                model_name=self.embedding_config.get('model_name', 'text-embedding-3-small'),
+                max_concurrency=self.embedding_config.get('concurrency', 4),
+                max_batch_tokens=self.embedding_config.get('batch_tokens', 60000),
+                max_retries=self.embedding_config.get('max_retries', 5),
+                checkpoint_dir=self.cache_dir / "web_embedding_batches"
+            )
+        return self._web_embedding_client
     
     def _build_faiss_index(self):
-        """构建FAISS索引"""
+        """构建FAISS索引，按语料规模或配置选择 flat / hnsw / ivf(+pq)"""
         if self.embeddings is None or faiss is None:
             return
         
-        dimension = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)  # 使用内积相似度
+        strategy = choose_index_strategy(len(self.embeddings), self.rag_config.get('index_type', 'auto'))
+        self.index, self.index_strategy = build_index(
+            self.embeddings,
+            strategy,
+            use_pq=self.rag_config.get('index_pq', False)
+        )
+        
+        if self.index_strategy != 'flat':
+            self.console.print(f"[blue]使用 {self.index_strategy} 向量索引 ({len(self.embeddings)} 个向量)[/blue]")
+    
+    def benchmark_index_strategies(self, top_k: int = 10, num_queries: int = 100) -> List[Dict[str, Any]]:
+        """在项目自身的代码块向量上对比各索引策略与精确检索的召回率和延迟
+        
+        从已有向量中抽样作为查询，结果以表格形式输出。
+        
+        Args:
+            top_k: 召回率计算使用的 k
+            num_queries: 抽样查询数量
+            
+        Returns:
+            List[Dict]: 每个策略的 strategy / build_ms / query_ms / recall
+        """
+        if self.embeddings is None or len(self.embeddings) == 0:
+            self.console.print("[yellow]没有向量嵌入数据，请先运行 build_embeddings()[/yellow]")
+            return []
+        
+        embeddings = self._normalize_embeddings(self.embeddings)
+        
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(embeddings), size=min(num_queries, len(embeddings)), replace=False)
+        results = benchmark_index_strategies(embeddings, embeddings[sample], top_k=top_k)
+        
+        from rich.table import Table
+        table = Table(title=f"向量索引基准测试 ({len(embeddings)} 个向量, {len(sample)} 个查询, top-{top_k})")
+        table.add_column("策略", style="cyan")
+        table.add_column("构建耗时(ms)", justify="right")
+        table.add_column("单次查询(ms)", justify="right")
+        table.add_column(f"Recall@{top_k}", justify="right", style="green")
+        for row in results:
+            table.add_row(row['strategy'], f"{row['build_ms']:.1f}", f"{row['query_ms']:.3f}", f"{row['recall']:.3f}")
+        self.console.print(table)
         
-        # 归一化向量
-        faiss.normalize_L2(self.embeddings)
-        self.index.add(self.embeddings)
+        return results
     
     def semantic_search(self, query: str, top_k: int = 5, min_score: float = 0.3) -> List[Tuple[CodeBlock, float]]:
         """语义搜索相关代码块"""
+        service_results = self._service_search(query, top_k, min_score)
+        if service_results is not None:
+            return service_results
+        
         try:
             # 如果有向量嵌入，使用语义搜索
             if self.embeddings is not None and self._load_embedding_model():
@@ -661,103 +897,171 @@ class CodeRAG:
             self.console.print(f"[yellow]语义搜索失败: {e}，使用文本搜索[/yellow]")
             return self._text_search(query, top_k, min_score)
     
+    def _get_rag_service(self) -> Optional[RAGServiceClient]:
+        """获取常驻RAG服务客户端，服务未运行或与当前项目、模型、源文件不一致时返回None"""
+        if not self.use_rag_service:
+            return None
+        if self._rag_service_checked:
+            return self._rag_service
+        with self._rag_service_lock:
+            if self.use_rag_service and not self._rag_service_checked:
+                self._rag_service = connect_rag_service(
+                    self.cache_dir, self.project_dir, self.model_name, self._compute_source_fingerprint()
+                )
+                self._rag_service_checked = True
+                if self._rag_service is not None:
+                    self.console.print(f"[green]已连接RAG常驻服务: {self._rag_service.base_url}[/green]")
+            return self._rag_service
+    
+    def _use_service_index(self) -> bool:
+        """常驻服务可用时无需在本进程加载模型和向量索引"""
+        if self._get_rag_service() is None:
+            return False
+        self.console.print("[green]使用RAG常驻服务中的向量索引[/green]")
+        return True
+    
+    def _disable_rag_service(self, error: Exception):
+        """服务请求失败后停止使用服务，回退到本进程检索"""
+        with self._rag_service_lock:
+            if self.use_rag_service:
+                self.console.print(f"[yellow]RAG常驻服务请求失败: {error}，回退到本地检索[/yellow]")
+                self.use_rag_service = False
+                self._rag_service = None
+            # 其他线程可能已在等待锁期间完成重建
+            if self.embeddings is None and self.code_blocks:
+                self.build_embeddings()
+    
+    def _service_search(self, query: str, top_k: int, min_score: float) -> Optional[List[Tuple[CodeBlock, float]]]:
+        """通过常驻服务检索，服务不可用时返回None"""
+        service = self._get_rag_service()
+        if service is None:
+            return None
+        try:
+            return [(self._block_from_service(item['block']), item['score'])
+                    for item in service.search(query, top_k, min_score)]
+        except Exception as e:
+            self._disable_rag_service(e)
+            return None
+    
+    def _block_from_service(self, data: Dict[str, Any]) -> CodeBlock:
+        block = self.code_blocks.get(data['id'])
+        return block if block is not None else CodeBlock(**data)
+    
+    def _get_query_engine(self) -> BatchedQueryEngine:
+        """获取微批处理查询引擎"""
+        with self._query_engine_lock:
+            if self.query_engine is None:
+                self.query_engine = BatchedQueryEngine(
+                    encode_fn=self._encode_queries,
+                    search_fn=self._search_vectors
+                )
+            return self.query_engine
+    
+    def _reset_query_cache(self):
+        """向量索引重建或重新加载后（哈希嵌入会重新拟合），缓存的查询向量不再有效"""
+        with self._query_engine_lock:
+            if self.query_engine is not None:
+                self.query_engine.clear_cache()
+    
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """批量生成查询向量"""
+        if self.use_local_embedding:
+            return self.embedding_model.encode(queries, show_progress_bar=False)
+        return self._get_web_embeddings(queries)
+    
+    def _search_vectors(self, query_embeddings: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """批量向量检索，返回 (scores, indices)，形状均为 (查询数, top_k)"""
+        # 检查向量维度是否匹配
+        if query_embeddings.shape[1] != self.embeddings.shape[1]:
+            raise ValueError(f"向量维度不匹配: 查询向量 {query_embeddings.shape[1]}, 索引向量 {self.embeddings.shape[1]}")
+        
+        query_embeddings = self._normalize_embeddings(query_embeddings)
+        
+        if faiss is not None and self.index is not None:
+            # 使用FAISS搜索
+            return self.index.search(query_embeddings, top_k)
+        
+        # 使用numpy计算相似度
+        similarities = np.dot(query_embeddings, self.embeddings.T)
+        return numpy_top_k(similarities, top_k)
+    
     def _vector_search(self, query: str, top_k: int, min_score: float) -> List[Tuple[CodeBlock, float]]:
-        """基于向量的语义搜索"""
+        """基于向量的语义搜索，并发查询会被合并为批量编码和批量检索"""
         try:
-            # 生成查询向量
-            if self.use_local_embedding:
-                query_embedding = self.embedding_model.encode([query])
-            else:
-                query_embedding = self._get_web_embeddings([query])
-            
-            # 检查向量维度是否匹配
-            if self.embeddings is not None and query_embedding.shape[1] != self.embeddings.shape[1]:
-                self.console.print(f"[yellow]向量维度不匹配: 查询向量 {query_embedding.shape[1]}, 索引向量 {self.embeddings.shape[1]}[/yellow]")
-                self.console.print("[yellow]回退到文本搜索模式[/yellow]")
-                return self._text_search(query, top_k, min_score)
-            
-            if faiss is not None and self.index is not None:
-                # 使用FAISS搜索
-                faiss.normalize_L2(query_embedding)
-                scores, indices = self.index.search(query_embedding, top_k)
-                
-                results = []
-                for score, idx in zip(scores[0], indices[0]):
-                    if score >= min_score:
-                        block_id = list(self.id_to_index.keys())[list(self.id_to_index.values()).index(idx)]
-                        block = self.code_blocks[block_id]
-                        results.append((block, float(score)))
-                
-                return results
-            else:
-                # 使用numpy计算相似度
-                similarities = np.dot(self.embeddings, query_embedding.T).flatten()
-                
-                # 获取top_k结果
-                top_indices = np.argsort(similarities)[::-1][:top_k]
-                
-                results = []
-                for idx in top_indices:
-                    score = similarities[idx]
-                    if score >= min_score:
-                        block_id = list(self.id_to_index.keys())[list(self.id_to_index.values()).index(idx)]
-                        block = self.code_blocks[block_id]
-                        results.append((block, float(score)))
-                
-                return results
+            scores, indices = self._get_query_engine().search(query, top_k)
+            return self._collect_vector_results(scores, indices, top_k, min_score)
         except Exception as e:
             self.console.print(f"[yellow]向量搜索失败: {e}，回退到文本搜索[/yellow]")
             return self._text_search(query, top_k, min_score)
     
+    def _collect_vector_results(self, scores, indices, top_k: int, min_score: float) -> List[Tuple[CodeBlock, float]]:
+        """将一个查询的检索结果行号映射为代码块"""
+        results = []
+        for score, idx in zip(scores, indices):
+            # FAISS在结果不足时返回-1
+            if idx < 0 or score < min_score:
+                continue
+            # 共享同一向量的代码块得分相同
+            for block_id in self.index_to_ids[idx]:
+                block = self.code_blocks.get(block_id)
+                if block is not None:
+                    results.append((block, float(score)))
+        
+        return results[:top_k]
+    
     def _text_search(self, query: str, top_k: int, min_score: float = 0.1) -> List[Tuple[CodeBlock, float]]:
-        """基于文本匹配的搜索（备选方案）"""
+        """基于BM25倒排索引的文本搜索（备选方案）"""
         if not self.code_blocks:
             return []
         
-        query_terms = set(query.lower().split())
-        results = []
+        text_index = self._ensure_text_index()
         
-        for block in self.code_blocks.values():
-            # 构建搜索文本
-            search_text = f"{block.name} {block.type} {block.content}"
-            if block.docstring:
-                search_text += f" {block.docstring}"
-            if block.signature:
-                search_text += f" {block.signature}"
-            
-            search_text = search_text.lower()
-            
-            # 计算匹配分数
-            score = 0.0
-            matched_terms = 0
-            
-            for term in query_terms:
-                if term in search_text:
-                    matched_terms += 1
-                    # 名称匹配权重更高
-                    if term in block.name.lower():
-                        score += 0.5
-                    # 文档字符串匹配
-                    elif block.docstring and term in block.docstring.lower():
-                        score += 0.3
-                    # 代码内容匹配
-                    else:
-                        score += 0.1
-            
-            # 计算最终分数（匹配率 * 权重分数）
-            if matched_terms > 0:
-                match_ratio = matched_terms / len(query_terms)
-                final_score = match_ratio * score
-                
-                if final_score >= min_score:
-                    results.append((block, final_score))
+        results = []
+        for block_id, score in text_index.search(query, top_k=top_k, min_score=min_score):
+            block = self.code_blocks.get(block_id)
+            if block is not None:
+                results.append((block, score))
         
-        # 按分数排序并返回top_k
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[:top_k]
+        return results
+    
+    def _block_search_fields(self, block: CodeBlock) -> Dict[str, Optional[str]]:
+        """构建代码块用于文本索引的字段"""
+        return {
+            'name': block.name,
+            'type': block.type,
+            'signature': block.signature,
+            'docstring': block.docstring,
+            'content': block.content,
+        }
+    
+    def _ensure_text_index(self) -> BM25Index:
+        """获取文本索引，必要时从缓存加载并与当前代码块增量同步"""
+        with self._text_index_lock:
+            if self.text_index is not None and self._text_index_synced:
+                return self.text_index
+            
+            if self.text_index is None:
+                self.text_index = self._load_text_index_from_cache() or BM25Index()
+            
+            documents = {
+                block_id: self._block_search_fields(block)
+                for block_id, block in self.code_blocks.items()
+            }
+            if self.text_index.sync(documents):
+                self._save_text_index_to_cache()
+            
+            self._text_index_synced = True
+            return self.text_index
     
     def get_related_blocks(self, block_id: str, relation_types: List[str] = None, max_depth: int = 2) -> List[CodeBlock]:
         """获取与指定代码块相关的其他代码块"""
+        service = self._get_rag_service()
+        if service is not None:
+            try:
+                return [self._block_from_service(data) for data in service.related(block_id, relation_types, max_depth)]
+            except Exception as e:
+                self._disable_rag_service(e)
+        
         if relation_types is None:
             relation_types = ['calls', 'inherits', 'uses']
         
@@ -786,39 +1090,40 @@ class CodeRAG:
         
         return related_blocks
     
-    def generate_enhanced_prompt(self, base_prompt: str, query: str, max_context_blocks: int = 10) -> str:
-        """生成增强的prompt，包含相关代码上下文"""
-        # 搜索相关代码块
-        relevant_blocks = self.semantic_search(query, top_k=max_context_blocks)
+    def generate_enhanced_prompt(self, base_prompt: str, query: str, max_context_blocks: int = 10,
+                                 token_budget: int = None) -> str:
+        """生成增强的prompt，包含相关代码上下文
+        
+        检索结果在token预算内打包：空间不足时只保留签名和文档字符串，
+        优先把预算分配给单位token相关度高的代码块，并去除被其他代码块包含的重复代码。
+        """
+        service = self._get_rag_service()
+        if service is not None:
+            try:
+                return service.prompt(base_prompt, query, max_context_blocks, token_budget)
+            except Exception as e:
+                self._disable_rag_service(e)
+        
+        if token_budget is None:
+            token_budget = self.rag_config.get('context_tokens', 1200)
+        
+        # 多检索一些候选，供打包时按预算挑选
+        relevant_blocks = self.semantic_search(query, top_k=max_context_blocks * 2)
         
         if not relevant_blocks:
             return base_prompt
         
+        packed = pack_context(relevant_blocks, token_budget, self._render_context_block, max_blocks=max_context_blocks)
+        if not packed:
+            return base_prompt
+        
         # 构建上下文信息
         context_parts = []
         context_parts.append("\n=== 相关代码上下文 ===")
         
-        for i, (block, score) in enumerate(relevant_blocks, 1):
-            context_parts.append(f"\n--- 代码块 {i} (相似度: {score:.3f}) ---")
-            context_parts.append(f"类型: {block.type}")
-            context_parts.append(f"名称: {block.name}")
-            context_parts.append(f"文件: {block.file_path}")
-            context_parts.append(f"模块: {block.module}")
-            
-            if block.signature:
-                context_parts.append(f"签名: {block.signature}")
-            
-            if block.docstring:
-                context_parts.append(f"文档: {block.docstring}")
-            
-            # 添加代码内容（限制长度）
-            content = block.content
-            if len(content) > 300:
-                content = content[:300] + "..."
-            context_parts.append(f"代码:\n{content}")
-            
-            if block.dependencies:
-                context_parts.append(f"依赖: {', '.join(block.dependencies)}")
+        for i, item in enumerate(packed, 1):
+            context_parts.append(f"\n--- 代码块 {i} (相似度: {item.score:.3f}) ---")
+            context_parts.append(item.text)
         
         context_parts.append("\n=== 上下文结束 ===\n")
         
@@ -827,6 +1132,33 @@ class CodeRAG:
         
         return enhanced_prompt
     
+    def _render_context_block(self, block: CodeBlock, full: bool) -> str:
+        """渲染上下文中的代码块，full=False 时只包含签名和文档字符串"""
+        parts = [
+            f"类型: {block.type}",
+            f"名称: {block.name}",
+            f"文件: {block.file_path}",
+            f"模块: {block.module}",
+        ]
+        
+        if block.signature:
+            parts.append(f"签名: {block.signature}")
+        
+        if block.docstring:
+            parts.append(f"文档: {block.docstring}")
+        
+        # 没有签名和文档的代码块（如import）精简形式保留首行代码
+        if full or not (block.signature or block.docstring):
+            content = block.content if full else block.content.split('\n', 1)[0]
+            if len(content) > CONTEXT_CODE_MAX_CHARS:
+                content = content[:CONTEXT_CODE_MAX_CHARS] + "..."
+            parts.append(f"代码:\n{content}")
+        
+        if block.dependencies:
+            parts.append(f"依赖: {', '.join(block.dependencies)}")
+        
+        return "\n".join(parts)
+    
     def get_code_statistics(self) -> Dict[str, Any]:
         """获取代码统计信息"""
         if not self.code_blocks:
@@ -873,6 +1205,9 @@ class CodeRAG:
             
             with open(self.relations_cache_file, 'wb') as f:
                 pickle.dump(self.relations, f)
+            
+            with open(self.source_manifest_file, 'w', encoding='utf-8') as f:
+                json.dump({'fingerprint': self._compute_source_fingerprint()}, f)
                 
         except Exception as e:
             self.console.print(f"[yellow]保存缓存失败: {e}[/yellow]")
@@ -881,12 +1216,18 @@ class CodeRAG:
         """从缓存加载数据"""
         try:
             if self.blocks_cache_file.exists() and self.relations_cache_file.exists():
+                if not self._source_manifest_matches():
+                    self.console.print("[yellow]源文件已变化，重新提取代码块[/yellow]")
+                    return False
+                
                 with open(self.blocks_cache_file, 'rb') as f:
                     self.code_blocks = pickle.load(f)
                 
                 with open(self.relations_cache_file, 'rb') as f:
                     self.relations = pickle.load(f)
                 
+                self._text_index_synced = False
+                
                 self.console.print(f"[green]从缓存加载了 {len(self.code_blocks)} 个代码块[/green]")
                 return True
         except Exception as e:
@@ -894,55 +1235,164 @@ class CodeRAG:
         
         return False
     
+    def _source_manifest_matches(self) -> bool:
+        if not self.source_manifest_file.exists():
+            return False
+        try:
+            with open(self.source_manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('fingerprint') == self._compute_source_fingerprint()
+        except (OSError, ValueError):
+            return False
+    
     def _save_embeddings_to_cache(self):
-        """保存嵌入向量到缓存"""
+        """保存嵌入向量到缓存
+        
+        向量以原始 .npy 格式保存（可选float16），加载时通过mmap直接映射，
+        元数据头记录模型名称、维度和代码块指纹，用于判断缓存是否失效。
+        """
         try:
-            cache_data = {
-                'embeddings': self.embeddings,
-                'id_to_index': self.id_to_index
-            }
+            dtype = np.float16 if self.rag_config.get('embedding_dtype') == 'float16' else np.float32
             
-            with open(self.embeddings_cache_file, 'wb') as f:
-                pickle.dump(cache_data, f)
+            # 先写向量再写元数据，元数据作为缓存完整性的提交标记
+            if self.embeddings_meta_file.exists():
+                self.embeddings_meta_file.unlink()
+            
+            tmp_file = self.embeddings_cache_file.with_suffix('.npy.tmp')
+            with open(tmp_file, 'wb') as f:
+                np.save(f, np.ascontiguousarray(self.embeddings, dtype=dtype))
+            os.replace(tmp_file, self.embeddings_cache_file)
             
             if self.index is not None and faiss is not None:
                 faiss.write_index(self.index, str(self.index_cache_file))
+            elif self.index_cache_file.exists():
+                self.index_cache_file.unlink()
+            
+            meta = {
+                'version': EMBEDDING_CACHE_VERSION,
+                'model_name': self.model_name,
+                'backend': self._embedding_backend_name(),
+                'dimension': int(self.embeddings.shape[1]),
+                'count': int(self.embeddings.shape[0]),
+                'dtype': np.dtype(dtype).name,
+                'fingerprint': self._compute_blocks_fingerprint(),
+                'index_strategy': self.index_strategy if self.index is not None else None,
+                'block_ids': self.index_to_ids,
+            }
+            with open(self.embeddings_meta_file, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            
+            if isinstance(self.embedding_model, HashingEmbeddingModel):
+                self.embedding_model.save(self.hash_embedding_state_file)
+            
+            # 清理旧版pickle缓存
+            if self.legacy_embeddings_cache_file.exists():
+                self.legacy_embeddings_cache_file.unlink()
                 
         except Exception as e:
             self.console.print(f"[yellow]保存嵌入缓存失败: {e}[/yellow]")
     
+    def _embedding_backend_name(self) -> str:
+        if self.use_hashing_embedding:
+            return 'hashing'
+        return 'local' if self.use_local_embedding else 'web'
+    
     def _load_embeddings_from_cache(self) -> bool:
-        """从缓存加载嵌入向量"""
+        """从缓存加载嵌入向量（mmap映射，不读入内存）
+        
+        模型、版本或代码块指纹不一致时视为缓存失效，返回False以触发重建。
+        """
         try:
-            if self.embeddings_cache_file.exists():
-                with open(self.embeddings_cache_file, 'rb') as f:
-                    cache_data = pickle.load(f)
-                
-                self.embeddings = cache_data['embeddings']
-                self.id_to_index = cache_data['id_to_index']
-                
-                # 加载FAISS索引
-                if self.index_cache_file.exists() and faiss is not None:
-                    self.index = faiss.read_index(str(self.index_cache_file))
-                
-                self.console.print(f"[green]从缓存加载了 {len(self.embeddings)} 个向量嵌入[/green]")
-                return True
+            if not (self.embeddings_meta_file.exists() and self.embeddings_cache_file.exists()):
+                return False
+            
+            with open(self.embeddings_meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            
+            if meta.get('version') != EMBEDDING_CACHE_VERSION:
+                self.console.print("[yellow]嵌入缓存格式已更新，重新构建向量嵌入[/yellow]")
+                return False
+            
+            if meta.get('model_name') != self.model_name:
+                self.console.print(f"[yellow]嵌入模型已变更 ({meta.get('model_name')} -> {self.model_name})，重新构建向量嵌入[/yellow]")
+                return False
+            
+            if meta.get('fingerprint') != self._compute_blocks_fingerprint():
+                self.console.print("[yellow]代码块已变化，重新构建向量嵌入[/yellow]")
+                return False
+            
+            # 哈希嵌入的查询向量依赖构建时拟合的IDF
+            if isinstance(self.embedding_model, HashingEmbeddingModel) and not self.embedding_model.is_fitted:
+                return False
+            
+            embeddings = np.load(self.embeddings_cache_file, mmap_mode='r')
+            if embeddings.shape != (meta.get('count'), meta.get('dimension')):
+                self.console.print("[yellow]嵌入缓存与元数据不一致，重新构建向量嵌入[/yellow]")
+                return False
+            
+            self.embeddings = embeddings
+            self._set_id_mapping(meta['block_ids'])
+            self._reset_query_cache()
+            
+            # 加载FAISS索引
+            self.index = None
+            self.index_strategy = None
+            if meta.get('index_strategy') and self.index_cache_file.exists() and faiss is not None:
+                self.index = self._read_faiss_index()
+                self.index_strategy = meta['index_strategy']
+            
+            self.console.print(f"[green]从缓存加载了 {len(self.embeddings)} 个向量嵌入[/green]")
+            return True
         except Exception as e:
             self.console.print(f"[yellow]加载嵌入缓存失败: {e}[/yellow]")
         
         return False
     
+    def _read_faiss_index(self):
+        """读取FAISS索引，优先使用mmap方式"""
+        try:
+            return faiss.read_index(str(self.index_cache_file), faiss.IO_FLAG_MMAP)
+        except Exception:
+            return faiss.read_index(str(self.index_cache_file))
+    
+    def _save_text_index_to_cache(self):
+        """保存文本索引到缓存"""
+        try:
+            self.text_index.save(self.text_index_cache_file)
+        except Exception as e:
+            self.console.print(f"[yellow]保存文本索引缓存失败: {e}[/yellow]")
+    
+    def _load_text_index_from_cache(self) -> Optional[BM25Index]:
+        """从缓存加载文本索引"""
+        try:
+            if self.text_index_cache_file.exists():
+                return BM25Index.load(self.text_index_cache_file)
+        except Exception as e:
+            self.console.print(f"[yellow]加载文本索引缓存失败: {e}[/yellow]")
+        
+        return None
+    
     def clear_cache(self):
         """清除所有缓存"""
         cache_files = [
             self.blocks_cache_file,
+            self.source_manifest_file,
             self.relations_cache_file,
             self.embeddings_cache_file,
-            self.index_cache_file
+            self.embeddings_meta_file,
+            self.legacy_embeddings_cache_file,
+            self.index_cache_file,
+            self.text_index_cache_file,
+            self.hash_embedding_state_file
         ]
         
+        self.source_cache.clear()
+        shutil.rmtree(self.cache_dir / "web_embedding_batches", ignore_errors=True)
+        
         for cache_file in cache_files:
             if cache_file.exists():
                 cache_file.unlink()
         
+        self.text_index = None
+        self._text_index_synced = False
+        
         self.console.print("[green]缓存已清除[/green]")
\ No newline at end of file
@@ -58,7 +58,34 @@ def load_config() -> Dict[str, str]:
         "EMBEDDING_BASE_URL": "embedding_base_url",
         "EMBEDDING_MODEL_NAME": "embedding_model_name",
         "LOCAL_EMBEDDING": "local_embedding",
+        "EMBEDDING_BACKEND": "embedding_backend",
+        "EMBEDDING_BATCH_SIZE": "embedding_batch_size",
+        "EMBEDDING_PROCESSES": "embedding_processes",
+        "EMBEDDING_CONCURRENCY": "embedding_concurrency",
+        "EMBEDDING_BATCH_TOKENS": "embedding_batch_tokens",
+        "EMBEDDING_MAX_RETRIES": "embedding_max_retries",
+        "HASH_EMBEDDING_DIM": "hash_embedding_dim",
+        "HASH_EMBEDDING_REDUCTION": "hash_embedding_reduction",
+        "EMBEDDING_WORKER": "embedding_worker",
+        "EMBEDDING_WORKER_PORT": "embedding_worker_port",
+        "EMBEDDING_WORKER_IDLE_TIMEOUT": "embedding_worker_idle_timeout",
         "MAX_WORKERS": "max_workers",
+        "PARALLEL_PARSE_THRESHOLD": "parallel_parse_threshold",
+        "RAG_INDEX_TYPE": "rag_index_type",
+        "RAG_INDEX_PQ": "rag_index_pq",
+        "RAG_EMBEDDING_DTYPE": "rag_embedding_dtype",
+        "RAG_NEAR_DUPLICATE_THRESHOLD": "rag_near_duplicate_threshold",
+        "RAG_CONTEXT_TOKENS": "rag_context_tokens",
+        "RAG_SHARDING": "rag_sharding",
+        "RAG_SHARD_MIN_FILES": "rag_shard_min_files",
+        "RAG_SERVICE": "rag_service",
+        "RAG_SERVICE_PORT": "rag_service_port",
+        "API_DOCS_BATCHING": "api_docs_batching",
+        "API_DOCS_BATCH_TOKENS": "api_docs_batch_tokens",
+        "API_DOCS_BATCH_SIZE": "api_docs_batch_size",
+        "ASSET_WEBP": "asset_webp",
+        "ARCHITECTURE_DIAGRAM": "architecture_diagram",
+        "ARCHITECTURE_DIAGRAM_LABELS": "architecture_diagram_labels",
         "GITHUB_USERNAME": "github_username",
         "TWITTER_HANDLE": "twitter_handle",
         "LINKEDIN_USERNAME": "linkedin_username",
@@ -187,7 +214,7 @@ def get_t2i_config() -> Dict[str, Union[str, int, float]]:
     }
 
 
-def get_embedding_config() -> Dict[str, Union[str, bool]]:
+def get_embedding_config() -> Dict[str, Union[str, bool, int]]:
     """获取embedding模型配置"""
     config = load_config()
     return {
@@ -195,6 +222,80 @@ def get_embedding_config() -> Dict[str, Union[str, bool]]:
         "base_url": config.get("embedding_base_url", "https://api.openai.com/v1"),
         "api_key": config.get("embedding_api_key"),
         "local_embedding": config.get("local_embedding", "true").lower() == "true",
+        # 本地模型编码的批大小与进程数（>1 时多进程编码）
+        "batch_size": _get_int(config, "embedding_batch_size", 32),
+        "processes": _get_int(config, "embedding_processes", 1),
+        # Web嵌入API的并发数、单批估算token上限和重试次数
+        "concurrency": _get_int(config, "embedding_concurrency", 4),
+        "batch_tokens": _get_int(config, "embedding_batch_tokens", 60000),
+        "max_retries": _get_int(config, "embedding_max_retries", 5),
+        # 嵌入后端："hashing" 使用内置的哈希 n-gram TF-IDF 嵌入（无需下载模型）
+        "backend": str(config.get("embedding_backend", "")).lower(),
+        "hash_dimension": _get_int(config, "hash_embedding_dim", 512),
+        "hash_reduction": str(config.get("hash_embedding_reduction", "projection")).lower(),
+        # 本地模型常驻服务（跨进程复用已加载的模型）
+        "worker": str(config.get("embedding_worker", "false")).lower() == "true",
+        "worker_port": _get_int(config, "embedding_worker_port", 8765),
+        "worker_idle_timeout": _get_int(config, "embedding_worker_idle_timeout", 600),
+    }
+
+
+def _get_int(config: Dict[str, str], key: str, default: int) -> int:
+    try:
+        return int(config.get(key, default))
+    except (ValueError, TypeError):
+        return default
+
+
+def _get_float(config: Dict[str, str], key: str, default: float) -> float:
+    try:
+        return float(config.get(key, default))
+    except (ValueError, TypeError):
+        return default
+
+
+def get_rag_config() -> Dict[str, Union[str, bool, int, float]]:
+    """获取RAG检索相关配置"""
+    config = load_config()
+    return {
+        "index_type": str(config.get("rag_index_type", "auto")).lower(),
+        "index_pq": str(config.get("rag_index_pq", "false")).lower() == "true",
+        "embedding_dtype": str(config.get("rag_embedding_dtype", "float32")).lower(),
+        # MinHash近似重复合并的Jaccard阈值（0 表示只合并完全相同的嵌入文本）
+        "near_duplicate_threshold": _get_float(config, "rag_near_duplicate_threshold", 0.0),
+        # 增强prompt中代码上下文的token预算
+        "context_tokens": _get_int(config, "rag_context_tokens", 1200),
+        # 按顶层目录分片索引：off / on / auto（Python文件数达到阈值时分片）
+        "sharding": str(config.get("rag_sharding", "off")).lower(),
+        "shard_min_files": _get_int(config, "rag_shard_min_files", 1000),
+        # 运行中的 `readmex rag serve` 常驻服务可用时，检索请求交给服务处理
+        "service": str(config.get("rag_service", "true")).lower() != "false",
+        "service_port": _get_int(config, "rag_service_port", 8766),
+    }
+
+
+def get_api_docs_config() -> Dict[str, Union[bool, int]]:
+    """获取API文档生成相关配置"""
+    config = load_config()
+    return {
+        # 按模块批量生成：同一模块的多个API在一次模型请求中生成文档
+        "batching": str(config.get("api_docs_batching", "true")).lower() != "false",
+        # 每个批次中API定义与上下文的token预算
+        "batch_tokens": _get_int(config, "api_docs_batch_tokens", 6000),
+        # 每个批次最多包含的API数（限制单次回复的长度）
+        "batch_size": _get_int(config, "api_docs_batch_size", 8),
+    }
+
+
+def get_architecture_diagram_config() -> Dict[str, Union[bool, str]]:
+    """获取架构图生成相关配置"""
+    config = load_config()
+    mode = str(config.get("architecture_diagram", "local")).lower()
+    return {
+        # local：根据模块导入关系在本地生成；llm：由模型生成完整的 draw.io XML
+        "mode": mode if mode in ("local", "llm") else "local",
+        # 本地生成时是否请求模型为每个节点生成简短说明
+        "llm_labels": str(config.get("architecture_diagram_labels", "false")).lower() == "true",
     }
 
 
@@ -207,6 +308,21 @@ def get_max_workers() -> int:
         return 10
 
 
+def get_asset_webp() -> bool:
+    """是否为网站中缩放后的图片额外输出WebP格式"""
+    config = load_config()
+    return str(config.get("asset_webp", "false")).lower() == "true"
+
+
+def get_parallel_parse_threshold() -> int:
+    """获取启用多进程AST解析的文件数阈值（<=0 表示禁用）"""
+    config = load_config()
+    try:
+        return int(config.get("parallel_parse_threshold", "200"))
+    except (ValueError, TypeError):
+        return 200
+
+
 # Keep original default configurations for use by other modules
 DEFAULT_IGNORE_PATTERNS = [
     ".git",
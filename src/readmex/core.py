@@ -1,7 +1,6 @@
 import os
 import json
 import re
-import subprocess
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
 from rich.console import Console
@@ -14,8 +13,10 @@ from readmex.utils.file_handler import (
     load_gitignore_patterns,
 )
 from readmex.utils.dependency_analyzer import DependencyAnalyzer
+from readmex.utils.dependency_manifests import DependencyManifestEngine
 from readmex.utils.logo_generator import generate_logo
 from readmex.utils.language_analyzer import LanguageAnalyzer
+from readmex.utils.git_repo import get_remote_url
 from readmex.config import load_config
 
 from readmex.config import (
@@ -27,10 +28,11 @@ from readmex.config import (
 
 
 class readmex:
-    def __init__(self, project_dir=None, silent=False, debug=False):
-        self.model_client = ModelClient(
+    def __init__(self, project_dir=None, silent=False, debug=False, model_client=None):
+        # 可复用调用方已创建的模型客户端（如网站生成器），否则使用高质量、高分辨率图像生成
+        self.model_client = model_client or ModelClient(
             quality="hd", image_size="1024x1024"
-        )  # 确保使用高质量、高分辨率图像生成
+        )
         self.console = Console()
         self.project_dir = project_dir  # 初始化时设置项目目录
         self.output_dir = None  # 输出目录将在 _get_basic_info 中设置
@@ -85,45 +87,8 @@ class readmex:
         if not self.config["readme_language"]:
             self.config["readme_language"] = "en"
 
-        # Auto-generate project description if empty
-        if not self.config["project_description"]:
-            if self.debug:
-                self.config["project_description"] = "A software project with various components and functionality (debug mode)."
-                self.console.print("[yellow]✔ Project description (debug mode): Using default description[/yellow]")
-            else:
-                self.config["project_description"] = self._generate_project_description(
-                    structure, dependencies, descriptions
-                )
-        
-        # Auto-generate entry file if empty
-        if not self.config["entry_file"]:
-            if self.debug:
-                self.config["entry_file"] = "main.py"
-                self.console.print("[yellow]✔ Entry file (debug mode): main.py[/yellow]")
-            else:
-                self.config["entry_file"] = self._generate_entry_file(
-                    structure, dependencies, descriptions
-                )
-        
-        # Auto-generate key features if empty
-        if not self.config["key_features"]:
-            if self.debug:
-                self.config["key_features"] = "Core functionality, Easy to use, Well documented"
-                self.console.print("[yellow]✔ Key features (debug mode): Using default features[/yellow]")
-            else:
-                self.config["key_features"] = self._generate_key_features(
-                    structure, dependencies, descriptions
-                )
-        
-        # Auto-generate additional info if empty
-        if not self.config["additional_info"]:
-            if self.debug:
-                self.config["additional_info"] = "Additional project information will be available in production mode."
-                self.console.print("[yellow]✔ Additional info (debug mode): Using default info[/yellow]")
-            else:
-                self.config["additional_info"] = self._generate_additional_info(
-                    structure, dependencies, descriptions
-                )
+        # Auto-generate missing project meta fields
+        self._generate_missing_meta_fields(structure, dependencies, descriptions)
         
         # Generate logo
         if self.debug:
@@ -513,17 +478,10 @@ class readmex:
         # Try to get repo info from git remote first (more reliable)
         repo_name_from_git = None
         try:
-            # Use git remote get-url origin command
-            result = subprocess.run(
-                ["git", "remote", "get-url", "origin"],
-                cwd=self.project_dir,
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
+            # Read .git/config directly, falling back to `git remote get-url origin`
+            remote_url = get_remote_url(self.project_dir)
 
-            if result.returncode == 0:
-                remote_url = result.stdout.strip()
+            if remote_url:
                 self.console.print(f"[cyan]Found git remote: {remote_url}[/cyan]")
 
                 # Parse GitHub URL (supports both HTTPS and SSH)
@@ -551,14 +509,8 @@ class readmex:
                         f"[yellow]Remote URL is not a GitHub repository: {remote_url}[/yellow]"
                     )
             else:
-                self.console.print(
-                    f"[yellow]Could not get git remote: {result.stderr.strip()}[/yellow]"
-                )
+                self.console.print("[yellow]Could not get git remote: no 'origin' remote configured[/yellow]")
 
-        except subprocess.TimeoutExpired:
-            self.console.print("[yellow]Git command timed out[/yellow]")
-        except FileNotFoundError:
-            self.console.print("[yellow]Git command not found[/yellow]")
         except Exception as e:
             self.console.print(f"[yellow]Could not get git remote: {e}[/yellow]")
 
@@ -657,12 +609,20 @@ class readmex:
     def _get_project_dependencies(self):
         """Use DependencyAnalyzer to analyze project dependencies"""
         
+        # Manifest parse results are cached by content hash next to the generated files
+        manifest_engine = DependencyManifestEngine(
+            self.project_dir,
+            os.path.join(self.output_dir, ".dependency_cache.json") if self.output_dir else None,
+            console=self.console
+        )
+
         # Create dependency analyzer instance with primary language
         dependency_analyzer = DependencyAnalyzer(
             project_dir=self.project_dir,
             primary_language=self.primary_language,
             model_client=self.model_client,
-            console=self.console
+            console=self.console,
+            manifest_engine=manifest_engine
         )
         
         # Analyze project dependencies and return result
@@ -831,6 +791,52 @@ class readmex:
         )
         return descriptions_json
 
+    def _generate_missing_meta_fields(self, structure, dependencies, descriptions, scheduler=None):
+        """
+        Fill in empty project meta fields (description, entry file, key features,
+        additional info). The LLM calls are independent and run concurrently,
+        as tasks of ``scheduler`` (a TaskScheduler) when one is given.
+        """
+        debug_defaults = {
+            "project_description": "A software project with various components and functionality (debug mode).",
+            "entry_file": "main.py",
+            "key_features": "Core functionality, Easy to use, Well documented",
+            "additional_info": "Additional project information will be available in production mode.",
+        }
+        generators = {
+            "project_description": self._generate_project_description,
+            "entry_file": self._generate_entry_file,
+            "key_features": self._generate_key_features,
+            "additional_info": self._generate_additional_info,
+        }
+        missing = [key for key in generators if not self.config[key]]
+        if not missing:
+            return
+
+        if self.debug:
+            for key in missing:
+                self.config[key] = debug_defaults[key]
+                self.console.print(f"[yellow]✔ {key} (debug mode): {debug_defaults[key]}[/yellow]")
+            return
+
+        if scheduler is not None:
+            tasks = {
+                key: scheduler.submit(f"home:{key}", generators[key], structure, dependencies, descriptions)
+                for key in missing
+            }
+            scheduler.wait(tasks.values())
+            for key, task in tasks.items():
+                self.config[key] = task.result()
+            return
+
+        with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+            futures = {
+                executor.submit(generators[key], structure, dependencies, descriptions): key
+                for key in missing
+            }
+            for future in as_completed(futures):
+                self.config[futures[future]] = future.result()
+
     def _generate_project_description(self, structure, dependencies, descriptions):
         """
         Auto-generate project description based on project analysis
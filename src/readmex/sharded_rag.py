@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片代码RAG模块
+
+大型单仓库（monorepo）中按顶层包/目录把代码划分为多个分片，每个分片拥有独立的
+代码块缓存、嵌入缓存和向量索引：
+- 只有文件发生变化的分片需要重新提取和重建嵌入
+- 查询并行分发到各分片，结果按相似度合并
+
+代码关系（调用、继承）在分片内部提取，跨分片的关系不会被记录。
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from rich.console import Console
+
+from readmex.code_rag import CodeRAG, CodeBlock, ROOT_SHARD
+from readmex.config import get_max_workers, get_rag_config
+from readmex.utils.hash_embedding import HashingEmbeddingModel
+from readmex.utils.source_cache import SourceCache
+
+
+def discover_shards(project_dir: Path) -> List[str]:
+    """按顶层目录划分分片：包含Python文件的每个顶层目录一个分片，根目录下的文件单独一个分片"""
+    project_dir = Path(project_dir)
+    shards = []
+    if any(project_dir.glob('*.py')):
+        shards.append(ROOT_SHARD)
+    for child in sorted(project_dir.iterdir()):
+        if child.is_dir() and any(child.rglob('*.py')):
+            shards.append(child.name)
+    return shards
+
+
+def create_code_rag(project_dir: str, cache_dir: str = None, model_name: str = None,
+                    use_local_embedding: bool = None, source_cache: SourceCache = None) -> CodeRAG:
+    """根据 RAG_SHARDING 配置创建单索引或分片的代码RAG系统
+
+    RAG_SHARDING 取值：off（默认）/ on / auto（Python文件数达到 RAG_SHARD_MIN_FILES 时分片）
+    """
+    rag_config = get_rag_config()
+    mode = rag_config.get('sharding', 'off')
+
+    use_shards = mode == 'on'
+    if mode == 'auto':
+        min_files = rag_config.get('shard_min_files', 1000)
+        use_shards = sum(1 for _ in zip(range(min_files), Path(project_dir).rglob('*.py'))) >= min_files
+
+    if use_shards and len(discover_shards(Path(project_dir))) > 1:
+        return ShardedCodeRAG(project_dir, cache_dir, model_name, use_local_embedding, source_cache)
+    return CodeRAG(project_dir, cache_dir, model_name, use_local_embedding, source_cache)
+
+
+class ShardedCodeRAG(CodeRAG):
+    """按顶层目录分片的代码RAG系统，接口与 CodeRAG 一致
+
+    Args:
+        shards: 分片名称列表，默认由 discover_shards 自动发现
+        max_workers: 并行查询分片的线程数
+    """
+
+    def __init__(self, project_dir: str, cache_dir: str = None, model_name: str = None,
+                 use_local_embedding: bool = None, source_cache: SourceCache = None,
+                 shards: List[str] = None, max_workers: int = None, console: Console = None):
+        super().__init__(project_dir, cache_dir, model_name, use_local_embedding, source_cache, console=console)
+
+        shard_names = shards if shards is not None else discover_shards(self.project_dir)
+        self.shards: Dict[str, CodeRAG] = {
+            name: CodeRAG(
+                str(self.project_dir),
+                cache_dir=str(self.cache_dir / "shards" / _shard_cache_name(name)),
+                model_name=model_name,
+                use_local_embedding=use_local_embedding,
+                source_cache=self.source_cache,
+                shard=name,
+                console=self.console,
+                check_dependencies=False
+            )
+            for name in shard_names
+        }
+        # 常驻服务面向整个项目，分片本身不单独连接服务
+        for shard_rag in self.shards.values():
+            shard_rag.use_rag_service = False
+
+        self.max_workers = max(1, min(len(self.shards), max_workers or get_max_workers()))
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def extract_code_blocks(self, force_refresh: bool = False) -> Dict[str, CodeBlock]:
+        """逐个分片提取代码块，未变化的分片直接使用缓存"""
+        self.code_blocks = {}
+        self.relations = []
+        for shard in self.shards.values():
+            self.code_blocks.update(shard.extract_code_blocks(force_refresh))
+            self.relations.extend(shard.relations)
+
+        self.text_index = None
+        self._text_index_synced = False
+        self.console.print(f"[green]{len(self.shards)} 个分片共 {len(self.code_blocks)} 个代码块[/green]")
+        return self.code_blocks
+
+    def build_embeddings(self, force_rebuild: bool = False) -> bool:
+        """逐个分片构建嵌入，嵌入缓存仍有效的分片不会重建"""
+        if not force_rebuild and self._use_service_index():
+            return True
+        
+        if not self._load_embedding_model():
+            self.console.print("[yellow]向量嵌入功能不可用，将使用文本匹配模式[/yellow]")
+            return False
+
+        built = False
+        for shard in self.shards.values():
+            if not shard.code_blocks:
+                continue
+            self._share_embedding_model(shard)
+            built = shard.build_embeddings(force_rebuild) or built
+        self._reset_query_cache()
+        return built
+
+    def semantic_search(self, query: str, top_k: int = 5, min_score: float = 0.3) -> List[Tuple[CodeBlock, float]]:
+        """并行查询各分片，按相似度合并结果"""
+        service_results = self._service_search(query, top_k, min_score)
+        if service_results is not None:
+            return service_results
+        
+        shards = [shard for shard in self.shards.values() if shard.code_blocks]
+        if not shards:
+            return []
+
+        # 共享的嵌入模型只需编码一次查询
+        query_embedding = None
+        if (self.embedding_model is not None and self._uses_shared_model()
+                and any(shard.embeddings is not None for shard in shards)):
+            try:
+                query_embedding = self._get_query_engine().encode([query])
+            except Exception as e:
+                self.console.print(f"[yellow]查询编码失败: {e}，各分片独立检索[/yellow]")
+
+        def search_shard(shard: CodeRAG) -> List[Tuple[CodeBlock, float]]:
+            if query_embedding is not None and shard.embeddings is not None:
+                try:
+                    scores, indices = shard._search_vectors(query_embedding, top_k)
+                    return shard._collect_vector_results(scores[0], indices[0], top_k, min_score)
+                except Exception as e:
+                    self.console.print(f"[yellow]分片向量搜索失败: {e}，回退到文本搜索[/yellow]")
+            return shard.semantic_search(query, top_k, min_score)
+
+        if len(shards) == 1:
+            results = search_shard(shards[0])
+        else:
+            results = [item for shard_results in self._get_executor().map(search_shard, shards)
+                       for item in shard_results]
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:top_k]
+
+    def clear_cache(self):
+        """清除所有分片的缓存"""
+        for shard in self.shards.values():
+            shard.clear_cache()
+        super().clear_cache()
+
+    def _uses_shared_model(self) -> bool:
+        # 哈希嵌入的IDF按分片语料拟合，各分片的向量空间不同，不能共享
+        return not isinstance(self.embedding_model, HashingEmbeddingModel)
+
+    def _share_embedding_model(self, shard: CodeRAG):
+        """已加载的嵌入模型（或web客户端）在分片间共享，避免重复加载"""
+        if not self._uses_shared_model():
+            return
+        shard.embedding_model = self.embedding_model
+        shard.model_name = self.model_name
+        shard.use_local_embedding = self.use_local_embedding
+        if not self.use_local_embedding:
+            shard._web_embedding_client = self._get_web_embedding_client()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rag-shard")
+        return self._executor
+
+
+def _shard_cache_name(name: str) -> str:
+    if name == ROOT_SHARD:
+        return "_root"
+    return re.sub(r'[^\w.-]', '_', name)
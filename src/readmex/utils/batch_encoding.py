@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地嵌入模型的分批编码工具
+
+代码块文本长短差异很大（单行getter到数百字符的预览），按原顺序编码时同一批次内
+会产生大量padding。这里先按长度排序再分批，使每批文本长度接近；可选通过
+sentence-transformers 的多进程池在多个CPU核上并行编码；每完成一批回调一次进度，
+最后按原始顺序还原结果。
+"""
+
+from typing import Callable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def encode_sorted_batches(model, texts: List[str], batch_size: int = 32, num_processes: int = 1,
+                          progress_callback: Optional[Callable[[int, int], None]] = None,
+                          console=None) -> "np.ndarray":
+    """按长度排序分批编码文本，返回与 texts 顺序一致的向量矩阵
+
+    Args:
+        model: 提供 encode(texts, batch_size=..., show_progress_bar=...) 的模型
+        texts: 文本列表
+        batch_size: 单批文本数
+        num_processes: 编码进程数，>1 时使用 sentence-transformers 多进程池
+        progress_callback: 每完成一批调用一次 (已编码文本数, 总文本数)
+        console: 可选的rich Console，用于输出回退提示
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    batch_size = max(1, batch_size)
+    # 长文本在前：显存/内存不足会尽早暴露，且与 sentence-transformers 内部排序一致
+    order = np.argsort([-len(text) for text in texts], kind='stable')
+    sorted_texts = [texts[i] for i in order]
+
+    pool = None
+    if num_processes > 1 and hasattr(model, 'start_multi_process_pool'):
+        try:
+            pool = model.start_multi_process_pool(target_devices=['cpu'] * num_processes)
+        except Exception as e:
+            if console is not None:
+                console.print(f"[yellow]启动多进程编码失败，使用单进程编码: {e}[/yellow]")
+
+    # 多进程时每个分段包含每个进程若干批，兼顾并行度与进度粒度
+    chunk = batch_size * num_processes * 4 if pool is not None else batch_size
+
+    parts = []
+    try:
+        for start in range(0, len(sorted_texts), chunk):
+            segment = sorted_texts[start:start + chunk]
+            if pool is not None:
+                part = model.encode_multi_process(segment, pool, batch_size=batch_size)
+            else:
+                part = model.encode(segment, batch_size=batch_size, show_progress_bar=False)
+            parts.append(np.asarray(part, dtype=np.float32))
+            if progress_callback is not None:
+                progress_callback(min(start + chunk, len(sorted_texts)), len(sorted_texts))
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+
+    sorted_embeddings = np.concatenate(parts, axis=0)
+    embeddings = np.empty_like(sorted_embeddings)
+    embeddings[order] = sorted_embeddings
+    return embeddings
@@ -22,9 +22,14 @@ def main():
     readmex command line entry point
     Support both command line arguments and interactive interface
     """
+    # `readmex rag serve ...` 子命令
+    if sys.argv[1:3] == ["rag", "serve"]:
+        _handle_rag_serve(sys.argv[3:])
+        return
+
     parser = argparse.ArgumentParser(
         description="readmex - AI-driven README documentation generator",
-        epilog="Examples:\n  readmex                    # Interactive mode\n  readmex .                  # Generate for current directory\n  readmex ./my-project       # Generate for specific directory\n  readmex --website          # Generate MkDocs website\n  readmex --website --serve  # Generate and serve website",
+        epilog="Examples:\n  readmex                    # Interactive mode\n  readmex rag serve .        # Keep the RAG index warm for repeated builds\n  readmex .                  # Generate for current directory\n  readmex ./my-project       # Generate for specific directory\n  readmex --website          # Generate MkDocs website\n  readmex --website --serve  # Generate and serve website",
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     parser.add_argument(
@@ -47,6 +52,11 @@ def main():
         action="store_true",
         help="Deploy website to GitHub Pages (requires --website)"
     )
+    parser.add_argument(
+        "--rag-benchmark",
+        action="store_true",
+        help="Benchmark vector index strategies (recall/latency vs exact search) on the project's code blocks"
+    )
     parser.add_argument(
         "--version", 
         action="version", 
@@ -93,7 +103,10 @@ def main():
                 console.print(f"[bold red]Error: Project path '{project_path}' is not a valid directory.[/bold red]")
                 return
 
-        if args.website:
+        if args.rag_benchmark:
+            # RAG向量索引基准测试
+            _handle_rag_benchmark(project_path, console)
+        elif args.website:
             # 网站生成模式
             _handle_website_generation(args, project_path, console)
         elif args.serve:
@@ -153,6 +166,66 @@ def main():
             pass  # Don't show config info if there's an error loading it
 
 
+def _handle_rag_benchmark(project_path: str, console: Console) -> None:
+    """在项目代码块上运行向量索引基准测试"""
+    from readmex.code_rag import CodeRAG
+    
+    # 与网站生成共用RAG缓存目录
+    cache_dir = Path(project_path) / "website" / ".rag_cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    code_rag = CodeRAG(project_path, cache_dir=str(cache_dir))
+    code_rag.extract_code_blocks()
+    if not code_rag.build_embeddings():
+        console.print("[red]无法构建向量嵌入，跳过基准测试[/red]")
+        return
+    
+    code_rag.benchmark_index_strategies()
+
+
+def _handle_rag_serve(argv) -> None:
+    """启动常驻RAG查询服务，网站生成等使用同一缓存目录的进程会自动使用它"""
+    from readmex.config import get_rag_config
+    from readmex.sharded_rag import create_code_rag
+    from readmex.utils.rag_service import DEFAULT_HOST, RAGServer
+    
+    parser = argparse.ArgumentParser(
+        prog="readmex rag serve",
+        description="Keep the project's RAG index, code graph and embedding model warm in one process"
+    )
+    parser.add_argument("project_path", nargs="?", default=".", help="Path of project (default: current directory)")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Listen address (default: localhost only)")
+    parser.add_argument("--port", type=int, default=get_rag_config().get("service_port", 8766), help="Listen port")
+    parser.add_argument("--idle-timeout", type=float, default=0, help="Exit after this many idle seconds (0: never)")
+    args = parser.parse_args(argv)
+    
+    console = Console()
+    project_path = os.path.abspath(args.project_path)
+    if not os.path.isdir(project_path):
+        console.print(f"[bold red]Error: Project path '{project_path}' is not a valid directory.[/bold red]")
+        return
+    
+    # 与网站生成共用RAG缓存目录，服务状态文件也写在这里
+    cache_dir = Path(project_path) / "website" / ".rag_cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    code_rag = create_code_rag(project_path, cache_dir=str(cache_dir))
+    try:
+        server = RAGServer(code_rag, host=args.host, port=args.port, idle_timeout=args.idle_timeout)
+    except OSError as e:
+        console.print(f"[red]无法监听 {args.host}:{args.port}: {e}[/red]")
+        return
+    
+    server.prepare()
+    if not server.vector_ready:
+        console.print("[yellow]向量索引不可用，服务将使用文本检索[/yellow]")
+    console.print(f"[green]RAG服务已启动: {server.base_url}（{len(code_rag.code_blocks)} 个代码块），按 Ctrl+C 停止[/green]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[yellow]RAG服务已停止[/yellow]")
+
+
 def _handle_serve_only(project_path: str, console: Console) -> None:
     """处理仅启动服务功能"""
     try:
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RAG上下文打包模块
+
+在token预算内为prompt挑选检索到的代码块：
+1. 先按相关度为每个代码块放入精简形式（签名+文档字符串）
+2. 再按“相关度 / 额外token”从高到低把代码块升级为包含源码的完整形式
+3. 完整形式的代码块已包含其内部的代码块（如类包含其方法）时，移除被包含的代码块
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from readmex.utils.web_embedding import estimate_tokens
+
+# 每个代码块标题行等固定开销的估算token数
+BLOCK_OVERHEAD_TOKENS = 16
+
+
+@dataclass
+class PackedBlock:
+    """打包结果中的单个代码块"""
+    block: Any
+    score: float
+    full: bool
+    text: str
+    tokens: int
+
+
+def contains(outer: Any, inner: Any) -> bool:
+    """outer 的源码范围是否包含 inner"""
+    return (
+        outer is not inner
+        and outer.file_path == inner.file_path
+        and outer.line_start <= inner.line_start
+        and inner.line_end <= outer.line_end
+        and (outer.line_start, outer.line_end) != (inner.line_start, inner.line_end)
+    )
+
+
+def pack_context(candidates: List[Tuple[Any, float]], token_budget: int,
+                 render: Callable[[Any, bool], str], max_blocks: int = None) -> List[PackedBlock]:
+    """在token预算内选择代码块及其呈现形式
+
+    Args:
+        candidates: (代码块, 相关度) 列表
+        token_budget: 上下文token预算
+        render: render(block, full) 返回代码块的文本，full=False 为精简形式
+        max_blocks: 最多选择的代码块数
+
+    Returns:
+        List[PackedBlock]: 按相关度降序排列的打包结果
+    """
+    candidates = sorted(candidates, key=lambda item: item[1], reverse=True)
+    selected: Dict[int, PackedBlock] = {}
+    remaining = token_budget
+
+    def make(block, score, full) -> PackedBlock:
+        text = render(block, full)
+        return PackedBlock(block, score, full, text, estimate_tokens(text) + BLOCK_OVERHEAD_TOKENS)
+
+    # 第一轮：按相关度放入精简形式
+    for rank, (block, score) in enumerate(candidates):
+        if max_blocks is not None and len(selected) >= max_blocks:
+            break
+        packed = make(block, score, full=False)
+        if packed.tokens <= remaining:
+            selected[rank] = packed
+            remaining -= packed.tokens
+
+    # 第二轮：按单位token相关度升级为完整形式，被完整代码块包含的代码块随之移除
+    upgrades = []
+    for rank, packed in selected.items():
+        full = make(packed.block, packed.score, full=True)
+        if full.text != packed.text:
+            upgrades.append((rank, full))
+
+    def density(item) -> float:
+        rank, full = item
+        return full.score / max(1, full.tokens - selected[rank].tokens)
+
+    for rank, full in sorted(upgrades, key=density, reverse=True):
+        if rank not in selected:
+            continue
+        # 已有完整形式的代码块包含它时无需升级
+        if any(packed.full and contains(packed.block, full.block) for packed in selected.values()):
+            continue
+        covered = [other for other, packed in selected.items() if contains(full.block, packed.block)]
+
+        extra = full.tokens - selected[rank].tokens - sum(selected[other].tokens for other in covered)
+        if extra > remaining:
+            continue
+
+        for other in covered:
+            del selected[other]
+        selected[rank] = full
+        remaining -= extra
+
+    return [selected[rank] for rank in sorted(selected)]
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+嵌入文本去重模块
+
+生成代码、vendored副本和样板代码（如大量相同的 __init__ 或协议桩）会产生完全相同
+或几乎相同的嵌入文本。这里先按规范化文本的哈希合并完全相同的文本，再可选地用
+MinHash + LSH 分桶合并近似重复的文本，每组只需编码一次。
+"""
+
+import hashlib
+import re
+import zlib
+from typing import Dict, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'\w+')
+
+# MinHash 参数：64个哈希函数，分为16个band，每个band 4行
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+SHINGLE_SIZE = 3
+
+
+def normalize_text(text: str) -> str:
+    """规范化空白字符，忽略缩进与换行差异"""
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def group_duplicate_texts(texts: List[str], near_duplicate_threshold: float = 0.0) -> List[List[int]]:
+    """将相同（及近似相同）的文本分组
+
+    Args:
+        texts: 文本列表
+        near_duplicate_threshold: MinHash估算的Jaccard相似度阈值，<=0 时只合并完全相同的文本
+
+    Returns:
+        List[List[int]]: 每组的文本下标，组内第一个为代表文本；分组按首次出现的顺序排列
+    """
+    groups: List[List[int]] = []
+    group_of: Dict[str, int] = {}
+    for i, text in enumerate(texts):
+        key = hashlib.sha1(normalize_text(text).encode('utf-8', errors='surrogatepass')).hexdigest()
+        if key in group_of:
+            groups[group_of[key]].append(i)
+        else:
+            group_of[key] = len(groups)
+            groups.append([i])
+
+    if near_duplicate_threshold <= 0 or len(groups) < 2 or np is None:
+        return groups
+
+    representatives = [texts[group[0]] for group in groups]
+    parents = _cluster_near_duplicates(representatives, near_duplicate_threshold)
+
+    merged: Dict[int, List[int]] = {}
+    for g, group in enumerate(groups):
+        merged.setdefault(parents[g], []).extend(group)
+    return [sorted(members) for members in merged.values()]
+
+
+def minhash_signatures(texts: List[str], seed: int = 1) -> "np.ndarray":
+    """计算文本的MinHash签名矩阵 (len(texts), NUM_PERMUTATIONS)"""
+    rng = np.random.default_rng(seed)
+    # multiply-shift 哈希族：h(x) = (a * x + b) >> 32，a 为奇数
+    a = rng.integers(1, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64)
+
+    signatures = np.full((len(texts), NUM_PERMUTATIONS), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, text in enumerate(texts):
+        shingles = _shingle_hashes(text)
+        if len(shingles):
+            hashed = (a[:, None] * shingles[None, :] + b[:, None]) >> np.uint64(32)
+            signatures[i] = hashed.min(axis=1)
+    return signatures
+
+
+def _shingle_hashes(text: str) -> "np.ndarray":
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {' '.join(words)} if words else set()
+    else:
+        shingles = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def _cluster_near_duplicates(texts: List[str], threshold: float) -> List[int]:
+    """LSH分桶找候选对，估算相似度达到阈值的文本用并查集合并，返回每个文本所属簇的根"""
+    signatures = minhash_signatures(texts)
+    parents = list(range(len(texts)))
+
+    def find(x: int) -> int:
+        while parents[x] != x:
+            parents[x] = parents[parents[x]]
+            x = parents[x]
+        return x
+
+    rows = NUM_PERMUTATIONS // NUM_BANDS
+    for band in range(NUM_BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        band_signatures = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i, row in enumerate(band_signatures):
+            buckets.setdefault(row.tobytes(), []).append(i)
+
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            first = members[0]
+            for other in members[1:]:
+                root_first, root_other = find(first), find(other)
+                if root_first == root_other:
+                    continue
+                similarity = float(np.mean(signatures[first] == signatures[other]))
+                if similarity >= threshold:
+                    # 以较早出现的文本作为簇的根
+                    parents[max(root_first, root_other)] = min(root_first, root_other)
+
+    return [find(i) for i in range(len(texts))]
@@ -7,12 +7,14 @@ from rich.console import Console
 from readmex.utils.file_handler import find_files, load_gitignore_patterns
 from readmex.config import DEFAULT_IGNORE_PATTERNS
 from readmex.utils.model_client import ModelClient
+from readmex.utils.dependency_manifests import DependencyManifestEngine, LOCK_MANIFESTS
 
 
 class DependencyAnalyzer:
     """Multi-language project dependency analyzer class"""
     
-    def __init__(self, project_dir: str, primary_language: str = "python", model_client=None, console=None):
+    def __init__(self, project_dir: str, primary_language: str = "python", model_client=None, console=None,
+                 manifest_engine: DependencyManifestEngine = None):
         """
         Initialize dependency analyzer
         
@@ -21,12 +23,15 @@ class DependencyAnalyzer:
             primary_language: Primary programming language of the project
             model_client: Model client for generating dependency files
             console: Rich console object for output
+            manifest_engine: Shared dependency manifest engine (created on demand if not provided)
         """
         self.project_dir = project_dir
         # 安全处理可能为 None 的 primary_language 参数
         self.primary_language = (primary_language or "python").lower()
         self.model_client = model_client
         self.console = console or Console()
+        # Manifests are discovered with one scan; parsed results are cached by content hash
+        self.manifest_engine = manifest_engine or DependencyManifestEngine(project_dir, console=self.console)
         
         # Load dependency configuration
         self.config = self._load_dependency_config()
@@ -169,16 +174,20 @@ class DependencyAnalyzer:
         lang_config = self.config["languages"][self.primary_language]
         existing_content = ""
         
-        for dep_file in lang_config["dependency_files"]:
-            dep_path = os.path.join(self.project_dir, dep_file)
-            if os.path.exists(dep_path):
-                try:
-                    with open(dep_path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                        if content.strip():
-                            existing_content += f"\n=== {dep_file} ===\n{content}\n"
-                except Exception as e:
-                    self.console.print(f"[yellow]Warning: Could not read {dep_file}: {e}[/yellow]")
+        # Entries may be glob patterns such as *.csproj
+        dep_files = [name for pattern in lang_config["dependency_files"] for name in self.manifest_engine.find(pattern)]
+        manifests = self.manifest_engine.parse(dep_files)
+        for dep_file in dep_files:
+            manifest = manifests.get(dep_file)
+            if manifest is None:
+                self.console.print(f"[yellow]Warning: Could not read {dep_file}[/yellow]")
+                continue
+            if dep_file in LOCK_MANIFESTS and manifest.dependencies:
+                # Large lockfiles are summarized by their locked package names
+                packages = "\n".join(sorted(set(manifest.dependencies)))
+                existing_content += f"\n=== {dep_file} ({len(manifest.dependencies)} locked packages) ===\n{packages}\n"
+            elif manifest.content.strip():
+                existing_content += f"\n=== {dep_file} ===\n{manifest.content}\n"
         
         return existing_content.strip()
 
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+依赖清单解析模块
+
+README生成（DependencyAnalyzer）和网站生成（WebsiteGenerator）共用的依赖清单引擎：
+- 一次扫描项目根目录发现所有依赖清单
+- 按清单内容的SHA-256缓存解析结果（进程内共享，可选持久化），未变化的大型锁文件不再重新解析
+- 需要解析的清单较大时分发到进程池并行解析
+"""
+
+import configparser
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from readmex.utils.parallel import map_in_processes
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# 解析结果的缓存版本，解析逻辑变化时递增
+MANIFEST_CACHE_VERSION = 1
+
+# 待解析清单的总大小达到该值（字节）时使用进程池
+PARALLEL_MANIFEST_BYTES = 1024 * 1024
+
+# 各生态的依赖清单，按优先级排列
+PYTHON_MANIFESTS = ('pyproject.toml', 'requirements.txt', 'setup.py', 'Pipfile', 'setup.cfg', 'environment.yml',
+                    'poetry.lock')
+NPM_MANIFESTS = ('package.json', 'package-lock.json', 'yarn.lock')
+OTHER_MANIFESTS = ('go.mod', 'Cargo.toml', 'pom.xml', 'Gemfile', 'composer.json')
+
+# 锁文件：用于提示词时以解析出的包名代替完整内容
+LOCK_MANIFESTS = ('poetry.lock', 'package-lock.json', 'yarn.lock')
+
+_NAME_SPLIT_RE = re.compile(r'[>=<!=\[\s]')
+
+
+def parse_requirements_txt(content: str) -> List[str]:
+    """解析requirements.txt文件"""
+    deps = []
+    for line in content.splitlines():
+        line = line.strip()
+        # 跳过注释、空行和-r/-e选项
+        if not line or line.startswith('#') or line.startswith('-'):
+            continue
+        # 处理git+https://等URL依赖
+        if line.startswith('git+') or line.startswith('http'):
+            # 尝试从URL中提取包名
+            if '#egg=' not in line:
+                continue
+            pkg_name = line.split('#egg=')[1].split('&')[0]
+        else:
+            # 提取包名（去除版本号和额外选项）
+            pkg_name = _NAME_SPLIT_RE.split(line)[0].strip()
+        if pkg_name and pkg_name not in deps:
+            deps.append(pkg_name)
+    return deps
+
+
+def parse_pyproject_toml(content: str) -> List[str]:
+    """解析pyproject.toml文件"""
+    if tomllib is None:
+        # 如果没有TOML解析库，尝试简单解析
+        return _parse_toml_fallback(content)
+
+    data = tomllib.loads(content)
+    deps = []
+    # 从project.dependencies中提取
+    for dep in data.get('project', {}).get('dependencies', []):
+        pkg_name = _NAME_SPLIT_RE.split(dep)[0].strip()
+        if pkg_name:
+            deps.append(pkg_name)
+    # 从tool.poetry.dependencies中提取（Poetry格式），排除python版本要求
+    poetry_deps = data.get('tool', {}).get('poetry', {}).get('dependencies', {})
+    deps.extend(pkg_name for pkg_name in poetry_deps if pkg_name != 'python')
+    return deps
+
+
+def _parse_toml_fallback(content: str) -> List[str]:
+    """TOML文件的fallback解析方法"""
+    deps = []
+    deps_patterns = [
+        r'dependencies\s*=\s*\[(.*?)\]',
+        r'\[tool\.poetry\.dependencies\](.*?)(?=\[|$)'
+    ]
+    for pattern in deps_patterns:
+        for match in re.findall(pattern, content, re.DOTALL):
+            # 提取引号内的依赖
+            for dep in re.findall(r'["\']([^"\'><=!\[]+)', match):
+                if dep and dep != 'python':
+                    deps.append(dep)
+    return deps
+
+
+def parse_setup_py(content: str) -> List[str]:
+    """解析setup.py文件中的install_requires"""
+    install_requires_match = re.search(r'install_requires\s*=\s*\[(.*?)\]', content, re.DOTALL)
+    if not install_requires_match:
+        return []
+    return re.findall(r'["\']([^"\'><=!\[]+)', install_requires_match.group(1))
+
+
+def parse_pipfile(content: str) -> List[str]:
+    """解析Pipfile文件中的packages和dev-packages"""
+    deps = []
+    if tomllib is not None:
+        data = tomllib.loads(content)
+        for section in ['packages', 'dev-packages']:
+            deps.extend(data.get(section, {}).keys())
+        return deps
+
+    sections = re.findall(r'\[(packages|dev-packages)\](.*?)(?=\[|$)', content, re.DOTALL)
+    for _, section_content in sections:
+        deps.extend(re.findall(r'^([a-zA-Z0-9_-]+)\s*=', section_content, re.MULTILINE))
+    return deps
+
+
+def parse_setup_cfg(content: str) -> List[str]:
+    """解析setup.cfg文件中的install_requires"""
+    deps = []
+    try:
+        config = configparser.ConfigParser()
+        config.read_string(content)
+        if 'options' in config and 'install_requires' in config['options']:
+            for line in config['options']['install_requires'].split('\n'):
+                pkg_name = _NAME_SPLIT_RE.split(line.strip())[0].strip()
+                if pkg_name:
+                    deps.append(pkg_name)
+    except Exception:
+        pass
+    return deps
+
+
+def parse_conda_env(content: str) -> List[str]:
+    """解析conda environment.yml文件"""
+    deps = []
+    if yaml is None:
+        return deps
+    try:
+        data = yaml.safe_load(content)
+        for dep in data.get('dependencies', []):
+            # 跳过conda-forge等channel信息
+            if isinstance(dep, str) and '::' not in dep:
+                pkg_name = re.split(r'[>=<!=\s]', dep)[0].strip()
+                if pkg_name:
+                    deps.append(pkg_name)
+    except Exception:
+        pass
+    return deps
+
+
+def parse_poetry_lock(content: str) -> List[str]:
+    """解析poetry.lock文件中锁定的包"""
+    if tomllib is None:
+        return []
+    try:
+        data = tomllib.loads(content)
+    except Exception:
+        return []
+    return [package['name'] for package in data.get('package', []) if 'name' in package]
+
+
+def parse_package_json(content: str) -> List[str]:
+    """解析package.json文件"""
+    data = json.loads(content)
+    deps = []
+    for dep_type in ['dependencies', 'devDependencies', 'peerDependencies', 'optionalDependencies']:
+        if dep_type in data:
+            deps.extend(data[dep_type].keys())
+    return deps
+
+
+def parse_package_lock(content: str) -> List[str]:
+    """解析package-lock.json文件"""
+    data = json.loads(content)
+    if 'dependencies' in data:
+        return list(data['dependencies'].keys())
+    # npm v7+ 格式
+    return [pkg_path.replace('node_modules/', '') for pkg_path in data.get('packages', {})
+            if pkg_path.startswith('node_modules/')]
+
+
+def parse_yarn_lock(content: str) -> List[str]:
+    """解析yarn.lock文件，格式: "package-name@version":"""
+    deps = set()
+    for pattern in [r'^"?([a-zA-Z0-9@/_-]+)@', r'^([a-zA-Z0-9@/_-]+)@']:
+        for match in re.findall(pattern, content, re.MULTILINE):
+            pkg_name = match.split('@')[0] if '@' in match else match
+            if pkg_name and not pkg_name.startswith('.'):
+                deps.add(pkg_name)
+    return sorted(deps)
+
+
+def parse_go_mod(content: str) -> List[str]:
+    """解析go.mod文件中的require"""
+    deps = []
+    require_match = re.search(r'require\s*\(([^)]+)\)', content, re.DOTALL)
+    if require_match:
+        deps.extend(re.findall(r'([a-zA-Z0-9./\\-_]+)\s+v[0-9.]+', require_match.group(1)))
+    # 单行require
+    deps.extend(re.findall(r'require\s+([a-zA-Z0-9./\\-_]+)\s+v[0-9.]+', content))
+    return deps
+
+
+def parse_cargo_toml(content: str) -> List[str]:
+    """解析Cargo.toml文件"""
+    deps = []
+    dep_sections = ['dependencies', 'dev-dependencies', 'build-dependencies']
+    if tomllib is not None:
+        data = tomllib.loads(content)
+        for dep_type in dep_sections:
+            deps.extend(data.get(dep_type, {}).keys())
+        return deps
+
+    # 简单的逐行匹配
+    in_deps_section = False
+    for line in content.split('\n'):
+        line = line.strip()
+        if any(line.startswith(f'[{section}') for section in dep_sections):
+            in_deps_section = True
+        elif line.startswith('['):
+            in_deps_section = False
+        elif in_deps_section and '=' in line:
+            match = re.match(r'^([a-zA-Z0-9_\\-]+)\s*=', line)
+            if match:
+                deps.append(match.group(1))
+    return deps
+
+
+def parse_maven_pom(content: str) -> List[str]:
+    """解析Maven pom.xml文件中的artifactId"""
+    return re.findall(r'<artifactId>([^<]+)</artifactId>', content)
+
+
+def parse_gemfile(content: str) -> List[str]:
+    """解析Ruby Gemfile中的gem声明"""
+    return re.findall(r"gem\s+['\"]([^'\"]+)['\"]", content)
+
+
+def parse_composer_json(content: str) -> List[str]:
+    """解析PHP composer.json文件中的require和require-dev"""
+    data = json.loads(content)
+    deps = []
+    for dep_type in ['require', 'require-dev']:
+        if dep_type in data:
+            deps.extend(data[dep_type].keys())
+    return deps
+
+
+# 清单文件名 -> 解析函数
+MANIFEST_PARSERS: Dict[str, Callable[[str], List[str]]] = {
+    'requirements.txt': parse_requirements_txt,
+    'pyproject.toml': parse_pyproject_toml,
+    'setup.py': parse_setup_py,
+    'Pipfile': parse_pipfile,
+    'setup.cfg': parse_setup_cfg,
+    'environment.yml': parse_conda_env,
+    'poetry.lock': parse_poetry_lock,
+    'package.json': parse_package_json,
+    'package-lock.json': parse_package_lock,
+    'yarn.lock': parse_yarn_lock,
+    'go.mod': parse_go_mod,
+    'Cargo.toml': parse_cargo_toml,
+    'pom.xml': parse_maven_pom,
+    'Gemfile': parse_gemfile,
+    'composer.json': parse_composer_json,
+}
+
+
+def _parse_manifest_worker(task: Tuple[str, str]) -> Tuple[List[str], Optional[str]]:
+    """进程池任务：解析单个清单
+
+    Args:
+        task: (清单文件名, 清单内容)
+
+    Returns:
+        Tuple[List[str], Optional[str]]: 依赖列表以及错误信息
+    """
+    name, content = task
+    try:
+        return list(MANIFEST_PARSERS[name](content)), None
+    except Exception as e:
+        return [], str(e)
+
+
+@dataclass
+class Manifest:
+    """项目根目录中的一个依赖清单"""
+    name: str
+    path: Path
+    content: str
+    sha256: str
+    # 无对应解析函数的清单（如go.sum、*.csproj）为None
+    dependencies: Optional[List[str]] = None
+    error: Optional[str] = None
+
+
+# 进程内共享的解析结果：(清单文件名, 内容哈希) -> 依赖列表
+_parsed_cache: Dict[Tuple[str, str], List[str]] = {}
+_parsed_cache_lock = threading.Lock()
+
+
+class DependencyManifestEngine:
+    """依赖清单引擎：一次扫描发现清单，按内容哈希缓存并行解析的结果
+
+    Args:
+        project_dir: 项目根目录
+        cache_file: 可选的解析结果持久化文件
+        console: 可选的rich Console，用于输出进程池回退提示
+    """
+
+    def __init__(self, project_dir, cache_file: Optional[Path] = None, console=None):
+        self.project_dir = Path(project_dir)
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.console = console
+        self._lock = threading.Lock()
+        self._files: Optional[List[str]] = None
+        self._manifests: Dict[str, Manifest] = {}
+        self._load()
+
+    def files(self) -> List[str]:
+        """项目根目录中的文件名（只扫描一次）"""
+        if self._files is None:
+            try:
+                with os.scandir(self.project_dir) as entries:
+                    self._files = sorted(entry.name for entry in entries if entry.is_file())
+            except OSError:
+                self._files = []
+        return self._files
+
+    def exists(self, name: str) -> bool:
+        return name in self.files()
+
+    def find(self, pattern: str) -> List[str]:
+        """根目录中与文件名或通配符（如 *.csproj）匹配的文件"""
+        if any(char in pattern for char in '*?['):
+            return [name for name in self.files() if fnmatch.fnmatch(name, pattern)]
+        return [pattern] if self.exists(pattern) else []
+
+    def parse(self, names: Iterable[str]) -> Dict[str, Manifest]:
+        """读取并解析根目录中存在的清单，返回 文件名 -> Manifest
+
+        内容哈希命中缓存的清单不再解析；其余清单总大小较大时在进程池中并行解析。
+        """
+        names = [name for name in dict.fromkeys(names) if self.exists(name)]
+        with self._lock:
+            pending = []
+            for name in names:
+                if name in self._manifests:
+                    continue
+                manifest = self._read(name)
+                if manifest is None:
+                    continue
+                self._manifests[name] = manifest
+                if name not in MANIFEST_PARSERS:
+                    continue
+                with _parsed_cache_lock:
+                    cached = _parsed_cache.get((name, manifest.sha256))
+                if cached is not None:
+                    manifest.dependencies = list(cached)
+                else:
+                    pending.append(manifest)
+
+            if pending:
+                total_size = sum(len(manifest.content) for manifest in pending)
+                threshold = 2 if total_size >= PARALLEL_MANIFEST_BYTES else 0
+                results = map_in_processes(_parse_manifest_worker,
+                                           [(manifest.name, manifest.content) for manifest in pending],
+                                           threshold, console=self.console)
+                for manifest, (dependencies, error) in zip(pending, results):
+                    manifest.dependencies, manifest.error = dependencies, error
+                    if error is None:
+                        with _parsed_cache_lock:
+                            _parsed_cache[(manifest.name, manifest.sha256)] = dependencies
+                self._save()
+
+            return {name: self._manifests[name] for name in names if name in self._manifests}
+
+    def get(self, name: str) -> Optional[Manifest]:
+        """读取（并在有解析函数时解析）单个清单，不存在时返回None"""
+        return self.parse([name]).get(name)
+
+    def _read(self, name: str) -> Optional[Manifest]:
+        path = self.project_dir / name
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        return Manifest(name=name, path=path, content=data.decode('utf-8', errors='replace'),
+                        sha256=hashlib.sha256(data).hexdigest())
+
+    def _load(self):
+        if self.cache_file is None:
+            return
+        try:
+            data = json.loads(self.cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get('version') != MANIFEST_CACHE_VERSION:
+            return
+        with _parsed_cache_lock:
+            for entry in data.get('manifests', []):
+                _parsed_cache.setdefault((entry['name'], entry['sha256']), entry['dependencies'])
+
+    def _save(self):
+        """只保存当前项目中清单的解析结果"""
+        if self.cache_file is None:
+            return
+        with _parsed_cache_lock:
+            entries = [
+                {'name': name, 'sha256': manifest.sha256, 'dependencies': _parsed_cache[(name, manifest.sha256)]}
+                for name, manifest in sorted(self._manifests.items())
+                if (name, manifest.sha256) in _parsed_cache
+            ]
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            tmp_file.write_text(json.dumps({'version': MANIFEST_CACHE_VERSION, 'manifests': entries},
+                                           indent=2, ensure_ascii=False), encoding='utf-8')
+            tmp_file.replace(self.cache_file)
+        except OSError:
+            # 写入失败只会导致下次重新解析
+            pass
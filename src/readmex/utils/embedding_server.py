@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地嵌入模型常驻服务
+
+本地嵌入模型加载一次需要数十秒。该模块提供一个监听 localhost 的常驻 HTTP 服务，
+模型只加载一次，任意 readmex 进程都可以通过它批量编码文本；空闲超过指定时间后自动退出。
+
+    python -m readmex.utils.embedding_server --model <模型名> --port 8765 --idle-timeout 600
+
+客户端 RemoteEmbeddingModel 提供与 SentenceTransformer 相同的 encode 接口，
+connect_embedding_worker 负责探测、按需启动服务，服务不可用时返回 None 由调用方回退到进程内加载。
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+class EmbeddingServer:
+    """常驻嵌入服务
+
+    Args:
+        model_name: 嵌入模型名称
+        host: 监听地址，默认仅本机
+        port: 监听端口
+        idle_timeout: 空闲多少秒后自动退出，<=0 表示不退出
+        model: 已加载的模型对象（测试用），为None时启动时加载 SentenceTransformer
+    """
+
+    def __init__(self, model_name: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, model=None):
+        self.model_name = model_name
+        self.idle_timeout = idle_timeout
+        self.model = model
+        self.ready = model is not None
+
+        self._encode_lock = threading.Lock()
+        self._activity_lock = threading.Lock()
+        self._active_requests = 0
+        self._last_activity = time.monotonic()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def serve_forever(self):
+        """加载模型并提供服务，直到空闲超时或被关闭"""
+        serve_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        serve_thread.start()
+
+        # 先监听端口再加载模型，客户端可以通过 /health 等待模型就绪
+        if self.model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self.model = SentenceTransformer(self.model_name)
+                self.ready = True
+            except Exception as e:
+                print(f"加载嵌入模型失败: {e}", file=sys.stderr)
+                self.httpd.shutdown()
+                self.httpd.server_close()
+                return
+
+        self._touch()
+        if self.idle_timeout and self.idle_timeout > 0:
+            self._watch_idle()
+        serve_thread.join()
+        self.httpd.server_close()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+
+    def encode(self, texts: List[str]) -> "np.ndarray":
+        # 模型推理本身已按批处理，串行执行避免多个请求争抢CPU/显存
+        with self._encode_lock:
+            embeddings = self.model.encode(texts, show_progress_bar=False)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def _touch(self):
+        with self._activity_lock:
+            self._last_activity = time.monotonic()
+
+    def _watch_idle(self):
+        interval = min(5.0, self.idle_timeout / 2.0)
+        while True:
+            time.sleep(interval)
+            with self._activity_lock:
+                idle = time.monotonic() - self._last_activity
+                if self._active_requests == 0 and idle >= self.idle_timeout:
+                    break
+        self.httpd.shutdown()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/health":
+                    self.send_error(404)
+                    return
+                self._send_json({"model": server.model_name, "ready": server.ready, "pid": os.getpid()})
+
+            def do_POST(self):
+                if self.path != "/encode":
+                    self.send_error(404)
+                    return
+
+                with server._activity_lock:
+                    server._active_requests += 1
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    if payload.get("model") not in (None, server.model_name):
+                        self.send_error(409, "model mismatch")
+                        return
+                    if not server.ready:
+                        self.send_error(503, "model loading")
+                        return
+
+                    embeddings = server.encode(list(payload.get("texts", [])))
+                    body = embeddings.tobytes()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.send_header("X-Embedding-Shape", ",".join(str(d) for d in embeddings.shape))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except Exception as e:
+                    self.send_error(500, str(e))
+                finally:
+                    with server._activity_lock:
+                        server._active_requests -= 1
+                    server._touch()
+
+            def _send_json(self, data):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class RemoteEmbeddingModel:
+    """常驻嵌入服务的客户端，接口与 SentenceTransformer.encode 一致"""
+
+    def __init__(self, model_name: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: float = 600):
+        self.model_name = model_name
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def health(self) -> Optional[dict]:
+        """返回服务状态，服务不可达时返回None"""
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/health", timeout=2) as response:
+                return json.loads(response.read())
+        except (OSError, ValueError):
+            return None
+
+    def encode(self, texts, show_progress_bar: bool = False, **kwargs) -> "np.ndarray":
+        if isinstance(texts, str):
+            texts = [texts]
+        request = urllib.request.Request(
+            f"{self.base_url}/encode",
+            data=json.dumps({"model": self.model_name, "texts": list(texts)}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            shape = tuple(int(d) for d in response.headers["X-Embedding-Shape"].split(","))
+            return np.frombuffer(response.read(), dtype=np.float32).reshape(shape)
+
+
+def connect_embedding_worker(model_name: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                             idle_timeout: float = DEFAULT_IDLE_TIMEOUT, autostart: bool = True,
+                             startup_timeout: float = 300) -> Optional[RemoteEmbeddingModel]:
+    """连接（必要时启动）常驻嵌入服务
+
+    Returns:
+        Optional[RemoteEmbeddingModel]: 模型就绪的客户端；服务不可用或模型不一致时返回None
+    """
+    if np is None:
+        return None
+
+    client = RemoteEmbeddingModel(model_name, host, port)
+    status = client.health()
+
+    process = None
+    if status is None:
+        if not autostart:
+            return None
+        process = _spawn_worker(model_name, host, port, idle_timeout)
+
+    deadline = time.monotonic() + startup_timeout
+    while status is None or not status.get("ready"):
+        if status is not None and status.get("model") != model_name:
+            return None
+        # 服务进程已退出（模型加载失败或端口被占用），最后确认一次是否有其他服务在运行
+        if process is not None and process.poll() is not None:
+            status = client.health()
+            process = None
+            if status is None:
+                return None
+            continue
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.5)
+        status = client.health()
+
+    return client if status.get("model") == model_name else None
+
+
+def _spawn_worker(model_name: str, host: str, port: int, idle_timeout: float) -> subprocess.Popen:
+    """在后台启动独立的服务进程，调用方进程退出后服务继续运行"""
+    command = [
+        sys.executable, "-m", "readmex.utils.embedding_server",
+        "--model", model_name,
+        "--host", host,
+        "--port", str(port),
+        "--idle-timeout", str(idle_timeout),
+    ]
+    # 保证未安装（直接从源码运行）时子进程也能导入 readmex
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+    return subprocess.Popen(
+        command,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=(os.name == "posix"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="readmex 本地嵌入模型常驻服务")
+    parser.add_argument("--model", required=True, help="嵌入模型名称")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT, help="空闲退出时间（秒）")
+    args = parser.parse_args()
+
+    try:
+        server = EmbeddingServer(args.model, args.host, args.port, args.idle_timeout)
+    except OSError as e:
+        # 端口已被占用（通常是另一个进程已启动了服务）
+        print(f"无法监听 {args.host}:{args.port}: {e}", file=sys.stderr)
+        sys.exit(1)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量Git历史读取模块
+
+用一次 `git log -z --numstat --format=...` 调用读取提交、文件增删行数、作者、邮箱和
+引用（标签），并边读边解析输出流，替代“每个提交一次 git show、每个贡献者一次 git log”
+的做法：有数百个贡献者的仓库也只需要两次进程调用。
+
+输出格式：每个提交以 \\x1e 开头，头部字段以 \\x1f 分隔并以 \\0 结尾；之后每个
+numstat 条目以 \\0 结尾（重命名条目为 "增\\t删\\t\\0旧路径\\0新路径\\0"）。
+"""
+
+import json
+import subprocess
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from readmex.utils.git_repo import CommitHeader, GitRepository
+
+RECORD_START = '\x1e'
+FIELD_SEP = '\x1f'
+
+# 提交头部格式：完整哈希、作者、邮箱、日期、引用装饰、标题
+LOG_FORMAT = '%x1e%H%x1f%an%x1f%ae%x1f%ad%x1f%D%x1f%s'
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# 持久化缓存格式版本
+GIT_CACHE_VERSION = 3
+
+# 缓存中保留的最近提交数
+CACHED_COMMITS = 100
+
+
+@dataclass
+class FileChange:
+    """单个文件的变更行数，二进制文件的行数为None"""
+    path: str
+    insertions: Optional[int]
+    deletions: Optional[int]
+    old_path: Optional[str] = None
+
+
+@dataclass
+class GitCommitRecord:
+    """git log 中的单个提交"""
+    hash: str
+    author: str
+    email: str
+    date: str
+    refs: List[str]
+    subject: str
+    files: List[FileChange] = field(default_factory=list)
+
+    @property
+    def tags(self) -> List[str]:
+        return [ref[len('tag: '):] for ref in self.refs if ref.startswith('tag: ')]
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'GitCommitRecord':
+        data = dict(data)
+        data['files'] = [FileChange(**change) for change in data.get('files', [])]
+        return cls(**data)
+
+    @property
+    def insertions(self) -> int:
+        return sum(change.insertions or 0 for change in self.files)
+
+    @property
+    def deletions(self) -> int:
+        return sum(change.deletions or 0 for change in self.files)
+
+
+def iter_git_log(project_dir, revisions: Sequence[str] = ('HEAD',), max_count: int = None,
+                 numstat: bool = True, extra_args: Sequence[str] = ()) -> Iterator[GitCommitRecord]:
+    """流式读取 git log，逐个产出提交
+
+    Raises:
+        subprocess.CalledProcessError: git 命令执行失败（如不是Git仓库）
+        FileNotFoundError: 未安装git
+    """
+    command = ['git', 'log', '-z', f'--format={LOG_FORMAT}', '--date=short']
+    if numstat:
+        command.append('--numstat')
+    if max_count is not None:
+        command.append(f'--max-count={max_count}')
+    command.extend(extra_args)
+    command.extend(revisions)
+    command.append('--')
+
+    process = subprocess.Popen(
+        command,
+        cwd=str(project_dir),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        chunks = iter(lambda: process.stdout.read(READ_CHUNK_SIZE), b'')
+        yield from parse_git_log_stream(chunks)
+    finally:
+        # 调用方提前停止迭代时结束进程
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        returncode = process.wait()
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, stderr=stderr.decode('utf-8', errors='replace'))
+
+
+def parse_git_log_stream(chunks) -> Iterator[GitCommitRecord]:
+    """增量解析 git log -z 输出（字节块的迭代器）"""
+    current: Optional[GitCommitRecord] = None
+    # 重命名条目的 "增\t删" 部分，等待后续的旧路径和新路径
+    pending_rename: Optional[Tuple[Optional[int], Optional[int]]] = None
+    rename_old: Optional[str] = None
+    buffer = b''
+
+    for chunk in chunks:
+        buffer += chunk
+        *tokens, buffer = buffer.split(b'\0')
+        for raw in tokens:
+            token = raw.decode('utf-8', errors='replace')
+
+            if pending_rename is not None:
+                if rename_old is None:
+                    rename_old = token
+                    continue
+                insertions, deletions = pending_rename
+                current.files.append(FileChange(token, insertions, deletions, old_path=rename_old))
+                pending_rename, rename_old = None, None
+                continue
+
+            token = token.lstrip('\n')
+            if token.startswith(RECORD_START):
+                if current is not None:
+                    yield current
+                current = _parse_header(token[1:])
+                continue
+
+            if current is None or not token:
+                continue
+
+            parts = token.split('\t', 2)
+            if len(parts) != 3:
+                continue
+            insertions, deletions = _parse_count(parts[0]), _parse_count(parts[1])
+            if parts[2]:
+                current.files.append(FileChange(parts[2], insertions, deletions))
+            else:
+                pending_rename = (insertions, deletions)
+
+    # 没有 numstat 时最后一个头部不以 \0 结尾
+    tail = buffer.decode('utf-8', errors='replace').lstrip('\n')
+    if tail.startswith(RECORD_START):
+        if current is not None:
+            yield current
+        current = _parse_header(tail[1:])
+    if current is not None:
+        yield current
+
+
+def read_refs(project_dir) -> Dict[str, str]:
+    """读取 HEAD 和所有引用指向的提交（同 git show-ref --head），空仓库返回空字典
+
+    优先直接读取 .git 目录，失败时回退到git命令。
+    """
+    repo = GitRepository.discover(project_dir)
+    if repo is not None:
+        try:
+            return repo.refs()
+        except (OSError, ValueError):
+            pass
+
+    result = subprocess.run(
+        ['git', 'show-ref', '--head'],
+        cwd=str(project_dir),
+        capture_output=True,
+        text=True
+    )
+    # 没有任何引用时返回1且无输出
+    if result.returncode not in (0, 1):
+        raise subprocess.CalledProcessError(result.returncode, result.args, stderr=result.stderr)
+
+    refs = {}
+    for line in result.stdout.splitlines():
+        sha, _, name = line.partition(' ')
+        if name:
+            refs[name] = sha
+    return refs
+
+
+def read_tags(project_dir) -> List[Dict]:
+    """标签的名称、创建日期和说明，按创建日期从新到旧排列（附注标签使用标签自身的日期和说明）"""
+    result = subprocess.run(
+        ['git', 'for-each-ref', '--sort=-creatordate',
+         '--format=%(refname:short)%1f%(creatordate:short)%1f%(subject)', 'refs/tags'],
+        cwd=str(project_dir),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, result.args, stderr=result.stderr)
+
+    tags = []
+    for line in result.stdout.splitlines():
+        name, _, rest = line.partition(FIELD_SEP)
+        date, _, subject = rest.partition(FIELD_SEP)
+        if name:
+            tags.append({'name': name, 'date': date, 'message': subject})
+    return tags
+
+
+def is_ancestor(project_dir, ancestor: str, descendant: str) -> bool:
+    try:
+        result = subprocess.run(
+            ['git', 'merge-base', '--is-ancestor', ancestor, descendant],
+            cwd=str(project_dir),
+            capture_output=True
+        )
+    except OSError:
+        # 未安装git时按非祖先处理，由调用方完整读取
+        return False
+    return result.returncode == 0
+
+
+def _parse_header(text: str) -> GitCommitRecord:
+    fields = text.rstrip('\n').split(FIELD_SEP, 5)
+    fields += [''] * (6 - len(fields))
+    commit_hash, author, email, date, refs, subject = fields
+    return GitCommitRecord(
+        hash=commit_hash,
+        author=author,
+        email=email,
+        date=date,
+        refs=[ref.strip() for ref in refs.split(',') if ref.strip()],
+        subject=subject,
+    )
+
+
+def _parse_count(value: str) -> Optional[int]:
+    # 二进制文件的行数为 "-"
+    return int(value) if value.isdigit() else None
+
+
+class GitHistoryReader:
+    """从Git仓库批量读取提交历史、贡献者和标签
+
+    结果按 HEAD 提交和标签集合缓存：同一次运行内所有页面共享内存中的结果，
+    指定 cache_file 时持久化到磁盘。HEAD 向前移动且标签未变化时只读取新增的提交
+    并追加到缓存中；否则（首次运行、历史被改写或标签变化）完整读取一次。
+
+    - recent_commits: 最近的提交，含numstat（一次 git log --numstat 调用）
+    - contributors: 一次遍历所有引用的 git log（不含numstat）统计
+    - tags: 一次 git for-each-ref 调用，附注标签使用标签自身的创建日期和说明
+    """
+
+    def __init__(self, project_dir, cache_file: Optional[Path] = None):
+        self.project_dir = Path(project_dir)
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._lock = threading.Lock()
+        self._state: Optional[Dict] = None
+
+    def recent_commits(self, limit: int = 20) -> List[GitCommitRecord]:
+        state = self._current_state()
+        if limit > len(state['commits']) and not state['complete']:
+            # 需要的提交数超过缓存范围时直接读取
+            return list(iter_git_log(self.project_dir, max_count=limit))
+        return [GitCommitRecord.from_dict(commit) for commit in state['commits'][:limit]]
+
+    def contributors(self) -> List[Dict]:
+        """按提交数降序排列的贡献者（同 git shortlog -sn --all），邮箱取最近一次提交"""
+        authors = self._current_state()['authors']
+        return [
+            {'name': name, 'email': authors[name]['email'], 'commits': authors[name]['commits']}
+            for name in sorted(authors, key=lambda name: (-authors[name]['commits'], name))
+        ]
+
+    def tags(self) -> List[Dict]:
+        """标签列表，按标签所指提交的日期从新到旧排列"""
+        return [dict(tag) for tag in self._current_state()['tags']]
+
+    def _current_state(self) -> Dict:
+        with self._lock:
+            if self._state is None:
+                self._state = self._refresh_state()
+            return self._state
+
+    def _refresh_state(self) -> Dict:
+        refs = read_refs(self.project_dir)
+        head = refs.get('HEAD')
+        tag_refs = {name: sha for name, sha in refs.items() if name.startswith('refs/tags/')}
+
+        cached = self._load()
+        # 直接读取 .git 目录得到的缓存不含文件变更统计，安装了git时重新读取
+        if cached and cached['refs'] == refs and cached['numstat']:
+            return cached
+
+        try:
+            if (cached and cached['numstat'] and head and cached['head'] and cached['tag_refs'] == tag_refs
+                    and is_ancestor(self.project_dir, cached['head'], head)):
+                state = self._append_new_commits(cached, refs)
+            else:
+                state = self._scan(refs)
+        except FileNotFoundError:
+            # 未安装git：直接读取 .git 目录（不含文件变更统计）
+            if cached and cached['refs'] == refs:
+                return cached
+            state = self._scan_native(refs)
+
+        state.update({'version': GIT_CACHE_VERSION, 'head': head, 'tag_refs': tag_refs, 'refs': refs})
+        self._save(state)
+        return state
+
+    def _scan(self, refs: Dict[str, str]) -> Dict:
+        """完整读取：最近提交、贡献者和标签各一次调用"""
+        if not refs:
+            return {'commits': [], 'complete': True, 'authors': {}, 'tags': [], 'numstat': True}
+
+        commits = list(iter_git_log(self.project_dir, max_count=CACHED_COMMITS))
+        authors: Dict[str, Dict] = {}
+        for commit in iter_git_log(self.project_dir, revisions=('--all',), numstat=False):
+            self._count_author(authors, commit)
+
+        return {
+            'commits': [asdict(commit) for commit in commits],
+            'complete': len(commits) < CACHED_COMMITS,
+            'authors': authors,
+            'tags': read_tags(self.project_dir),
+            'numstat': True,
+        }
+
+    def _scan_native(self, refs: Dict[str, str]) -> Dict:
+        """不启动git进程的完整读取：提交头部信息来自 loose 对象和 pack 文件"""
+        repo = GitRepository.discover(self.project_dir)
+        if repo is None or not refs:
+            return {'commits': [], 'complete': True, 'authors': {}, 'tags': [], 'numstat': False}
+
+        tags_by_commit: Dict[str, List[str]] = {}
+        for name, sha in sorted(repo.tags().items()):
+            tags_by_commit.setdefault(sha, []).append(name)
+
+        def to_record(header: CommitHeader) -> GitCommitRecord:
+            refs_decoration = [f"tag: {name}" for name in tags_by_commit.get(header.sha, [])]
+            return GitCommitRecord(header.sha, header.author, header.email, header.date,
+                                   refs_decoration, header.subject)
+
+        head_commits = repo.iter_commits([refs['HEAD']], max_count=CACHED_COMMITS) if 'HEAD' in refs else []
+        commits = [to_record(header) for header in head_commits]
+
+        authors: Dict[str, Dict] = {}
+        starts = {repo.peel(sha) for sha in refs.values()}
+        for header in repo.iter_commits(sorted(starts)):
+            self._count_author(authors, to_record(header))
+
+        return {
+            'commits': [asdict(commit) for commit in commits],
+            'complete': len(commits) < CACHED_COMMITS,
+            'authors': authors,
+            'tags': repo.tag_details(),
+            'numstat': False,
+        }
+
+    def _append_new_commits(self, cached: Dict, refs: Dict[str, str]) -> Dict:
+        """HEAD 快进时只读取缓存之后的新提交"""
+        new_commits = list(iter_git_log(
+            self.project_dir, revisions=(refs['HEAD'], '--not', cached['head']), max_count=CACHED_COMMITS
+        ))
+        commits = [asdict(commit) for commit in new_commits] + cached['commits']
+
+        # 贡献者统计覆盖所有引用：只统计从旧引用不可达的提交
+        old_shas = sorted(set(cached['refs'].values()))
+        authors = {name: dict(info) for name, info in cached['authors'].items()}
+        seen = set()
+        for commit in iter_git_log(self.project_dir, revisions=('--all', '--not', *old_shas), numstat=False):
+            if commit.author not in seen:
+                # 新提交的邮箱比缓存中的更新
+                seen.add(commit.author)
+                authors.setdefault(commit.author, {'email': commit.email, 'commits': 0})
+                authors[commit.author]['email'] = commit.email
+            authors[commit.author]['commits'] += 1
+
+        return {
+            'commits': commits[:CACHED_COMMITS],
+            'complete': cached['complete'] and len(commits) <= CACHED_COMMITS,
+            'authors': authors,
+            'tags': cached['tags'],
+            'numstat': True,
+        }
+
+    @staticmethod
+    def _count_author(authors: Dict[str, Dict], commit: GitCommitRecord):
+        # 输出从新到旧，第一次出现的邮箱即最近一次提交的邮箱
+        info = authors.setdefault(commit.author, {'email': commit.email, 'commits': 0})
+        info['commits'] += 1
+
+    def _load(self) -> Optional[Dict]:
+        if not self.cache_file:
+            return None
+        try:
+            data = json.loads(self.cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get('version') != GIT_CACHE_VERSION:
+            return None
+        return data
+
+    def _save(self, state: Dict):
+        if not self.cache_file:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            tmp_file.write_text(json.dumps(state, ensure_ascii=False), encoding='utf-8')
+            tmp_file.replace(self.cache_file)
+        except OSError:
+            # 缓存写入失败不影响本次结果
+            pass
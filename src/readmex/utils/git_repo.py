@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+纯Python的Git仓库读取模块
+
+直接读取 .git 目录获取常用信息，无需启动 git 进程（每次启动需要数十毫秒，
+精简容器中甚至没有安装git）：
+
+- 系统、全局和仓库配置文件（含 include.path）中的远程仓库URL
+- HEAD、loose refs 和 packed-refs
+- 标签（附注标签会解析到其指向的提交，并读取标签自身的创建日期和说明）
+- 提交头部信息（作者、邮箱、日期、父提交、标题），支持 loose 对象和 pack 文件（含delta）
+
+无法处理的情况（如 alternates、v1 pack 索引、url.insteadOf 改写、includeIf 条件引入）抛出异常或返回None，
+调用方回退到 git 命令。
+"""
+
+import heapq
+import os
+import re
+import struct
+import subprocess
+import threading
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+OBJECT_TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+OFS_DELTA = 6
+REF_DELTA = 7
+
+PACK_INDEX_MAGIC = b'\xfftOc'
+
+_SECTION_RE = re.compile(r'^\[\s*([^\s\]"]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+_IDENT_RE = re.compile(r'^(.*?) <(.*)> (\d+) ([+-]\d{4})$')
+
+
+@dataclass
+class CommitHeader:
+    """提交对象的头部信息"""
+    sha: str
+    parents: List[str]
+    author: str
+    email: str
+    author_time: int
+    author_tz: int
+    commit_time: int
+    subject: str
+    commit_tz: int = 0
+
+    @property
+    def date(self) -> str:
+        """作者日期，格式同 git log --date=short（作者所在时区）"""
+        return _short_date(self.author_time, self.author_tz)
+
+
+class GitRepository:
+    """直接读取 .git 目录的只读仓库对象，线程安全"""
+
+    def __init__(self, git_dir: Path):
+        self.git_dir = Path(git_dir)
+        # 工作树（git worktree）的 refs、objects 和 config 位于公共目录中
+        common_dir_file = self.git_dir / 'commondir'
+        if common_dir_file.exists():
+            self.common_dir = (self.git_dir / common_dir_file.read_text().strip()).resolve()
+        else:
+            self.common_dir = self.git_dir
+        self.objects_dir = self.common_dir / 'objects'
+        self._lock = threading.Lock()
+        self._packs: Optional[List['_PackFile']] = None
+        self._commits: Dict[str, CommitHeader] = {}
+
+    @classmethod
+    def discover(cls, path) -> Optional['GitRepository']:
+        """从 path 向上查找仓库（与git命令的查找方式相同），找不到时返回None"""
+        current = Path(path).resolve()
+        for directory in [current, *current.parents]:
+            dot_git = directory / '.git'
+            if dot_git.is_dir():
+                return cls(dot_git)
+            if dot_git.is_file():
+                # 子模块和工作树：.git 文件内容为 "gitdir: <路径>"
+                content = dot_git.read_text(encoding='utf-8', errors='replace').strip()
+                if content.startswith('gitdir:'):
+                    return cls((directory / content[len('gitdir:'):].strip()).resolve())
+        return None
+
+    # ---------- 配置 ----------
+
+    def config_files(self) -> List[Path]:
+        """git命令读取的配置文件（系统、全局、仓库），后面的文件覆盖前面的"""
+        files = []
+        if os.environ.get('GIT_CONFIG_NOSYSTEM', '').lower() not in ('1', 'true', 'yes', 'on'):
+            files.append(Path(os.environ.get('GIT_CONFIG_SYSTEM', '/etc/gitconfig')))
+        if 'GIT_CONFIG_GLOBAL' in os.environ:
+            files.append(Path(os.environ['GIT_CONFIG_GLOBAL']).expanduser())
+        else:
+            xdg_config = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+            files.append(Path(xdg_config) / 'git' / 'config')
+            files.append(Path(os.path.expanduser('~')) / '.gitconfig')
+        files.append(self.common_dir / 'config')
+        files.append(self.git_dir / 'config.worktree')
+        return files
+
+    def config(self) -> Dict[Tuple[str, Optional[str]], Dict[str, str]]:
+        """解析所有配置文件（含 include.path 引入的文件），返回 {(节, 子节): {键: 值}}，节名和键名为小写"""
+        sections: Dict[Tuple[str, Optional[str]], Dict[str, str]] = {}
+        for config_file in self.config_files():
+            self._read_config_file(config_file, sections, 0)
+        return sections
+
+    def _read_config_file(self, path: Path, sections: Dict[Tuple[str, Optional[str]], Dict[str, str]], depth: int):
+        if depth > 10:
+            return
+        try:
+            lines = path.read_text(encoding='utf-8', errors='replace').splitlines()
+        except OSError:
+            return
+
+        current = None
+        current_name = None
+        for raw_line in lines:
+            line = raw_line.strip()
+            if not line or line[0] in '#;':
+                continue
+            match = _SECTION_RE.match(line)
+            if match:
+                current_name = (match.group(1).lower(), match.group(2))
+                current = sections.setdefault(current_name, {})
+                continue
+            if current is None:
+                continue
+            key, sep, value = line.partition('=')
+            key = key.strip().lower()
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+            current[key] = value if sep else 'true'
+
+            # include.path 引入的文件在当前位置展开，相对路径相对于当前配置文件
+            if current_name[0] in ('include', 'includeif') and key == 'path' and value:
+                self._read_config_file(path.parent / Path(value).expanduser(), sections, depth + 1)
+
+    def remote_url(self, remote: str = 'origin') -> Optional[str]:
+        """远程仓库URL，未配置时返回None
+
+        Raises:
+            ValueError: 配置了 url.insteadOf 改写、条件引入（includeIf）或通过环境变量传入配置，
+                需要由git命令处理
+        """
+        if os.environ.get('GIT_CONFIG_PARAMETERS') or os.environ.get('GIT_CONFIG_COUNT'):
+            raise ValueError("configuration from the environment is not supported")
+        config = self.config()
+        if any(section == 'url' for section, _ in config):
+            raise ValueError("url.insteadOf rewriting is not supported")
+        if any(section == 'includeif' for section, _ in config):
+            raise ValueError("conditional includes are not supported")
+        return config.get(('remote', remote), {}).get('url')
+
+    # ---------- 引用 ----------
+
+    def head(self) -> Optional[str]:
+        """HEAD 指向的提交，空仓库返回None"""
+        return self.resolve_ref('HEAD')
+
+    def resolve_ref(self, name: str, depth: int = 0) -> Optional[str]:
+        if depth > 5:
+            return None
+        base_dir = self.git_dir if name == 'HEAD' else self.common_dir
+        try:
+            content = (base_dir / name).read_text(encoding='utf-8').strip()
+        except OSError:
+            return self._packed_refs().get(name)
+        if content.startswith('ref:'):
+            return self.resolve_ref(content[len('ref:'):].strip(), depth + 1)
+        return content or None
+
+    def refs(self) -> Dict[str, str]:
+        """HEAD 和所有引用，格式同 git show-ref --head（loose ref 优先于 packed-refs）"""
+        refs = dict(self._packed_refs())
+        refs_dir = self.common_dir / 'refs'
+        for root, _, files in os.walk(refs_dir):
+            for file_name in files:
+                path = Path(root) / file_name
+                name = path.relative_to(self.common_dir).as_posix()
+                try:
+                    content = path.read_text(encoding='utf-8').strip()
+                except (OSError, UnicodeDecodeError):
+                    continue
+                if content.startswith('ref:'):
+                    sha = self.resolve_ref(content[len('ref:'):].strip())
+                else:
+                    sha = content
+                if sha:
+                    refs[name] = sha
+
+        result = {}
+        head = self.head()
+        if head:
+            result['HEAD'] = head
+        result.update(sorted(refs.items()))
+        return result
+
+    def _packed_refs(self) -> Dict[str, str]:
+        refs = {}
+        try:
+            lines = (self.common_dir / 'packed-refs').read_text(encoding='utf-8').splitlines()
+        except OSError:
+            return refs
+        for line in lines:
+            # 注释行和附注标签的 "^<peeled>" 行
+            if not line or line[0] in '#^':
+                continue
+            sha, _, name = line.partition(' ')
+            if name:
+                refs[name.strip()] = sha
+        return refs
+
+    def tags(self) -> Dict[str, str]:
+        """标签名 -> 提交（附注标签解析到其指向的对象）"""
+        tags = {}
+        for name, sha in self.refs().items():
+            if not name.startswith('refs/tags/'):
+                continue
+            try:
+                tags[name[len('refs/tags/'):]] = self.peel(sha)
+            except (KeyError, ValueError, OSError):
+                continue
+        return tags
+
+    def tag_details(self) -> List[Dict[str, str]]:
+        """标签的名称、创建日期和说明，同 git for-each-ref --sort=-creatordate refs/tags
+
+        附注标签使用标签对象自身的创建者日期和说明标题，轻量标签使用所指提交的提交日期和标题。
+        """
+        entries = []
+        for name, sha in self.refs().items():
+            if not name.startswith('refs/tags/'):
+                continue
+            try:
+                object_type, data = self.read_object(sha)
+                if object_type == 'tag':
+                    created, tz, subject = self._parse_tag(data)
+                    if created is None:
+                        commit = self.read_commit(self.peel(sha))
+                        created, tz = commit.commit_time, commit.commit_tz
+                elif object_type == 'commit':
+                    commit = self.read_commit(sha)
+                    created, tz, subject = commit.commit_time, commit.commit_tz, commit.subject
+                else:
+                    continue
+            except (KeyError, ValueError, OSError):
+                continue
+            entries.append((-created, name[len('refs/tags/'):], _short_date(created, tz), subject))
+
+        return [{'name': name, 'date': date, 'message': subject} for _, name, date, subject in sorted(entries)]
+
+    @staticmethod
+    def _parse_tag(data: bytes) -> Tuple[Optional[int], int, str]:
+        """解析附注标签对象，返回 (创建时间, 时区, 说明标题)，没有 tagger 时创建时间为None"""
+        header, _, message = data.partition(b'\n\n')
+        created, tz = None, 0
+        for line in header.decode('utf-8', errors='replace').split('\n'):
+            if line.startswith('tagger '):
+                tagger = _IDENT_RE.match(line[len('tagger '):])
+                if tagger:
+                    created, tz = int(tagger.group(3)), _parse_tz(tagger.group(4))
+        return created, tz, _subject(message)
+
+    def peel(self, sha: str) -> str:
+        for _ in range(10):
+            object_type, data = self.read_object(sha)
+            if object_type != 'tag':
+                return sha
+            header = data.split(b'\n', 1)[0].decode('ascii')
+            sha = header[len('object '):]
+        return sha
+
+    # ---------- 提交 ----------
+
+    def read_commit(self, sha: str) -> CommitHeader:
+        cached = self._commits.get(sha)
+        if cached is not None:
+            return cached
+
+        object_type, data = self.read_object(sha)
+        if object_type != 'commit':
+            raise ValueError(f"{sha} is a {object_type}, not a commit")
+
+        header, _, message = data.partition(b'\n\n')
+        parents, author, committer = [], None, None
+        for line in header.decode('utf-8', errors='replace').split('\n'):
+            # 以空格开头的是多行字段（如 gpgsig）的续行
+            if line.startswith(' '):
+                continue
+            key, _, value = line.partition(' ')
+            if key == 'parent':
+                parents.append(value)
+            elif key == 'author':
+                author = _IDENT_RE.match(value)
+            elif key == 'committer':
+                committer = _IDENT_RE.match(value)
+        if author is None or committer is None:
+            raise ValueError(f"Malformed commit {sha}")
+
+        commit = CommitHeader(
+            sha=sha,
+            parents=parents,
+            author=author.group(1),
+            email=author.group(2),
+            author_time=int(author.group(3)),
+            author_tz=_parse_tz(author.group(4)),
+            commit_time=int(committer.group(3)),
+            subject=_subject(message),
+            commit_tz=_parse_tz(committer.group(4)),
+        )
+        self._commits[sha] = commit
+        return commit
+
+    def iter_commits(self, starts: Iterable[str], exclude: Iterable[str] = (),
+                     max_count: Optional[int] = None) -> Iterator[CommitHeader]:
+        """从 starts 出发按提交时间从新到旧遍历（同 git log 默认顺序），跳过 exclude 可达的提交"""
+        excluded = set()
+        exclude = [sha for sha in exclude if sha]
+        if exclude:
+            excluded = {commit.sha for commit in self.iter_commits(exclude)}
+
+        seen = set()
+        queue = []
+        for sha in starts:
+            if sha and sha not in seen and sha not in excluded:
+                seen.add(sha)
+                commit = self.read_commit(sha)
+                heapq.heappush(queue, (-commit.commit_time, sha, commit))
+
+        count = 0
+        while queue and (max_count is None or count < max_count):
+            _, _, commit = heapq.heappop(queue)
+            yield commit
+            count += 1
+            for parent in commit.parents:
+                if parent not in seen and parent not in excluded:
+                    seen.add(parent)
+                    parent_commit = self.read_commit(parent)
+                    heapq.heappush(queue, (-parent_commit.commit_time, parent, parent_commit))
+
+    # ---------- 对象 ----------
+
+    def read_object(self, sha: str) -> Tuple[str, bytes]:
+        """读取对象，返回 (类型, 内容)；对象不存在时抛出KeyError"""
+        loose_path = self.objects_dir / sha[:2] / sha[2:]
+        try:
+            raw = zlib.decompress(loose_path.read_bytes())
+        except FileNotFoundError:
+            pass
+        else:
+            header, _, data = raw.partition(b'\0')
+            return header.split(b' ', 1)[0].decode('ascii'), data
+
+        binary_sha = bytes.fromhex(sha)
+        for pack in self._get_packs():
+            offset = pack.find(binary_sha)
+            if offset is not None:
+                return pack.read_at(offset, self)
+        raise KeyError(sha)
+
+    def _get_packs(self) -> List['_PackFile']:
+        with self._lock:
+            if self._packs is None:
+                pack_dir = self.objects_dir / 'pack'
+                self._packs = [_PackFile(path) for path in sorted(pack_dir.glob('*.idx'))] if pack_dir.is_dir() else []
+            return self._packs
+
+
+class _PackFile:
+    """pack 文件及其 v2 索引"""
+
+    def __init__(self, index_path: Path):
+        self.index_path = index_path
+        self.pack_path = index_path.with_suffix('.pack')
+        self._index: Optional[bytes] = None
+        self._fanout: Tuple[int, ...] = ()
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        data = self.index_path.read_bytes()
+        if data[:4] != PACK_INDEX_MAGIC or struct.unpack('>I', data[4:8])[0] != 2:
+            raise ValueError(f"Unsupported pack index: {self.index_path}")
+        self._fanout = struct.unpack('>256I', data[8:8 + 1024])
+        self._index = data
+
+    def find(self, binary_sha: bytes) -> Optional[int]:
+        """在索引中二分查找对象，返回其在pack中的偏移"""
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+        data, fanout = self._index, self._fanout
+        count = fanout[255]
+        first = binary_sha[0]
+        low = fanout[first - 1] if first else 0
+        high = fanout[first]
+
+        sha_start = 8 + 1024
+        while low < high:
+            middle = (low + high) // 2
+            position = sha_start + 20 * middle
+            current = data[position:position + 20]
+            if current < binary_sha:
+                low = middle + 1
+            elif current > binary_sha:
+                high = middle
+            else:
+                offset_start = sha_start + 24 * count
+                offset = struct.unpack('>I', data[offset_start + 4 * middle:offset_start + 4 * middle + 4])[0]
+                if offset & 0x80000000:
+                    # 大于2GB的偏移保存在64位偏移表中
+                    large_start = offset_start + 4 * count + 8 * (offset & 0x7fffffff)
+                    offset = struct.unpack('>Q', data[large_start:large_start + 8])[0]
+                return offset
+        return None
+
+    def read_at(self, offset: int, repo: GitRepository) -> Tuple[str, bytes]:
+        with self._lock, open(self.pack_path, 'rb') as pack:
+            pack.seek(offset)
+            byte = pack.read(1)[0]
+            object_type = (byte >> 4) & 7
+            while byte & 0x80:
+                byte = pack.read(1)[0]
+
+            base_offset, base_sha = None, None
+            if object_type == OFS_DELTA:
+                byte = pack.read(1)[0]
+                distance = byte & 0x7f
+                while byte & 0x80:
+                    byte = pack.read(1)[0]
+                    distance = ((distance + 1) << 7) | (byte & 0x7f)
+                base_offset = offset - distance
+            elif object_type == REF_DELTA:
+                base_sha = pack.read(20).hex()
+
+            data = _inflate(pack)
+
+        if object_type == OFS_DELTA:
+            base_type, base = self.read_at(base_offset, repo)
+            return base_type, _apply_delta(base, data)
+        if object_type == REF_DELTA:
+            base_type, base = repo.read_object(base_sha)
+            return base_type, _apply_delta(base, data)
+        if object_type not in OBJECT_TYPES:
+            raise ValueError(f"Unknown pack object type {object_type} in {self.pack_path}")
+        return OBJECT_TYPES[object_type], data
+
+
+def _inflate(stream) -> bytes:
+    decompressor = zlib.decompressobj()
+    chunks = []
+    while not decompressor.eof:
+        chunk = stream.read(4096)
+        if not chunk:
+            break
+        chunks.append(decompressor.decompress(chunk))
+    return b''.join(chunks)
+
+
+def _read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    value, shift = 0, 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes:
+    """应用 git delta：复制基础对象片段或插入新数据"""
+    _, position = _read_varint(delta, 0)
+    target_size, position = _read_varint(delta, position)
+    result = bytearray()
+    while position < len(delta):
+        opcode = delta[position]
+        position += 1
+        if opcode & 0x80:
+            copy_offset, copy_size = 0, 0
+            for bit in range(4):
+                if opcode & (1 << bit):
+                    copy_offset |= delta[position] << (8 * bit)
+                    position += 1
+            for bit in range(3):
+                if opcode & (0x10 << bit):
+                    copy_size |= delta[position] << (8 * bit)
+                    position += 1
+            result += base[copy_offset:copy_offset + (copy_size or 0x10000)]
+        elif opcode:
+            result += delta[position:position + opcode]
+            position += opcode
+        else:
+            raise ValueError("Invalid delta opcode")
+    if len(result) != target_size:
+        raise ValueError("Delta size mismatch")
+    return bytes(result)
+
+
+def _subject(message: bytes) -> str:
+    """与 git log %s 相同：标题为第一段，多行时以空格连接（签名部分不计入）"""
+    subject_lines = []
+    for line in message.decode('utf-8', errors='replace').split('\n'):
+        if line.startswith('-----BEGIN PGP SIGNATURE-----') or line.startswith('-----BEGIN SSH SIGNATURE-----'):
+            break
+        if not line.strip():
+            if subject_lines:
+                break
+            continue
+        subject_lines.append(line.strip())
+    return ' '.join(subject_lines)
+
+
+def _short_date(timestamp: int, tz_minutes: int) -> str:
+    """格式同 git 的 short 日期（使用记录的时区）"""
+    return datetime.fromtimestamp(timestamp, timezone(timedelta(minutes=tz_minutes))).strftime('%Y-%m-%d')
+
+
+def _parse_tz(value: str) -> int:
+    minutes = int(value[1:3]) * 60 + int(value[3:5])
+    return -minutes if value[0] == '-' else minutes
+
+
+def get_remote_url(project_dir, remote: str = 'origin') -> Optional[str]:
+    """获取远程仓库URL：优先直接读取 .git/config，失败时回退到 git remote get-url"""
+    try:
+        repo = GitRepository.discover(project_dir)
+        if repo is not None:
+            return repo.remote_url(remote)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        result = subprocess.run(
+            ['git', 'remote', 'get-url', remote],
+            cwd=str(project_dir),
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 and result.stdout.strip() else None
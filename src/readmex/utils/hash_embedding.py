@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轻量级CPU嵌入模块
+
+无需下载模型的内置嵌入后端：将标识符词元与字符 n-gram 哈希到固定大小的特征空间，
+计算 TF-IDF 权重后通过稀疏随机投影（符号哈希）降到 dimension 维，可选再用 SVD 做潜在语义降维。
+所有计算使用numpy向量化完成，单个代码块的编码耗时在亚毫秒量级。
+
+IDF 与 SVD 分量需要在语料上拟合（fit），并通过 save/load 与嵌入缓存一起持久化，
+保证查询向量与缓存中的文档向量处于同一空间。
+"""
+
+import re
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HASHING_MODEL_NAME = "hashing-tfidf"
+REDUCTIONS = ('projection', 'svd')
+
+_WHITESPACE_RE = re.compile(r'\s+')
+# 标识符词元：拆分 camelCase / snake_case，中文按单字
+_WORD_RE = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+|[\u4e00-\u9fff]')
+
+# 多项式滚动哈希的基数（奇数，uint64运算自然取模2^64）
+_HASH_BASE = 1000003
+
+
+class HashingEmbeddingModel:
+    """哈希 n-gram TF-IDF 嵌入模型，接口与 SentenceTransformer.encode 一致
+
+    Args:
+        dimension: 输出向量维度
+        reduction: 'projection' 直接输出随机投影结果；'svd' 先投影到 projection_dim 维再做截断SVD
+        n_features: 哈希特征空间大小（IDF表大小）
+        ngram_range: 字符 n-gram 长度范围（含两端）
+        word_weight: 标识符词元相对字符 n-gram 的权重
+        projection_dim: 'svd' 模式下的中间投影维度
+        seed: 随机投影种子
+    """
+
+    def __init__(self, dimension: int = 512, reduction: str = 'projection', n_features: int = 1 << 18,
+                 ngram_range: Tuple[int, int] = (3, 5), word_weight: float = 2.0,
+                 projection_dim: int = 2048, seed: int = 42):
+        if np is None:
+            raise ImportError("numpy is not installed")
+        if reduction not in REDUCTIONS:
+            raise ValueError(f"不支持的降维方式: {reduction}")
+
+        self.dimension = dimension
+        self.reduction = reduction
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.word_weight = word_weight
+        self.projection_dim = max(projection_dim, dimension) if reduction == 'svd' else dimension
+        self.seed = seed
+
+        self.idf: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+        self._init_projection()
+
+    @property
+    def name(self) -> str:
+        """包含关键参数的模型名称，参数变化时嵌入缓存随之失效"""
+        return f"{HASHING_MODEL_NAME}:{self.dimension}:{self.reduction}"
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.idf is not None and (self.reduction != 'svd' or self.components is not None)
+
+    def fit(self, texts: List[str]) -> 'HashingEmbeddingModel':
+        """在语料上拟合IDF（及SVD分量）"""
+        self.fit_transform(texts)
+        return self
+
+    def fit_transform(self, texts: List[str]) -> "np.ndarray":
+        """拟合并返回语料的向量，特征只提取一次"""
+        features = [self._features(text) for text in texts]
+
+        document_frequency = np.zeros(self.n_features, dtype=np.float64)
+        for ids, _ in features:
+            document_frequency[ids] += 1
+        self.idf = (np.log((1.0 + len(texts)) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+
+        self.components = None
+        vectors = self._project(features)
+        if self.reduction == 'svd':
+            # 截断SVD：取前 dimension 个右奇异向量
+            _, _, vt = np.linalg.svd(vectors, full_matrices=False)
+            components = np.zeros((self.dimension, self.projection_dim), dtype=np.float32)
+            components[:min(self.dimension, len(vt))] = vt[:self.dimension]
+            self.components = components
+            vectors = vectors @ components.T
+
+        return vectors.astype(np.float32, copy=False)
+
+    def encode(self, texts, show_progress_bar: bool = False, **kwargs) -> "np.ndarray":
+        """编码文本为向量，需要先通过 fit / fit_transform 在语料上拟合
+
+        Raises:
+            RuntimeError: 模型尚未拟合
+        """
+        if not self.is_fitted:
+            raise RuntimeError("model is not fitted")
+        if isinstance(texts, str):
+            texts = [texts]
+        texts = list(texts)
+
+        vectors = self._project(self._features(text) for text in texts)
+        if self.reduction == 'svd':
+            vectors = vectors @ self.components.T
+        return vectors.astype(np.float32, copy=False)
+
+    def save(self, path: Path):
+        """保存拟合状态"""
+        np.savez(
+            path,
+            config=np.array([self.dimension, self.n_features, self.ngram_range[0], self.ngram_range[1],
+                             self.projection_dim, self.seed], dtype=np.int64),
+            reduction=np.array(self.reduction),
+            word_weight=np.array(self.word_weight),
+            idf=self.idf,
+            components=self.components if self.components is not None else np.empty((0, 0), dtype=np.float32),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> 'HashingEmbeddingModel':
+        """加载拟合状态"""
+        with np.load(path) as data:
+            dimension, n_features, ngram_min, ngram_max, projection_dim, seed = (int(v) for v in data['config'])
+            model = cls(dimension, str(data['reduction']), n_features, (ngram_min, ngram_max),
+                        float(data['word_weight']), projection_dim, seed)
+            model.idf = data['idf']
+            if model.reduction == 'svd':
+                model.components = data['components']
+        return model
+
+    def _init_projection(self):
+        # 每个哈希特征映射到一个输出维度并带随机符号（稀疏随机投影）
+        rng = np.random.default_rng(self.seed)
+        self._projection_index = rng.integers(0, self.projection_dim, self.n_features)
+        self._projection_sign = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), self.n_features)
+
+    def _features(self, text: str) -> Tuple["np.ndarray", "np.ndarray"]:
+        """返回文本的 (特征ID, 词频权重)，特征ID已去重"""
+        ids = [self._char_ngram_hashes(text)]
+        weights = [np.ones(len(ids[0]), dtype=np.float32)]
+
+        words = Counter(word.lower() for word in _WORD_RE.findall(text))
+        if words:
+            word_ids = np.fromiter((zlib.crc32(word.encode('utf-8')) for word in words), dtype=np.uint64, count=len(words))
+            ids.append(word_ids)
+            weights.append(np.fromiter(words.values(), dtype=np.float32, count=len(words)) * self.word_weight)
+
+        all_ids = (np.concatenate(ids) % np.uint64(self.n_features)).astype(np.int64)
+        all_weights = np.concatenate(weights)
+        unique_ids, inverse = np.unique(all_ids, return_inverse=True)
+        counts = np.bincount(inverse, weights=all_weights)
+        # 次线性词频
+        return unique_ids, (1.0 + np.log(counts)).astype(np.float32)
+
+    def _char_ngram_hashes(self, text: str) -> "np.ndarray":
+        normalized = _WHITESPACE_RE.sub(' ', text.lower()).encode('utf-8')
+        data = np.frombuffer(normalized, dtype=np.uint8).astype(np.uint64)
+
+        hashes = []
+        # h_n[i] = h_{n-1}[i] * base + data[i+n-1]，逐级递推得到所有长度的 n-gram 哈希
+        rolling = data
+        for n in range(2, self.ngram_range[1] + 1):
+            if len(data) < n:
+                break
+            rolling = rolling[:-1] * np.uint64(_HASH_BASE) + data[n - 1:]
+            if n >= self.ngram_range[0]:
+                # 混入 n 并折叠高位，避免不同长度的 n-gram 集中在同一区间
+                mixed = rolling * np.uint64(0x9E3779B97F4A7C15) + np.uint64(n)
+                hashes.append(mixed ^ (mixed >> np.uint64(29)))
+
+        return np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64)
+
+    def _project(self, features: Iterable[Tuple["np.ndarray", "np.ndarray"]]) -> "np.ndarray":
+        rows = []
+        for ids, tf in features:
+            weights = tf * self.idf[ids] * self._projection_sign[ids]
+            row = np.bincount(self._projection_index[ids], weights=weights, minlength=self.projection_dim)
+            norm = np.linalg.norm(row)
+            rows.append(row / norm if norm > 0 else row)
+        if not rows:
+            return np.empty((0, self.projection_dim), dtype=np.float32)
+        return np.vstack(rows).astype(np.float32)
+
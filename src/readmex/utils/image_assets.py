@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网站图片资源处理模块
+
+将项目中的图片缩放后复制到网站目录：
+- 按源文件内容哈希和目标尺寸缓存，源图片未变化且输出仍存在时跳过（大小和修改时间未变时不再读取文件计算哈希）
+- 需要处理的图片较多时分发到进程池执行
+- 一次解码同时输出原格式和可选的WebP格式
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from readmex.utils.parallel import map_in_processes
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# 清单格式版本，处理逻辑变化时递增以重新处理所有图片
+ASSET_MANIFEST_VERSION = 1
+
+# 可以缩放的位图格式，其他格式（SVG、GIF等）直接复制
+RESIZABLE_SUFFIXES = {'.png', '.jpg', '.jpeg'}
+
+# 启用进程池的最小图片数
+PARALLEL_IMAGE_THRESHOLD = 4
+
+# (源文件, 目标文件, 最大高度或None表示直接复制, 是否同时输出WebP)
+ImageJob = Tuple[str, str, Optional[int], bool]
+
+
+def process_image(job: ImageJob) -> Dict:
+    """进程池任务：解码一次图片，按最大高度缩放后保存为原格式（和WebP）
+
+    PIL不可用或处理失败时直接复制源文件；复制也失败时 outputs 为空。
+    """
+    source, dest, max_height, webp = job
+    result = {'dest': dest, 'outputs': [dest], 'resized': None, 'error': None}
+    try:
+        if max_height is None or Image is None:
+            shutil.copy2(source, dest)
+            if max_height is not None:
+                result['error'] = "PIL未安装，无法调整图片大小，直接复制"
+            return result
+
+        with Image.open(source) as img:
+            original_width, original_height = img.size
+            if original_height > max_height:
+                ratio = max_height / original_height
+                new_size = (int(original_width * ratio), max_height)
+                output = img.resize(new_size, Image.Resampling.LANCZOS)
+                result['resized'] = [original_width, original_height, new_size[0], new_size[1]]
+            else:
+                output = img
+                output.load()
+
+            output.save(dest, optimize=True, quality=95)
+            if webp:
+                webp_dest = str(Path(dest).with_suffix('.webp'))
+                output.save(webp_dest, 'WEBP', quality=90, method=4)
+                result['outputs'].append(webp_dest)
+    except Exception as e:
+        try:
+            shutil.copy2(source, dest)
+        except OSError as copy_error:
+            return {'dest': dest, 'outputs': [], 'resized': None, 'error': str(copy_error)}
+        result['error'] = f"图片调整失败，直接复制: {e}"
+    return result
+
+
+class ImageAssetPipeline:
+    """带缓存的图片资源处理流水线
+
+    Args:
+        manifest_file: 处理记录文件（源文件哈希、目标尺寸和输出文件）
+        webp: 是否为缩放后的位图额外输出WebP
+    """
+
+    def __init__(self, manifest_file: Path, webp: bool = False):
+        self.manifest_file = Path(manifest_file)
+        self.webp = webp
+        self._lock = threading.Lock()
+        # 源文件 -> 大小、修改时间和内容哈希；目标文件 -> 生成它的输入和输出文件列表
+        self._sources: Dict[str, Dict] = {}
+        self._outputs: Dict[str, Dict] = {}
+        self._load()
+
+    def process(self, images: Sequence[Tuple[Path, Path, Optional[int]]], max_workers: int = None,
+                console=None) -> Tuple[List[Dict], List[str]]:
+        """处理 (源文件, 目标文件, 最大高度) 列表，同一目标文件以最后一项为准
+
+        单个图片读取或复制失败不影响其他图片：其结果的 outputs 为空、error 为原因。
+        只记录没有错误的结果，出错的图片下次重新处理。
+
+        Returns:
+            Tuple[List[Dict], List[str]]: 本次处理的结果，以及因未变化而跳过的目标文件
+        """
+        jobs: Dict[str, Tuple[Path, Optional[int]]] = {}
+        for source, dest, max_height in images:
+            source = Path(source)
+            if source.suffix.lower() not in RESIZABLE_SUFFIXES:
+                max_height = None
+            jobs[str(dest)] = (source, max_height)
+
+        skipped, pending, failed = [], [], []
+        with self._lock:
+            for dest, (source, max_height) in jobs.items():
+                webp = self.webp and max_height is not None
+                try:
+                    sha256 = self._source_hash(source)
+                except OSError as e:
+                    failed.append({'dest': dest, 'outputs': [], 'resized': None, 'error': str(e)})
+                    continue
+                inputs = {'sha256': sha256, 'max_height': max_height, 'webp': webp}
+                if self._is_fresh(dest, inputs):
+                    skipped.append(dest)
+                else:
+                    pending.append(((str(source), dest, max_height, webp), inputs))
+
+        for job, _ in pending:
+            Path(job[1]).parent.mkdir(parents=True, exist_ok=True)
+        results = map_in_processes(process_image, [job for job, _ in pending], PARALLEL_IMAGE_THRESHOLD,
+                                   max_workers=max_workers, console=console)
+
+        with self._lock:
+            for (job, inputs), result in zip(pending, results):
+                if result['error'] is None:
+                    self._outputs[job[1]] = dict(inputs, outputs=result['outputs'])
+                else:
+                    self._outputs.pop(job[1], None)
+            self._save()
+        return failed + results, skipped
+
+    def _source_hash(self, source: Path) -> str:
+        """源文件内容哈希，大小和修改时间未变时沿用记录中的哈希，避免重复读取大文件"""
+        stat = source.stat()
+        key = str(source.resolve())
+        previous = self._sources.get(key, {})
+        if previous.get('size') == stat.st_size and previous.get('mtime_ns') == stat.st_mtime_ns:
+            return previous['sha256']
+        sha256 = _file_hash(source)
+        self._sources[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+        return sha256
+
+    def _is_fresh(self, dest: str, inputs: Dict) -> bool:
+        entry = self._outputs.get(dest)
+        if not entry or any(entry.get(key) != value for key, value in inputs.items()):
+            return False
+        return all(os.path.exists(output) for output in entry.get('outputs', []))
+
+    def _load(self):
+        try:
+            data = json.loads(self.manifest_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get('version') != ASSET_MANIFEST_VERSION:
+            return
+        self._sources = dict(data.get('sources', {}))
+        self._outputs = dict(data.get('outputs', {}))
+
+    def _save(self):
+        data = {
+            'version': ASSET_MANIFEST_VERSION,
+            'sources': dict(sorted(self._sources.items())),
+            'outputs': dict(sorted(self._outputs.items())),
+        }
+        try:
+            self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.manifest_file.with_suffix('.tmp')
+            tmp_file.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
+            tmp_file.replace(self.manifest_file)
+        except OSError:
+            # 记录写入失败只会导致下次重新处理
+            pass
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网站页面指纹清单
+
+为每个生成的页面记录其输入（prompt、RAG上下文、API定义与上下文等）的指纹，
+再次生成网站时只重新生成指纹变化的页面，未变化的页面既不调用模型也不重写文件。
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 清单格式版本，页面生成逻辑变化时递增以使所有页面重新生成
+PAGE_MANIFEST_VERSION = 1
+
+
+def fingerprint(*parts: Any) -> str:
+    """计算页面输入的指纹，parts 需可JSON序列化（集合等按排序后的列表处理）"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha256(payload.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+def _json_default(value: Any):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, Path):
+        return str(value)
+    return repr(value)
+
+
+class PageManifest:
+    """页面指纹清单，线程安全，保存在网站输出目录中
+
+    Args:
+        manifest_file: 清单文件路径
+        pages_dir: 页面所在目录（页面名称相对于该目录）
+    """
+
+    def __init__(self, manifest_file: Path, pages_dir: Path):
+        self.manifest_file = Path(manifest_file)
+        self.pages_dir = Path(pages_dir)
+        self._lock = threading.Lock()
+        self._pages: Dict[str, str] = self._load()
+        # 本次运行生成或确认未变化的页面
+        self._seen = set()
+
+    def is_fresh(self, page: str, page_fingerprint: str) -> bool:
+        """页面输入未变化且页面文件仍存在时返回True；无论结果如何都记为本次已处理的页面"""
+        with self._lock:
+            self._seen.add(page)
+            return self._pages.get(page) == page_fingerprint and (self.pages_dir / page).exists()
+
+    def record(self, page: str, page_fingerprint: str):
+        with self._lock:
+            self._pages[page] = page_fingerprint
+            self._seen.add(page)
+
+    def prune(self, prefix: str = '') -> List[str]:
+        """移除以 prefix 开头、本次运行未生成的页面记录，返回被移除的页面名称"""
+        with self._lock:
+            stale = [page for page in self._pages if page.startswith(prefix) and page not in self._seen]
+            for page in stale:
+                del self._pages[page]
+            return stale
+
+    def save(self):
+        with self._lock:
+            data = {'version': PAGE_MANIFEST_VERSION, 'pages': dict(sorted(self._pages.items()))}
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.manifest_file.with_suffix('.tmp')
+        tmp_file.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
+        tmp_file.replace(self.manifest_file)
+
+    def _load(self) -> Dict[str, str]:
+        try:
+            data = json.loads(self.manifest_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != PAGE_MANIFEST_VERSION:
+            return {}
+        return dict(data.get('pages', {}))
+
+
+def page_unchanged(file_path: Path, content: str) -> bool:
+    """页面文件已存在且内容与 content 相同"""
+    try:
+        return Path(file_path).read_text(encoding='utf-8') == content
+    except (OSError, UnicodeDecodeError):
+        return False
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程文件处理工具
+
+AST解析等CPU密集型的逐文件处理在文件数量超过阈值时分发到进程池执行，
+结果按输入顺序返回，保证合并结果确定。
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def map_in_processes(
+    worker: Callable[[T], R],
+    tasks: Sequence[T],
+    threshold: int,
+    max_workers: Optional[int] = None,
+    console=None,
+) -> List[R]:
+    """按输入顺序对 tasks 执行 worker
+
+    任务数不小于 threshold 时使用进程池，否则在当前进程串行执行。进程池不可用
+    （如受限环境无法创建子进程）时自动回退到串行执行。
+
+    Args:
+        worker: 模块级可pickle的函数
+        tasks: 任务参数列表（需可pickle）
+        threshold: 启用进程池的最小任务数，<=0 表示禁用进程池
+        max_workers: 最大进程数，默认CPU核数
+        console: 可选的rich Console，用于输出回退提示
+
+    Returns:
+        List: 与 tasks 一一对应的结果
+    """
+    tasks = list(tasks)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if threshold <= 0 or len(tasks) < threshold or max_workers <= 1:
+        return [worker(task) for task in tasks]
+
+    workers = min(max_workers, len(tasks))
+    chunksize = max(1, len(tasks) // (workers * 4))
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(worker, tasks, chunksize=chunksize))
+    except Exception as e:
+        if console is not None:
+            console.print(f"[yellow]进程池执行失败，回退到串行处理: {e}[/yellow]")
+        return [worker(task) for task in tasks]
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微批处理查询引擎
+
+网站生成时多个页面线程会同时发起语义检索。本模块把短时间窗口内到达的并发查询
+合并为一次批量编码和一次批量索引检索，再把结果分发回各个等待的调用方，
+同时按查询文本缓存查询向量。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class _PendingQuery:
+    """等待处理的单个查询"""
+
+    __slots__ = ('query', 'top_k', 'scores', 'indices', 'error', 'done')
+
+    def __init__(self, query: str, top_k: int):
+        self.query = query
+        self.top_k = top_k
+        self.scores = None
+        self.indices = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+
+    def result(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        if self.error is not None:
+            raise self.error
+        return self.scores, self.indices
+
+
+class BatchedQueryEngine:
+    """线程安全的微批处理查询引擎
+
+    采用 leader/follower 模式：第一个到达的线程成为 leader，等待 batch_window 秒
+    收集并发查询后统一处理；其他线程阻塞等待结果。同一时刻只有一个批次在执行，
+    因此共享的嵌入模型和索引不会被并发调用。
+
+    Args:
+        encode_fn: 批量编码函数，输入查询文本列表，返回 (n, dim) 向量矩阵
+        search_fn: 批量检索函数，输入 (n, dim) 查询矩阵和 top_k，返回 (scores, indices)，
+            两者形状均为 (n, top_k)
+        batch_window: 收集并发查询的时间窗口（秒）
+        max_batch_size: 单批最大查询数
+        cache_size: 查询向量LRU缓存容量
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], "np.ndarray"],
+        search_fn: Callable[["np.ndarray", int], Tuple["np.ndarray", "np.ndarray"]],
+        batch_window: float = 0.005,
+        max_batch_size: int = 32,
+        cache_size: int = 1024,
+    ):
+        self.encode_fn = encode_fn
+        self.search_fn = search_fn
+        self.batch_window = batch_window
+        self.max_batch_size = max(1, max_batch_size)
+        self.cache_size = cache_size
+
+        self._cond = threading.Condition()
+        self._queue: List[_PendingQuery] = []
+        self._leader_active = False
+
+        self._embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # 统计信息
+        self.batches_processed = 0
+        self.queries_processed = 0
+        self.cache_hits = 0
+
+    def search(self, query: str, top_k: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        """提交一个查询并阻塞等待结果
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: 该查询的 (scores, indices)，长度不超过 top_k
+        """
+        item = _PendingQuery(query, top_k)
+        with self._cond:
+            self._queue.append(item)
+            self._cond.notify_all()
+
+        while True:
+            with self._cond:
+                while not item.done and self._leader_active:
+                    self._cond.wait()
+                if item.done:
+                    return item.result()
+                self._leader_active = True
+
+            try:
+                batch = self._collect_batch()
+                if batch:
+                    self._process_batch(batch)
+            finally:
+                with self._cond:
+                    self._leader_active = False
+                    self._cond.notify_all()
+
+    def encode(self, queries: List[str]) -> "np.ndarray":
+        """编码查询文本，命中缓存的查询不会重复编码"""
+        vectors = [None] * len(queries)
+        missing = {}
+
+        with self._cache_lock:
+            for i, query in enumerate(queries):
+                cached = self._embedding_cache.get(query)
+                if cached is not None:
+                    self._embedding_cache.move_to_end(query)
+                    vectors[i] = cached
+                    self.cache_hits += 1
+                else:
+                    missing.setdefault(query, []).append(i)
+
+        if missing:
+            texts = list(missing)
+            encoded = np.asarray(self.encode_fn(texts), dtype=np.float32)
+            if encoded.ndim == 1:
+                encoded = encoded.reshape(1, -1)
+
+            with self._cache_lock:
+                for text, vector in zip(texts, encoded):
+                    for i in missing[text]:
+                        vectors[i] = vector
+                    self._embedding_cache[text] = vector
+                    self._embedding_cache.move_to_end(text)
+                while len(self._embedding_cache) > self.cache_size:
+                    self._embedding_cache.popitem(last=False)
+
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    def clear_cache(self):
+        """清空查询向量缓存"""
+        with self._cache_lock:
+            self._embedding_cache.clear()
+
+    def _collect_batch(self) -> List[_PendingQuery]:
+        """在时间窗口内收集待处理查询"""
+        deadline = time.monotonic() + self.batch_window
+        with self._cond:
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._queue[:self.max_batch_size]
+            del self._queue[:self.max_batch_size]
+            return batch
+
+    def _process_batch(self, batch: List[_PendingQuery]):
+        """批量编码并检索，然后把结果分发给每个查询"""
+        try:
+            query_vectors = self.encode([item.query for item in batch])
+            max_top_k = max(item.top_k for item in batch)
+            scores, indices = self.search_fn(query_vectors, max_top_k)
+
+            for row, item in enumerate(batch):
+                item.scores = scores[row][:item.top_k]
+                item.indices = indices[row][:item.top_k]
+        except Exception as e:
+            for item in batch:
+                item.error = e
+        finally:
+            self.batches_processed += 1
+            self.queries_processed += len(batch)
+            with self._cond:
+                for item in batch:
+                    item.done = True
+                self._cond.notify_all()
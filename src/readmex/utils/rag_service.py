@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+代码RAG常驻查询服务
+
+每次生成网站都会重新创建 CodeRAG、加载缓存和嵌入模型，进程退出后全部丢弃。
+`readmex rag serve` 在一个进程中常驻项目的代码块、关系图、向量索引和嵌入模型，
+通过 localhost HTTP 提供检索、相关代码块和增强prompt接口：
+
+    GET  /health   服务状态（项目目录、模型、源文件指纹）
+    POST /search   {"query", "top_k", "min_score"}
+    POST /related  {"block_id", "relation_types", "max_depth"}
+    POST /prompt   {"base_prompt", "query", "max_context_blocks", "token_budget"}
+    POST /refresh  源文件变化时增量重建索引
+
+服务启动后在RAG缓存目录写入 rag_service.json，使用同一缓存目录的 CodeRAG
+通过 connect_rag_service 自动发现并透明地使用该服务。
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+
+# 服务状态文件，写在RAG缓存目录中供客户端发现服务
+SERVICE_FILE_NAME = "rag_service.json"
+
+
+class _ReadWriteLock:
+    """查询并发执行，重建索引时独占"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        with self._condition:
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writing = True
+
+    def release_write(self):
+        with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+
+
+class RAGServer:
+    """代码RAG常驻服务
+
+    Args:
+        rag: 已创建的 CodeRAG（或 ShardedCodeRAG）实例
+        host: 监听地址，默认仅本机
+        port: 监听端口，0 表示随机端口
+        idle_timeout: 空闲多少秒后自动退出，<=0 表示不退出
+    """
+
+    def __init__(self, rag, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, idle_timeout: float = 0):
+        self.rag = rag
+        # 服务端自身不能再把请求转发给服务
+        self.rag.use_rag_service = False
+        self.idle_timeout = idle_timeout
+        self.state_file = Path(rag.cache_dir) / SERVICE_FILE_NAME
+        self.fingerprint: Optional[str] = None
+        self.vector_ready = False
+
+        self._lock = _ReadWriteLock()
+        self._activity_lock = threading.Lock()
+        self._active_requests = 0
+        self._last_activity = time.monotonic()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._serve_thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def prepare(self):
+        """提取代码块并构建向量索引（使用缓存时只加载未变化的部分）"""
+        self._lock.acquire_write()
+        try:
+            self._build()
+        finally:
+            self._lock.release_write()
+
+    def start(self) -> threading.Thread:
+        """在后台线程中提供服务并写入状态文件，返回服务线程"""
+        if self.fingerprint is None:
+            self.prepare()
+        self._serve_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._serve_thread.start()
+        self._write_state_file()
+        return self._serve_thread
+
+    def serve_forever(self):
+        """提供服务，直到空闲超时或被中断"""
+        thread = self.start()
+        try:
+            if self.idle_timeout and self.idle_timeout > 0:
+                self._watch_idle()
+            else:
+                while thread.is_alive():
+                    thread.join(1.0)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        if self._serve_thread is not None:
+            self.httpd.shutdown()
+            self._serve_thread = None
+        self.httpd.server_close()
+        self._remove_state_file()
+
+    def refresh(self) -> bool:
+        """源文件变化时增量重建索引，返回是否发生了重建"""
+        self._lock.acquire_write()
+        try:
+            if self.rag._compute_source_fingerprint() == self.fingerprint:
+                return False
+            self._build()
+            return True
+        finally:
+            self._lock.release_write()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "project_dir": str(Path(self.rag.project_dir).resolve()),
+            "model": self.rag.model_name,
+            "fingerprint": self.fingerprint,
+            "vector_ready": self.vector_ready,
+            "blocks": len(self.rag.code_blocks),
+            "pid": os.getpid(),
+        }
+
+    def _build(self):
+        fingerprint = self.rag._compute_source_fingerprint()
+        self.rag.extract_code_blocks()
+        self.vector_ready = self.rag.build_embeddings()
+        self.fingerprint = fingerprint
+
+    def _handle(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if path == "/refresh":
+            return {"refreshed": self.refresh(), "fingerprint": self.fingerprint}
+
+        self._lock.acquire_read()
+        try:
+            if path == "/search":
+                results = self.rag.semantic_search(
+                    payload["query"],
+                    top_k=payload.get("top_k", 5),
+                    min_score=payload.get("min_score", 0.3)
+                )
+                return {"results": [{"block": asdict(block), "score": float(score)} for block, score in results]}
+            if path == "/related":
+                blocks = self.rag.get_related_blocks(
+                    payload["block_id"],
+                    relation_types=payload.get("relation_types"),
+                    max_depth=payload.get("max_depth", 2)
+                )
+                return {"blocks": [asdict(block) for block in blocks]}
+            if path == "/prompt":
+                prompt = self.rag.generate_enhanced_prompt(
+                    payload["base_prompt"],
+                    payload["query"],
+                    max_context_blocks=payload.get("max_context_blocks", 10),
+                    token_budget=payload.get("token_budget")
+                )
+                return {"prompt": prompt}
+        finally:
+            self._lock.release_read()
+
+    def _write_state_file(self):
+        state = dict(self.status(), url=self.base_url)
+        tmp_file = self.state_file.with_suffix('.tmp')
+        tmp_file.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        tmp_file.replace(self.state_file)
+
+    def _remove_state_file(self):
+        # 只删除本进程写入的状态文件
+        try:
+            state = json.loads(self.state_file.read_text(encoding="utf-8"))
+            if state.get("pid") == os.getpid():
+                self.state_file.unlink()
+        except (OSError, ValueError):
+            pass
+
+    def _touch(self):
+        with self._activity_lock:
+            self._last_activity = time.monotonic()
+
+    def _watch_idle(self):
+        interval = min(5.0, self.idle_timeout / 2.0)
+        while True:
+            time.sleep(interval)
+            with self._activity_lock:
+                idle = time.monotonic() - self._last_activity
+                if self._active_requests == 0 and idle >= self.idle_timeout:
+                    break
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/health":
+                    self.send_error(404)
+                    return
+                self._send_json(server.status())
+
+            def do_POST(self):
+                if self.path not in ("/search", "/related", "/prompt", "/refresh"):
+                    self.send_error(404)
+                    return
+
+                with server._activity_lock:
+                    server._active_requests += 1
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    self._send_json(server._handle(self.path, payload))
+                except Exception as e:
+                    self.send_error(500, str(e))
+                finally:
+                    with server._activity_lock:
+                        server._active_requests -= 1
+                    server._touch()
+
+            def _send_json(self, data):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class RAGServiceClient:
+    """RAG常驻服务客户端，返回代码块的字典形式"""
+
+    def __init__(self, base_url: str, timeout: float = 120):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def health(self) -> Optional[dict]:
+        """返回服务状态，服务不可达时返回None"""
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/health", timeout=2) as response:
+                return json.loads(response.read())
+        except (OSError, ValueError):
+            return None
+
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.3) -> List[Dict[str, Any]]:
+        return self._post("/search", {"query": query, "top_k": top_k, "min_score": min_score})["results"]
+
+    def related(self, block_id: str, relation_types: List[str] = None, max_depth: int = 2) -> List[Dict[str, Any]]:
+        payload = {"block_id": block_id, "relation_types": relation_types, "max_depth": max_depth}
+        return self._post("/related", payload)["blocks"]
+
+    def prompt(self, base_prompt: str, query: str, max_context_blocks: int = 10, token_budget: int = None) -> str:
+        payload = {
+            "base_prompt": base_prompt,
+            "query": query,
+            "max_context_blocks": max_context_blocks,
+            "token_budget": token_budget,
+        }
+        return self._post("/prompt", payload)["prompt"]
+
+    def refresh(self) -> Dict[str, Any]:
+        return self._post("/refresh", {})
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+
+def connect_rag_service(cache_dir: Path, project_dir: Path, model_name: str,
+                        fingerprint: str) -> Optional[RAGServiceClient]:
+    """连接使用同一缓存目录的RAG常驻服务
+
+    服务的源文件指纹与调用方不一致时先请求服务增量重建索引。
+
+    Returns:
+        Optional[RAGServiceClient]: 服务可用且项目、模型、源文件一致时返回客户端，否则返回None
+    """
+    state_file = Path(cache_dir) / SERVICE_FILE_NAME
+    try:
+        state = json.loads(state_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    client = RAGServiceClient(state.get("url", f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"))
+    status = client.health()
+    if status is None:
+        return None
+    if status.get("project_dir") != str(Path(project_dir).resolve()) or status.get("model") != model_name:
+        return None
+    if not status.get("vector_ready"):
+        return None
+
+    if status.get("fingerprint") != fingerprint:
+        try:
+            if client.refresh().get("fingerprint") != fingerprint:
+                return None
+        except (OSError, ValueError):
+            return None
+
+    return client
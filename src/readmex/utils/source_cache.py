@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+源文件解析缓存模块
+
+一次网站构建中 CodeRAG 和 WebsiteGenerator 都需要读取并解析项目中的Python文件。
+本模块为每个文件只做一次读取、一次解析和一次行偏移表计算，供所有提取器共享；
+提取器的派生结果按文件内容哈希持久化到磁盘，文件未变化时后续运行无需再解析。
+"""
+
+import ast
+import hashlib
+import json
+import os
+import pickle
+import threading
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from readmex.utils.parallel import map_in_processes
+
+
+class ParsedSource:
+    """单个源文件的共享解析结果"""
+
+    __slots__ = ('path', 'content', 'content_hash', 'lines', 'line_offsets', '_tree', '_lock')
+
+    def __init__(self, path: str, content: str):
+        self.path = path
+        self.content = content
+        self.content_hash = hashlib.sha1(content.encode('utf-8', errors='surrogatepass')).hexdigest()
+        self.lines = content.split('\n')
+        # 每行首字符在 content 中的偏移
+        self.line_offsets = [0] + list(accumulate(len(line) + 1 for line in self.lines))
+        self._tree: Optional[ast.AST] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path) -> 'ParsedSource':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(str(path), f.read())
+
+    @property
+    def tree(self) -> ast.AST:
+        """延迟解析的AST，同一文件只解析一次"""
+        if self._tree is None:
+            with self._lock:
+                if self._tree is None:
+                    self._tree = ast.parse(self.content)
+        return self._tree
+
+    def segment(self, start_line: int, end_line: int) -> str:
+        """获取 [start_line, end_line] 行（1起始，含两端）的源码"""
+        start_line = max(1, start_line)
+        end_line = min(len(self.lines), end_line)
+        if end_line < start_line:
+            return ''
+        return self.content[self.line_offsets[start_line - 1]:self.line_offsets[end_line] - 1]
+
+
+class SourceCache:
+    """按路径共享的源文件解析缓存，派生结果按内容哈希持久化
+
+    Args:
+        cache_dir: 磁盘缓存目录，为None时只使用内存缓存
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) / "source_cache" if cache_dir else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._sources: Dict[str, ParsedSource] = {}
+        # path -> 读取时的 (大小, 修改时间)，用于发现常驻进程运行期间被修改的文件
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        # content_hash -> {key: 派生结果}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._dirty: set = set()
+        self._lock = threading.RLock()
+
+    def get(self, path) -> ParsedSource:
+        """获取文件的共享解析结果（文件大小和修改时间未变时只读取一次）"""
+        path = str(path)
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            source = self._sources.get(path)
+            if source is None or self._stats.get(path) != signature:
+                source = ParsedSource.from_file(path)
+                self._sources[path] = source
+                self._stats[path] = signature
+            return source
+
+    def lookup(self, path, key: str) -> Tuple[bool, Any]:
+        """查找文件的派生结果
+
+        Returns:
+            Tuple[bool, Any]: (是否命中, 结果)
+        """
+        try:
+            content_hash = self.get(path).content_hash
+        except (OSError, UnicodeDecodeError):
+            return False, None
+
+        results = self._load_results(content_hash)
+        if key in results:
+            return True, results[key]
+        return False, None
+
+    def store(self, path, key: str, value: Any):
+        """保存文件的派生结果"""
+        try:
+            content_hash = self.get(path).content_hash
+        except (OSError, UnicodeDecodeError):
+            return
+
+        with self._lock:
+            self._load_results(content_hash)[key] = value
+            self._dirty.add(content_hash)
+
+    def map_extract(
+        self,
+        tasks: Sequence[tuple],
+        key_fn: Callable[[tuple], str],
+        local_fn: Callable[[tuple], Any],
+        worker: Callable[[tuple], Any],
+        threshold: int,
+        console=None,
+    ) -> List[Any]:
+        """对一组文件执行提取，结果与 tasks 顺序一致
+
+        每个任务的第一个元素为文件路径。命中缓存的文件直接返回结果；未命中的文件数量
+        达到 threshold 时交给进程池中的 worker 处理，否则在当前进程用 local_fn 处理
+        （local_fn 应通过 get() 使用共享的解析结果）。新结果写回缓存。
+        """
+        results: List[Any] = [None] * len(tasks)
+        pending = []
+
+        for i, task in enumerate(tasks):
+            found, value = self.lookup(task[0], key_fn(task))
+            if found:
+                results[i] = value
+            else:
+                pending.append(i)
+
+        if pending:
+            if 0 < threshold <= len(pending):
+                computed = map_in_processes(worker, [tasks[i] for i in pending], threshold, console=console)
+            else:
+                computed = [local_fn(tasks[i]) for i in pending]
+
+            for i, value in zip(pending, computed):
+                results[i] = value
+                self.store(tasks[i][0], key_fn(tasks[i]), value)
+
+            self.flush()
+
+        return results
+
+    def flush(self):
+        """将新增的派生结果写入磁盘，并删除不再对应任何源文件的缓存文件"""
+        if self.cache_dir is None:
+            return
+
+        with self._lock:
+            dirty = list(self._dirty)
+            self._dirty.clear()
+
+            for content_hash in dirty:
+                cache_file = self._cache_file(content_hash)
+                tmp_file = cache_file.with_suffix('.tmp')
+                try:
+                    with open(tmp_file, 'wb') as f:
+                        pickle.dump(self._results[content_hash], f)
+                    os.replace(tmp_file, cache_file)
+                except Exception:
+                    if tmp_file.exists():
+                        tmp_file.unlink()
+
+            self._prune()
+
+    def _prune(self):
+        """删除过期的缓存文件
+
+        索引文件记录每个源文件最近一次的内容哈希（跨运行保留，分片等只读取部分文件的
+        运行不会误删其他文件的缓存）。文件内容变化或文件被删除后，旧哈希的缓存文件被删除。
+        """
+        index_file = self.cache_dir / "index.json"
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+
+        updated = {path: source.content_hash for path, source in self._sources.items()}
+        updated.update((path, content_hash) for path, content_hash in index.items()
+                       if path not in updated and os.path.exists(path))
+        if updated != index:
+            tmp_file = index_file.with_suffix('.tmp')
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(updated, f)
+                os.replace(tmp_file, index_file)
+            except OSError:
+                return
+
+        live = set(updated.values())
+        for cache_file in self.cache_dir.glob('*.pkl'):
+            if cache_file.stem not in live:
+                try:
+                    cache_file.unlink()
+                except OSError:
+                    pass
+                self._results.pop(cache_file.stem, None)
+
+    def clear(self):
+        """清除内存和磁盘缓存"""
+        with self._lock:
+            self._sources.clear()
+            self._stats.clear()
+            self._results.clear()
+            self._dirty.clear()
+            if self.cache_dir is not None and self.cache_dir.exists():
+                for cache_file in self.cache_dir.glob('*.pkl'):
+                    cache_file.unlink()
+                index_file = self.cache_dir / "index.json"
+                if index_file.exists():
+                    index_file.unlink()
+
+    def _cache_file(self, content_hash: str) -> Path:
+        return self.cache_dir / f"{content_hash}.pkl"
+
+    def _load_results(self, content_hash: str) -> Dict[str, Any]:
+        with self._lock:
+            results = self._results.get(content_hash)
+            if results is None:
+                results = {}
+                if self.cache_dir is not None:
+                    cache_file = self._cache_file(content_hash)
+                    if cache_file.exists():
+                        try:
+                            with open(cache_file, 'rb') as f:
+                                results = pickle.load(f)
+                        except Exception:
+                            results = {}
+                self._results[content_hash] = results
+            return results
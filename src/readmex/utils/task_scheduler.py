@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全局优先级任务调度器
+
+网站生成的所有工作单元（首页各部分、各页面、API页面、架构图）都提交到同一个
+调度器：固定数量的工作线程按优先级（耗时长的任务优先）取任务执行，整个生成过程
+只有一个全局并发上限。
+
+任务可以提交子任务并等待其完成。工作线程在等待期间只执行所等待的任务及其子任务
+（这些任务完成后立即返回，不会被无关的长任务拖住），没有可执行的相关任务时阻塞，
+由其他工作线程执行队列中的其他任务，因此嵌套等待不会死锁。
+"""
+
+import heapq
+import itertools
+import threading
+from typing import Any, Callable, Iterable, List, Optional
+
+
+class ScheduledTask:
+    """调度器中的单个任务"""
+
+    def __init__(self, name: str, func: Callable, args: tuple, kwargs: dict,
+                 priority: int, stage: Optional[int], parent: Optional['ScheduledTask'] = None):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.stage = stage
+        # 提交该任务的任务（在任务外提交时为None）
+        self.parent = parent
+        self.error: Optional[BaseException] = None
+        self._result: Any = None
+        self._done = threading.Event()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def result(self) -> Any:
+        """等待任务完成并返回结果，任务失败时重新抛出其异常"""
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self._result
+
+    def _run(self):
+        try:
+            self._result = self.func(*self.args, **self.kwargs)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+
+class TaskScheduler:
+    """带优先级和全局并发上限的线程调度器
+
+    Args:
+        max_workers: 工作线程数（全局并发上限）
+        listener: 可选的进度监听器，需实现 task_submitted / task_started / task_finished
+            三个接收 ScheduledTask 的方法（如 ProgressTracker）
+    """
+
+    def __init__(self, max_workers: int, listener=None):
+        self.max_workers = max(1, max_workers)
+        self.listener = listener
+        self._queue: List = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._pending = 0
+        self._closed = False
+        self._local = threading.local()
+
+    def __enter__(self) -> 'TaskScheduler':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def submit(self, name: str, func: Callable, *args, priority: Optional[int] = None,
+               stage: Optional[int] = None, **kwargs) -> ScheduledTask:
+        """提交任务，priority 越大越先执行；在任务内提交的子任务默认继承当前任务的优先级"""
+        current = getattr(self._local, 'task', None)
+        if priority is None:
+            priority = current.priority if current is not None else 0
+
+        task = ScheduledTask(name, func, args, kwargs, priority, stage, current)
+        self._notify('task_submitted', task)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("TaskScheduler is shut down")
+            heapq.heappush(self._queue, (-priority, next(self._sequence), task))
+            self._pending += 1
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker, name=f"task-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._condition.notify()
+        return task
+
+    def map(self, name: str, func: Callable, items: Iterable, priority: Optional[int] = None) -> List[Any]:
+        """并行执行 func(item) 并按输入顺序返回结果"""
+        tasks = [self.submit(f"{name}[{index}]", func, item, priority=priority) for index, item in enumerate(items)]
+        self.wait(tasks)
+        return [task.result() for task in tasks]
+
+    def wait(self, tasks: Iterable[ScheduledTask]):
+        """等待任务完成；在工作线程中调用时，等待期间执行所等待的任务及其子任务"""
+        tasks = list(tasks)
+        if not getattr(self._local, 'is_worker', False):
+            for task in tasks:
+                task._done.wait()
+            return
+
+        awaited = {id(task) for task in tasks}
+        while True:
+            with self._condition:
+                while True:
+                    if all(task.done() for task in tasks):
+                        return
+                    entry = self._pop_related(awaited)
+                    if entry is not None:
+                        break
+                    self._condition.wait()
+            self._execute(entry[2])
+
+    def join(self):
+        """等待所有已提交的任务（包括任务中提交的子任务）完成"""
+        with self._condition:
+            while self._pending:
+                self._condition.wait()
+
+    def shutdown(self):
+        """等待所有任务完成后停止工作线程"""
+        self.join()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _worker(self):
+        self._local.is_worker = True
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                _, _, task = heapq.heappop(self._queue)
+            self._execute(task)
+
+    def _pop_related(self, awaited: set) -> Optional[tuple]:
+        """从队列中取出优先级最高的、属于所等待任务（或其子任务）的条目，需持有锁"""
+        best = None
+        for entry in self._queue:
+            if (best is None or entry < best) and self._is_related(entry[2], awaited):
+                best = entry
+        if best is not None:
+            self._queue.remove(best)
+            heapq.heapify(self._queue)
+        return best
+
+    @staticmethod
+    def _is_related(task: ScheduledTask, awaited: set) -> bool:
+        while task is not None:
+            if id(task) in awaited:
+                return True
+            task = task.parent
+        return False
+
+    def _execute(self, task: ScheduledTask):
+        parent = getattr(self._local, 'task', None)
+        self._local.task = task
+        self._notify('task_started', task)
+        try:
+            task._run()
+        finally:
+            self._local.task = parent
+            self._notify('task_finished', task)
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify_all()
+
+    def _notify(self, event: str, task: ScheduledTask):
+        if self.listener is None:
+            return
+        try:
+            getattr(self.listener, event)(task)
+        except Exception:
+            # 进度显示失败不影响任务执行
+            pass
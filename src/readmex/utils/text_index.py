@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本倒排索引模块
+
+为代码块提供基于BM25评分的文本检索，作为向量检索不可用时的备选方案。
+
+主要功能：
+1. 标识符切分（camelCase / snake_case）与中文二元切分
+2. 支持增量增删文档的倒排索引
+3. 带字段权重的BM25评分
+4. 索引持久化
+"""
+
+import hashlib
+import heapq
+import math
+import pickle
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# 英文标识符、数字、连续中文字符
+_TOKEN_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+|[\u4e00-\u9fff]+')
+# camelCase 切分: HTTPServer -> HTTP, Server; parseJSONData -> parse, JSON, Data
+_CAMEL_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')
+
+
+def tokenize(text: str) -> List[str]:
+    """将文本切分为检索词
+
+    - 标识符保留完整小写形式，同时按 snake_case / camelCase 拆分为子词
+    - 中文按二元组切分（单字保留为一元）
+    - 丢弃长度小于2的英文/数字词，减少噪声
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        List[str]: 检索词列表（可重复，用于统计词频）
+    """
+    if not text:
+        return []
+
+    tokens = []
+    for match in _TOKEN_RE.finditer(text):
+        word = match.group()
+
+        if _CJK_RE.match(word):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+            continue
+
+        whole = word.strip('_').lower()
+        if len(whole) >= 2:
+            tokens.append(whole)
+
+        parts = [
+            part.lower()
+            for chunk in word.split('_') if chunk
+            for part in _CAMEL_RE.findall(chunk)
+        ]
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if len(part) >= 2)
+
+    return tokens
+
+
+class BM25Index:
+    """基于倒排索引的BM25文本检索
+
+    每个文档由多个字段组成（如 name / docstring / content），不同字段的词频
+    按 FIELD_WEIGHTS 加权后合并，实现简化版的BM25F。
+    """
+
+    FIELD_WEIGHTS = {
+        'name': 3.0,
+        'signature': 2.0,
+        'docstring': 2.0,
+        'type': 1.0,
+        'content': 1.0,
+    }
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        # term -> {doc_id: 加权词频}
+        self.postings: Dict[str, Dict[str, float]] = {}
+        # doc_id -> 文档包含的词（用于删除）
+        self.doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.doc_fingerprints: Dict[str, str] = {}
+        self.total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @staticmethod
+    def fingerprint(fields: Dict[str, Optional[str]]) -> str:
+        """计算文档字段的指纹，用于增量更新时判断文档是否变化"""
+        digest = hashlib.md5()
+        for key in sorted(fields):
+            digest.update(key.encode())
+            digest.update(b'\0')
+            digest.update((fields[key] or '').encode('utf-8', errors='ignore'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def add_document(self, doc_id: str, fields: Dict[str, Optional[str]], fingerprint: str = None):
+        """添加（或替换）一个文档"""
+        if doc_id in self.doc_lengths:
+            self.remove_document(doc_id)
+
+        weighted_tf: Counter = Counter()
+        for field, text in fields.items():
+            if not text:
+                continue
+            weight = self.FIELD_WEIGHTS.get(field, 1.0)
+            for term in tokenize(text):
+                weighted_tf[term] += weight
+
+        for term, tf in weighted_tf.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+        length = float(sum(weighted_tf.values()))
+        self.doc_terms[doc_id] = tuple(weighted_tf)
+        self.doc_lengths[doc_id] = length
+        self.doc_fingerprints[doc_id] = fingerprint or self.fingerprint(fields)
+        self.total_length += length
+
+    def remove_document(self, doc_id: str):
+        """从索引中删除一个文档"""
+        if doc_id not in self.doc_lengths:
+            return
+
+        for term in self.doc_terms.pop(doc_id, ()):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.doc_fingerprints.pop(doc_id, None)
+
+    def sync(self, documents: Dict[str, Dict[str, Optional[str]]]) -> bool:
+        """将索引与给定文档集合同步，只处理新增、删除和内容变化的文档
+
+        Args:
+            documents: doc_id -> 字段字典
+
+        Returns:
+            bool: 索引是否发生了变化
+        """
+        changed = False
+
+        for doc_id in [d for d in self.doc_lengths if d not in documents]:
+            self.remove_document(doc_id)
+            changed = True
+
+        for doc_id, fields in documents.items():
+            fingerprint = self.fingerprint(fields)
+            if self.doc_fingerprints.get(doc_id) != fingerprint:
+                self.add_document(doc_id, fields, fingerprint)
+                changed = True
+
+        return changed
+
+    def search(self, query: str, top_k: int = 10, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """BM25检索
+
+        返回的分数按最佳结果的得分归一化到 (0, 1]，阈值表示相对最佳结果的比例，
+        多词查询中只有部分词能匹配时也能返回足够的结果。
+
+        Args:
+            query: 查询文本
+            top_k: 返回结果数量
+            min_score: 最低归一化分数
+
+        Returns:
+            List[Tuple[str, float]]: (doc_id, 分数) 列表，按分数降序
+        """
+        doc_count = len(self.doc_lengths)
+        query_terms = set(tokenize(query))
+        if not doc_count or not query_terms:
+            return []
+
+        avg_length = self.total_length / doc_count if self.total_length > 0 else 1.0
+        k1, b = self.k1, self.b
+
+        scores: Dict[str, float] = {}
+
+        for term in query_terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1.0 + (doc_count - df + 0.5) / (df + 0.5))
+
+            for doc_id, tf in posting.items():
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        if not scores:
+            return []
+
+        top = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        best = top[0][1]
+        results = []
+        for doc_id, score in top:
+            normalized = score / best
+            if normalized >= min_score:
+                results.append((doc_id, normalized))
+        return results
+
+    def save(self, path: Path):
+        """保存索引到文件"""
+        with open(path, 'wb') as f:
+            pickle.dump({
+                'k1': self.k1,
+                'b': self.b,
+                'postings': self.postings,
+                'doc_terms': self.doc_terms,
+                'doc_lengths': self.doc_lengths,
+                'doc_fingerprints': self.doc_fingerprints,
+                'total_length': self.total_length,
+            }, f)
+
+    @classmethod
+    def load(cls, path: Path) -> 'BM25Index':
+        """从文件加载索引"""
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+
+        index = cls(k1=data['k1'], b=data['b'])
+        index.postings = data['postings']
+        index.doc_terms = data['doc_terms']
+        index.doc_lengths = data['doc_lengths']
+        index.doc_fingerprints = data['doc_fingerprints']
+        index.total_length = data['total_length']
+        return index
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量索引策略模块
+
+根据语料规模或配置选择向量索引类型：
+- flat: 精确内积检索，适合小型项目
+- hnsw: 图索引，适合中等规模
+- ivf: 倒排聚类索引，适合大规模语料，可选乘积量化(PQ)压缩
+
+同时提供numpy回退路径的 argpartition top-k，以及与精确检索对比的召回率/延迟基准测试。
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+
+INDEX_STRATEGIES = ('flat', 'hnsw', 'ivf')
+
+# 自动选择策略时的规模阈值
+HNSW_MIN_VECTORS = 20000
+IVF_MIN_VECTORS = 200000
+
+# 每个聚类中心至少需要的训练样本数（FAISS建议值）
+_MIN_POINTS_PER_CENTROID = 39
+
+
+def choose_index_strategy(num_vectors: int, requested: str = 'auto') -> str:
+    """根据向量数量选择索引策略
+
+    Args:
+        num_vectors: 向量数量
+        requested: 配置的策略，'auto' 表示按规模自动选择
+
+    Returns:
+        str: 'flat' / 'hnsw' / 'ivf'
+    """
+    requested = (requested or 'auto').lower()
+    if requested in INDEX_STRATEGIES:
+        return requested
+
+    if num_vectors < HNSW_MIN_VECTORS:
+        return 'flat'
+    if num_vectors < IVF_MIN_VECTORS:
+        return 'hnsw'
+    return 'ivf'
+
+
+def _choose_pq_subquantizers(dimension: int) -> Optional[int]:
+    """选择能整除维度的PQ子量化器数量（每个子向量约4维）"""
+    for m in (64, 48, 32, 24, 16, 12, 8, 4):
+        if m <= dimension and dimension % m == 0 and dimension // m >= 4:
+            return m
+    return None
+
+
+def build_index(embeddings: "np.ndarray", strategy: str = 'flat', use_pq: bool = False) -> Tuple[Any, str]:
+    """构建内积向量索引
+
+    embeddings 应当已做L2归一化，内积即余弦相似度。训练数据不足以支撑所选策略时
+    自动降级为精确检索。
+
+    Args:
+        embeddings: (n, dim) float32 向量矩阵
+        strategy: 'flat' / 'hnsw' / 'ivf'
+        use_pq: 是否使用乘积量化压缩（仅对 ivf 生效）
+
+    Returns:
+        Tuple[index, str]: FAISS索引及实际使用的策略名称
+    """
+    if faiss is None:
+        raise ImportError("faiss is not installed")
+
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    num_vectors, dimension = embeddings.shape
+
+    if strategy == 'hnsw':
+        index = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 80
+        index.hnsw.efSearch = 64
+        index.add(embeddings)
+        return index, 'hnsw'
+
+    if strategy == 'ivf':
+        nlist = max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // _MIN_POINTS_PER_CENTROID))
+        if nlist >= 2:
+            quantizer = faiss.IndexFlatIP(dimension)
+            pq_m = _choose_pq_subquantizers(dimension) if use_pq else None
+
+            # PQ每个子空间需要256个码字的训练样本
+            if pq_m is not None and num_vectors >= 256 * _MIN_POINTS_PER_CENTROID:
+                index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, 8, faiss.METRIC_INNER_PRODUCT)
+                used = 'ivf_pq'
+            else:
+                index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+                used = 'ivf'
+
+            index.train(embeddings)
+            index.add(embeddings)
+            index.nprobe = max(1, min(nlist, max(16, nlist // 16)))
+            return index, used
+
+    index = faiss.IndexFlatIP(dimension)
+    index.add(embeddings)
+    return index, 'flat'
+
+
+def numpy_top_k(similarities: "np.ndarray", top_k: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """使用 argpartition 获取每行的 top-k，复杂度 O(n) 而非完整排序的 O(n log n)
+
+    Args:
+        similarities: (查询数, 向量数) 相似度矩阵
+        top_k: 每行返回的结果数
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: 按分数降序排列的 (scores, indices)
+    """
+    similarities = np.atleast_2d(similarities)
+    num_candidates = similarities.shape[1]
+    top_k = min(top_k, num_candidates)
+    if top_k <= 0:
+        empty = np.empty((similarities.shape[0], 0))
+        return empty.astype(similarities.dtype), empty.astype(np.int64)
+
+    if top_k < num_candidates:
+        candidates = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+    else:
+        candidates = np.broadcast_to(np.arange(num_candidates), similarities.shape)
+
+    candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    indices = np.take_along_axis(candidates, order, axis=1)
+    scores = np.take_along_axis(candidate_scores, order, axis=1)
+    return scores, indices
+
+
+def benchmark_index_strategies(embeddings: "np.ndarray", queries: "np.ndarray", top_k: int = 10,
+                               strategies: List[str] = None) -> List[Dict[str, Any]]:
+    """对比各索引策略与精确检索的召回率和延迟
+
+    Args:
+        embeddings: 已归一化的 (n, dim) 向量矩阵
+        queries: 已归一化的 (q, dim) 查询矩阵
+        top_k: 召回率计算使用的 k
+        strategies: 要测试的策略，默认全部（包括 ivf+pq）
+
+    Returns:
+        List[Dict]: 每个策略的 strategy / build_ms / query_ms / recall
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    top_k = min(top_k, len(embeddings))
+
+    # 精确检索作为基准
+    start = time.perf_counter()
+    _, exact_indices = numpy_top_k(queries @ embeddings.T, top_k)
+    numpy_ms = (time.perf_counter() - start) * 1000
+
+    results = [{
+        'strategy': 'numpy',
+        'build_ms': 0.0,
+        'query_ms': numpy_ms / max(1, len(queries)),
+        'recall': 1.0,
+    }]
+
+    if faiss is None:
+        return results
+
+    candidates = [(name, False) for name in (strategies or INDEX_STRATEGIES)]
+    if strategies is None:
+        candidates.append(('ivf', True))
+
+    for strategy, use_pq in candidates:
+        start = time.perf_counter()
+        index, used = build_index(embeddings, strategy, use_pq=use_pq)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        _, indices = index.search(queries, top_k)
+        query_ms = (time.perf_counter() - start) * 1000
+
+        label = 'ivf_pq' if use_pq else strategy
+        hits = sum(
+            len(set(found[found >= 0].tolist()) & set(expected.tolist()))
+            for found, expected in zip(indices, exact_indices)
+        )
+        results.append({
+            'strategy': label if used == label else f"{label}->{used}",
+            'build_ms': build_ms,
+            'query_ms': query_ms / max(1, len(queries)),
+            'recall': hits / float(max(1, len(queries) * top_k)),
+        })
+
+    return results
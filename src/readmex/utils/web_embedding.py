@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Web嵌入API客户端
+
+OpenAI兼容 /embeddings 接口的并发客户端：
+- 复用连接池的 requests.Session
+- 按估算token数（而非条数）切分批次，多个批次并发请求
+- 单批次失败时指数退避重试，429 时遵循 Retry-After
+- 已完成的批次写入检查点，构建中断后重跑只请求剩余批次
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 可重试的HTTP状态码
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本token数：ASCII约4字符1个token，其他字符（如中文）约1字符1个token"""
+    ascii_chars = len(text) if text.isascii() else sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+class WebEmbeddingClient:
+    """并发、按token预算分批的嵌入API客户端
+
+    Args:
+        api_key: API密钥
+        base_url: API地址
+        model_name: 嵌入模型名称
+        max_concurrency: 同时进行的请求数
+        max_batch_tokens: 单个请求的估算token上限
+        max_batch_items: 单个请求的最大文本数
+        max_retries: 单批次最大重试次数
+        timeout: 单个请求超时（秒）
+        checkpoint_dir: 批次检查点目录，为None时不保存检查点
+    """
+
+    def __init__(self, api_key: str, base_url: str, model_name: str, max_concurrency: int = 4,
+                 max_batch_tokens: int = 60000, max_batch_items: int = 256, max_retries: int = 5,
+                 timeout: float = 60, checkpoint_dir: Optional[Path] = None):
+        self.url = f"{base_url.rstrip('/')}/embeddings"
+        self.model_name = model_name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # 429 时所有线程共同等待，避免继续冲击限流
+        self._throttle_lock = threading.Lock()
+        self._throttled_until = 0.0
+
+    def make_batches(self, texts: List[str]) -> List[List[int]]:
+        """按估算token数贪心切分批次，返回每个批次的文本下标"""
+        batches, current, current_tokens = [], [], 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= self.max_batch_items):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed(self, texts: List[str], resume: bool = True,
+              progress_callback: Optional[Callable[[int, int], None]] = None) -> "np.ndarray":
+        """获取文本嵌入，结果与输入顺序一致
+
+        Args:
+            texts: 文本列表
+            resume: 是否使用批次检查点（跳过此前已完成的批次）
+            progress_callback: 每完成一个批次调用一次 (已完成批次数, 总批次数)
+
+        Raises:
+            Exception: 某个批次重试耗尽后抛出，此前完成的批次已保存检查点
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        batches = self.make_batches(texts)
+        results: List[Optional[np.ndarray]] = [None] * len(batches)
+        use_checkpoint = resume and self.checkpoint_dir is not None
+        if use_checkpoint:
+            self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+        pending = []
+        for b, indices in enumerate(batches):
+            batch_texts = [texts[i] for i in indices]
+            checkpoint = self._checkpoint_file(batch_texts) if use_checkpoint else None
+            if checkpoint is not None and checkpoint.exists():
+                try:
+                    results[b] = np.load(checkpoint)
+                    continue
+                except Exception:
+                    pass
+            pending.append((b, batch_texts, checkpoint))
+
+        completed = len(batches) - len(pending)
+        if progress_callback is not None and completed:
+            progress_callback(completed, len(batches))
+
+        first_error = None
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, max(1, len(pending)))) as executor:
+            futures = {executor.submit(self._request_with_retry, batch_texts): (b, checkpoint)
+                       for b, batch_texts, checkpoint in pending}
+            for future in as_completed(futures):
+                b, checkpoint = futures[future]
+                try:
+                    results[b] = future.result()
+                except Exception as e:
+                    # 其他批次继续完成并保存检查点，便于下次续跑
+                    if first_error is None:
+                        first_error = e
+                    continue
+                if checkpoint is not None:
+                    self._save_checkpoint(checkpoint, results[b])
+                completed += 1
+                if progress_callback is not None:
+                    progress_callback(completed, len(batches))
+
+        if first_error is not None:
+            raise first_error
+
+        embeddings = np.empty((len(texts), results[0].shape[1]), dtype=np.float32)
+        for indices, batch_embeddings in zip(batches, results):
+            embeddings[indices] = batch_embeddings
+
+        # 全部完成后清理本次的检查点
+        if use_checkpoint:
+            for b, indices in enumerate(batches):
+                checkpoint = self._checkpoint_file([texts[i] for i in indices])
+                if checkpoint.exists():
+                    checkpoint.unlink()
+
+        return embeddings
+
+    def close(self):
+        self.session.close()
+
+    def _request_with_retry(self, batch_texts: List[str]) -> "np.ndarray":
+        attempt = 0
+        while True:
+            self._wait_for_throttle()
+            try:
+                response = self.session.post(
+                    self.url,
+                    data=json.dumps({'input': batch_texts, 'model': self.model_name}),
+                    timeout=self.timeout
+                )
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    delay = self._retry_after(response)
+                    if delay is None:
+                        delay = self._backoff(attempt)
+                    if response.status_code == 429:
+                        self._throttle(delay)
+                    else:
+                        time.sleep(delay)
+                    attempt += 1
+                    continue
+                response.raise_for_status()
+                data = sorted(response.json()['data'], key=lambda item: item.get('index', 0))
+                return np.asarray([item['embedding'] for item in data], dtype=np.float32)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # 指数退避加随机抖动，上限30秒
+        return min(30.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        value = response.headers.get('Retry-After')
+        try:
+            return max(0.0, float(value)) if value is not None else None
+        except ValueError:
+            return None
+
+    def _throttle(self, delay: float):
+        with self._throttle_lock:
+            self._throttled_until = max(self._throttled_until, time.monotonic() + delay)
+
+    def _wait_for_throttle(self):
+        with self._throttle_lock:
+            remaining = self._throttled_until - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def _checkpoint_file(self, batch_texts: List[str]) -> Path:
+        digest = hashlib.sha1(self.model_name.encode('utf-8'))
+        for text in batch_texts:
+            digest.update(b'\0')
+            digest.update(text.encode('utf-8', errors='surrogatepass'))
+        return self.checkpoint_dir / f"{digest.hexdigest()}.npy"
+
+    @staticmethod
+    def _save_checkpoint(checkpoint: Path, embeddings: "np.ndarray"):
+        tmp_file = checkpoint.with_suffix('.tmp')
+        try:
+            with open(tmp_file, 'wb') as f:
+                np.save(f, embeddings)
+            tmp_file.replace(checkpoint)
+        except OSError:
+            if tmp_file.exists():
+                tmp_file.unlink()
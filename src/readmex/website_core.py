@@ -4,9 +4,10 @@ import json
 import re
 import time
 import shutil
+import threading
+from contextlib import nullcontext
 from typing import Dict, List, Tuple, Optional, Any
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from rich.console import Console
 from rich.progress import Progress, TaskID, TimeElapsedColumn, TimeRemainingColumn, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn
 from rich.live import Live
@@ -24,8 +25,52 @@ from readmex.utils.file_handler import (
     get_project_structure,
     load_gitignore_patterns,
 )
-from readmex.config import load_config
-from readmex.code_rag import CodeRAG
+from readmex.config import (
+    load_config, get_parallel_parse_threshold, get_api_docs_config, get_asset_webp, get_architecture_diagram_config
+)
+from readmex.utils.architecture_diagram import (
+    IMPORT_GRAPH_CACHE_VERSION, ModuleGraph, build_module_graph, extract_imports, generate_architecture_drawio,
+    is_test_module, _extract_imports_worker
+)
+from readmex.utils.page_manifest import PageManifest, fingerprint, page_unchanged
+from readmex.utils.git_history import GitHistoryReader
+from readmex.utils.git_repo import get_remote_url
+from readmex.utils.dependency_manifests import (
+    DependencyManifestEngine, NPM_MANIFESTS, OTHER_MANIFESTS, PYTHON_MANIFESTS
+)
+from readmex.utils.image_assets import ImageAssetPipeline
+from readmex.utils.source_cache import ParsedSource, SourceCache
+from readmex.utils.task_scheduler import ScheduledTask, TaskScheduler
+from readmex.utils.web_embedding import estimate_tokens
+from readmex.sharded_rag import create_code_rag
+
+# Python API提取结果缓存版本，提取逻辑变化时递增
+PYTHON_API_CACHE_VERSION = 1
+
+# 影响首页内容的README配置项
+HOMEPAGE_CONFIG_KEYS = [
+    "github_username", "repo_name", "project_title", "twitter_handle", "linkedin_username", "email",
+    "readme_language", "project_description", "entry_file", "key_features", "additional_info",
+]
+
+# 全局调度器中的任务优先级：耗时长的任务优先执行，避免最后只剩一个长任务而其他线程空闲
+TASK_PRIORITIES = {
+    'architecture_diagram': 100,
+    'home': 90,
+    'architecture': 80,
+    'api': 70,
+    'examples': 60,
+    'usage': 60,
+    'installation': 50,
+    'contributing': 40,
+    'changelog': 40,
+    'api_batch': 20,
+    'api_page': 10,
+}
+
+# 批量API文档中每个API的起止标记
+API_SECTION_START_RE = re.compile(r'^[ \t]*<!--\s*API:\s*(\d+)\s*-->[ \t]*$', re.MULTILINE)
+API_SECTION_END_RE = re.compile(r'^[ \t]*<!--\s*END API:\s*(\d+)\s*-->[ \t]*$', re.MULTILINE)
 
 
 class ProgressTracker:
@@ -50,6 +95,12 @@ class ProgressTracker:
         self.current_stage_index = 0
         self.total_stages = len(self.stages)
         
+        # 调度器任务进度（由 TaskScheduler 回调更新）
+        self._lock = threading.Lock()
+        self.total_tasks = 0
+        self.completed_tasks = 0
+        self.running_tasks: Dict[int, str] = {}
+    
     def start(self):
         """开始进度跟踪"""
         self.start_time = time.time()
@@ -59,7 +110,28 @@ class ProgressTracker:
         if stage_index < len(self.stages):
             self.current_stage_index = stage_index
             self.current_stage = self.stages[stage_index][1]
-            
+    
+    def task_submitted(self, task: ScheduledTask):
+        with self._lock:
+            self.total_tasks += 1
+    
+    def task_started(self, task: ScheduledTask):
+        with self._lock:
+            self.running_tasks[id(task)] = task.name
+            if task.stage is not None:
+                self.update_stage(task.stage)
+    
+    def task_finished(self, task: ScheduledTask):
+        with self._lock:
+            self.completed_tasks += 1
+            self.running_tasks.pop(id(task), None)
+    
+    def _progress_ratio(self) -> float:
+        """页面生成阶段按已完成任务数计算进度，其他阶段按阶段计算"""
+        if self.total_tasks and 0 < self.current_stage_index < self.total_stages - 1:
+            return self.completed_tasks / self.total_tasks
+        return self.current_stage_index / self.total_stages
+    
     def get_elapsed_time(self) -> str:
         """获取已用时间"""
         if self.start_time is None:
@@ -75,7 +147,7 @@ class ProgressTracker:
             return "预估中..."
         
         elapsed = time.time() - self.start_time
-        progress_ratio = self.current_stage_index / self.total_stages
+        progress_ratio = self._progress_ratio()
         
         if progress_ratio > 0:
             estimated_total = elapsed / progress_ratio
@@ -97,7 +169,7 @@ class ProgressTracker:
         table.add_column(style="white")
         
         # 进度信息
-        progress_percent = (self.current_stage_index / self.total_stages) * 100
+        progress_percent = self._progress_ratio() * 100
         progress_bar = "█" * int(progress_percent // 5) + "░" * (20 - int(progress_percent // 5))
         
         table.add_row("📊 总体进度:", f"[{progress_bar}] {progress_percent:.1f}% ({self.current_stage_index}/{self.total_stages})")
@@ -105,13 +177,25 @@ class ProgressTracker:
         table.add_row("⏳ 预计剩余:", self.get_estimated_time())
         table.add_row("🔄 当前阶段:", self.current_stage)
         
+        with self._lock:
+            if self.total_tasks:
+                running = list(self.running_tasks.values())
+                running_text = "、".join(running[:3]) + (f" 等{len(running)}个" if len(running) > 3 else "")
+                table.add_row("🧩 任务进度:", f"{self.completed_tasks}/{self.total_tasks}" +
+                              (f"（进行中: {running_text}）" if running else ""))
+        
         return table
+    
+    def __rich__(self) -> Table:
+        # Live 每次刷新时重新生成进度表格
+        return self.create_progress_display()
 
 
 class WebsiteGenerator:
     """MkDocs网站生成器 - 独立于README生成逻辑"""
     
-    def __init__(self, project_dir: str, output_dir: str = None, model_client=None, verbose: bool = False, debug: bool = False, enable_rag: bool = True):
+    def __init__(self, project_dir: str, output_dir: str = None, model_client=None, verbose: bool = False, debug: bool = False, enable_rag: bool = True,
+                 incremental: bool = True):
         self.project_dir = Path(project_dir)
         self.output_dir = Path(output_dir) if output_dir else self.project_dir / "website"
         self.console = Console()
@@ -126,6 +210,31 @@ class WebsiteGenerator:
         self.api_dir = self.docs_dir / "api"
         self.assets_dir = self.output_dir / "assets"
         
+        # Python源文件解析结果（本次运行内复用）
+        self._python_apis: Optional[Tuple[List[Dict], List[Dict]]] = None
+        # 架构图使用的模块依赖图（本次运行内复用）
+        self._module_graph: Optional[ModuleGraph] = None
+        
+        # 与CodeRAG共享的源文件解析缓存，每个文件只读取、解析一次
+        self.source_cache = SourceCache(self.output_dir / ".rag_cache")
+        
+        # 依赖清单一次扫描发现，解析结果按内容哈希缓存（与README生成共享）
+        self.dependency_manifests = DependencyManifestEngine(
+            self.project_dir, self.output_dir / ".dependency_cache.json", console=self.console
+        )
+        
+        # 图片资源按源文件哈希和目标尺寸缓存，未变化的图片不再重新处理
+        self.asset_pipeline = ImageAssetPipeline(self.output_dir / ".asset_manifest.json", webp=get_asset_webp())
+        
+        # 页面输入指纹清单：增量生成时跳过输入未变化的页面
+        self.incremental = incremental
+        self.page_manifest = PageManifest(self.output_dir / ".page_manifest.json", self.docs_dir)
+        
+        # 批量读取Git提交历史、贡献者和标签，按HEAD和标签集合缓存在输出目录中
+        self.git_history = GitHistoryReader(self.project_dir, self.output_dir / ".git_metadata.json")
+        # 由Git元数据派生的结果（本次运行内各页面共享）
+        self._git_metadata: Dict[Any, List[Dict]] = {}
+        
         # API文档生成策略
         self.api_filter = APIDocumentationFilter()
         self.api_generator = APIDocumentationGenerator(self.model_client, debug)
@@ -133,6 +242,9 @@ class WebsiteGenerator:
         # 创建进度跟踪器
         self.progress_tracker = ProgressTracker(self.console)
         
+        # 网站生成期间所有工作单元共用的全局调度器
+        self._scheduler: Optional[TaskScheduler] = None
+        
         # 初始化RAG系统
         self.code_rag = None
         if self.enable_rag:
@@ -146,10 +258,11 @@ class WebsiteGenerator:
                 # 获取embedding配置
                 embedding_config = get_embedding_config()
                 
-                self.code_rag = CodeRAG(
+                self.code_rag = create_code_rag(
                     project_dir=str(self.project_dir),
                     cache_dir=str(cache_dir),
-                    use_local_embedding=embedding_config.get('local_embedding', True)
+                    use_local_embedding=embedding_config.get('local_embedding', True),
+                    source_cache=self.source_cache
                 )
                 self.console.print("[green]✅ RAG系统初始化成功[/green]")
             except Exception as e:
@@ -179,80 +292,83 @@ class WebsiteGenerator:
         self.progress_tracker.update_stage(0)
         project_analysis = self._analyze_project()
         
-        # 阶段1: 生成首页（README生成阶段，不显示网站进度条）
-        self.progress_tracker.update_stage(1)
-        self._generate_home_page(project_analysis)
+        # 首页复用项目分析结果，与其他页面一起并行生成
+        self.console.print("\n[bold green]🌐 开始并行生成网站页面...[/bold green]")
         
-        # README生成完成后，开始显示网站生成进度条
-        self.console.print("\n[bold green]🌐 开始并行生成网站其他页面...[/bold green]")
-        
-        # 使用Live显示实时进度（从阶段2开始）
-        with Live(self.progress_tracker.create_progress_display(), refresh_per_second=1, console=self.console) as live:
-            # 并行生成所有页面
-            self._generate_pages_in_parallel(project_analysis, live)
+        # 使用Live显示实时进度（从阶段1开始），每次刷新时重新读取任务进度
+        with Live(self.progress_tracker, refresh_per_second=1, console=self.console) as live:
+            # 并行生成所有页面，中断时也保存已生成页面的指纹
+            try:
+                self._generate_pages_in_parallel(project_analysis, live)
+            finally:
+                self.page_manifest.save()
             
             # 阶段9: 生成配置文件
             self.progress_tracker.update_stage(9)
-            live.update(self.progress_tracker.create_progress_display())
+            live.update(self.progress_tracker)
             config = self._create_mkdocs_config(project_analysis)
             self._write_mkdocs_config(config)
             
             # 完成
             self.progress_tracker.current_stage_index = self.progress_tracker.total_stages
             self.progress_tracker.current_stage = "✅ 网站生成完成！"
-            live.update(self.progress_tracker.create_progress_display())
+            live.update(self.progress_tracker)
             time.sleep(1)  # 让用户看到完成状态
         
         self.console.print(f"\n[bold green]✅ 网站生成完成: {self.output_dir}[/bold green]")
         
     def _generate_pages_in_parallel(self, project_analysis: Dict, live) -> None:
-        """并行生成所有页面以提升性能"""
-        # 定义需要并行生成的页面任务
+        """在一个全局调度器上并行生成所有页面
+        
+        首页各部分、各文档页、API页面和架构图都作为调度器的任务执行：只有一个全局并发上限，
+        按优先级先执行耗时长的任务，进度通过 ProgressTracker 实时显示。
+        """
         page_tasks = [
+            ('home', 1, self._generate_home_page),
             ('installation', 2, self._generate_installation_page),
-            ('usage', 3, self._generate_usage_page), 
+            ('usage', 3, self._generate_usage_page),
+            ('api', 4, self._generate_api_documentation),
             ('examples', 5, self._generate_examples_page),
             ('architecture', 6, self._generate_architecture_page),
             ('contributing', 7, self._generate_contributing_page),
             ('changelog', 8, self._generate_changelog_page)
         ]
         
-        # API文档单独处理，因为它有自己的并行逻辑
-        self.progress_tracker.update_stage(4)
-        live.update(self.progress_tracker.create_progress_display())
-        self._generate_api_documentation(project_analysis)
-        
-        # 使用线程池并行生成其他页面
         from readmex.config import get_max_workers
-        max_workers = get_max_workers()
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交所有任务
-            future_to_task = {}
-            for page_type, stage_index, generator_func in page_tasks:
-                future = executor.submit(self._generate_page_wrapper, page_type, project_analysis, generator_func)
-                future_to_task[future] = (page_type, stage_index)
-            
-            # 等待任务完成并更新进度
-            completed_stages = set()
-            for future in as_completed(future_to_task):
-                page_type, stage_index = future_to_task[future]
-                try:
-                    future.result()
-                    completed_stages.add(stage_index)
-                    
-                    # 更新进度到最新完成的阶段
-                    max_completed_stage = max(completed_stages) if completed_stages else 2
-                    self.progress_tracker.update_stage(max_completed_stage)
-                    live.update(self.progress_tracker.create_progress_display())
+        try:
+            with TaskScheduler(get_max_workers(), listener=self.progress_tracker) as scheduler:
+                self._scheduler = scheduler
+                tasks = [
+                    (page_type, scheduler.submit(page_type, self._generate_page_wrapper, page_type, project_analysis,
+                                                 generator_func, priority=TASK_PRIORITIES[page_type], stage=stage_index))
+                    for page_type, stage_index, generator_func in page_tasks
+                ]
+                
+                for page_type, task in tasks:
+                    try:
+                        task.result()
+                        if self.verbose:
+                            self.console.print(f"[green]✅ {page_type} 页面生成完成[/green]")
                     
-                    if self.verbose:
-                        self.console.print(f"[green]✅ {page_type} 页面生成完成[/green]")
-                        
-                except Exception as e:
-                    self.console.print(f"[red]❌ {page_type} 页面生成失败: {e}[/red]")
-                    if self.debug:
-                        import traceback
-                        self.console.print(f"[red]{traceback.format_exc()}[/red]")
+                    except Exception as e:
+                        self.console.print(f"[red]❌ {page_type} 页面生成失败: {e}[/red]")
+                        if self.debug:
+                            import traceback
+                            self.console.print(f"[red]{traceback.format_exc()}[/red]")
+        finally:
+            self._scheduler = None
+    
+    def _run_tasks(self, tasks: List[Tuple[str, Any, tuple]], priority: int) -> List[ScheduledTask]:
+        """在全局调度器上并行执行 (名称, 函数, 参数) 任务并等待完成
+        
+        在网站生成流程之外调用时（如单独生成API文档）使用临时调度器。
+        """
+        from readmex.config import get_max_workers
+        context = nullcontext(self._scheduler) if self._scheduler is not None else TaskScheduler(get_max_workers())
+        with context as scheduler:
+            scheduled = [scheduler.submit(name, func, *args, priority=priority) for name, func, args in tasks]
+            scheduler.wait(scheduled)
+        return scheduled
     
     def _generate_page_wrapper(self, page_type: str, project_analysis: Dict, generator_func) -> None:
         """页面生成包装器，用于并行执行"""
@@ -328,21 +444,39 @@ class WebsiteGenerator:
         
     def _generate_home_page(self, analysis: Dict) -> None:
         """生成首页 - 使用README生成逻辑"""
-        content = self._generate_readme_as_homepage(analysis)
-
-        # 后处理：添加logo支持
-        content = self._post_process_homepage_content(content)
-        self._write_page('index.md', content)
+        def render() -> str:
+            content = self._generate_readme_as_homepage(analysis)
+            # 后处理：添加logo支持
+            return self._post_process_homepage_content(content)
+        
+        self._generate_page_if_changed('index.md', self._homepage_inputs(analysis), render)
+    
+    def _homepage_inputs(self, analysis: Dict) -> Tuple:
+        """首页的输入：项目分析结果、README配置和logo文件"""
+        logos = []
+        for logo_file in ['logo.svg', 'logo.png']:
+            logo_path = self.project_dir / "images" / logo_file
+            if logo_path.exists():
+                stat = logo_path.stat()
+                logos.append((logo_file, stat.st_size, stat.st_mtime_ns))
+        return (
+            'home',
+            analysis.get('structure'),
+            analysis.get('dependencies'),
+            self._build_file_descriptions(analysis),
+            # 只有远程仓库地址影响首页，提交历史变化不需要重新生成
+            analysis.get('git_info', {}).get('remote_url'),
+            {key: self.config.get(key) for key in HOMEPAGE_CONFIG_KEYS},
+            logos,
+        )
         
     def _generate_installation_page(self, analysis: Dict) -> None:
         """生成安装页面"""
-        content = self._generate_page_content('installation', analysis)
-        self._write_page('installation.md', content)
+        self._generate_llm_page('installation', 'installation.md', analysis)
         
     def _generate_usage_page(self, analysis: Dict) -> None:
         """生成使用说明页面"""
-        content = self._generate_page_content('usage', analysis)
-        self._write_page('usage.md', content)
+        self._generate_llm_page('usage', 'usage.md', analysis)
         
     def _generate_api_documentation(self, analysis: Dict) -> None:
         """生成API文档 - 智能筛选有价值的函数"""
@@ -359,52 +493,133 @@ class WebsiteGenerator:
         # 为每个API生成独立页面
         self._generate_individual_api_pages(valuable_apis)
         
+        # 删除已不存在的API的旧页面
+        for page in self.page_manifest.prune('api/'):
+            stale_page = self.docs_dir / page
+            if stale_page.exists():
+                stale_page.unlink()
+        
     def _generate_individual_api_pages(self, apis: List[Dict]) -> None:
-        """为每个API生成独立的markdown页面"""
-        from readmex.config import get_max_workers
-        max_workers = get_max_workers()
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            
-            for api in apis:
-                future = executor.submit(self._generate_single_api_page, api)
-                futures.append(future)
-                
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    self.console.print(f"[red]API页面生成失败: {e}[/red]")
-                    
+        """为每个API生成独立的markdown页面
+        
+        启用批量模式且模型可用时，同一模块中需要重新生成的API按token预算分批，
+        每批一次模型请求；否则每个API一次请求。
+        """
+        api_docs_config = get_api_docs_config()
+        if api_docs_config['batching'] and not self.debug and self.model_client is not None:
+            self._generate_api_pages_in_batches(apis, api_docs_config)
+            return
+        
+        # 全局调度器中优先级最低，填补其他页面的空闲时间
+        tasks = self._run_tasks(
+            [(f"api:{api['module']}.{api['name']}", self._generate_single_api_page, (api,)) for api in apis],
+            priority=TASK_PRIORITIES['api_page']
+        )
+        for task in tasks:
+            try:
+                task.result()
+            except Exception as e:
+                self.console.print(f"[red]API页面生成失败: {e}[/red]")
+    
+    def _api_page_inputs(self, api: Dict) -> Tuple[str, Tuple]:
+        """API页面的文件名和输入"""
+        filename = f"api/{api['module']}/{api['name']}.md"
+        return filename, ('api', api['definition'], api['context'], api['metadata'])
+    
     def _generate_single_api_page(self, api: Dict) -> None:
-        """生成单个API的详细文档页面"""
-        content = self.api_generator.generate_api_documentation(
+        """生成单个API的详细文档页面，定义、上下文和元数据未变化时跳过"""
+        filename, inputs = self._api_page_inputs(api)
+        self._generate_page_if_changed(filename, inputs, lambda: self.api_generator.generate_api_documentation(
             api['definition'],
             api['context'],
             api['metadata']
+        ))
+    
+    def _generate_api_pages_in_batches(self, apis: List[Dict], api_docs_config: Dict) -> None:
+        """按模块批量生成API页面，输入未变化的API不进入批次"""
+        stale_by_module: Dict[str, List[Tuple[Dict, str, str]]] = {}
+        for api in apis:
+            filename, inputs = self._api_page_inputs(api)
+            page_fingerprint = self._page_fingerprint(inputs)
+            if self.page_manifest.is_fresh(filename, page_fingerprint) and self.incremental:
+                if self.verbose:
+                    self.console.print(f"[dim]跳过未变化的页面: {filename}[/dim]")
+                continue
+            stale_by_module.setdefault(api['module'], []).append((api, filename, page_fingerprint))
+        
+        batches = []
+        for module, entries in stale_by_module.items():
+            api_batches = self.api_generator.plan_batches(
+                [api for api, _, _ in entries],
+                api_docs_config['batch_tokens'],
+                api_docs_config['batch_size']
+            )
+            start = 0
+            for api_batch in api_batches:
+                batches.append((f"api:{module}[{start + 1}-{start + len(api_batch)}]", entries[start:start + len(api_batch)]))
+                start += len(api_batch)
+        
+        tasks = self._run_tasks(
+            [(name, self._generate_api_batch_pages, (entries,)) for name, entries in batches],
+            priority=TASK_PRIORITIES['api_batch']
         )
-        
-        filename = f"api/{api['module']}/{api['name']}.md"
-        self._write_page(filename, content)
+        for task in tasks:
+            try:
+                task.result()
+            except Exception as e:
+                self.console.print(f"[red]API页面生成失败: {e}[/red]")
+    
+    def _generate_api_batch_pages(self, entries: List[Tuple[Dict, str, str]]) -> None:
+        """一次请求生成一批API的文档并写入各自的页面"""
+        documents = self.api_generator.generate_batch_documentation([api for api, _, _ in entries])
+        for (api, filename, page_fingerprint), content in zip(entries, documents):
+            self._write_page(filename, content)
+            self.page_manifest.record(filename, page_fingerprint)
         
     def _generate_examples_page(self, analysis: Dict) -> None:
         """生成示例页面"""
-        content = self._generate_page_content('examples', analysis)
-        self._write_page('examples.md', content)
+        self._generate_llm_page('examples', 'examples.md', analysis)
         
     def _generate_architecture_page(self, analysis: Dict) -> None:
         """生成架构页面 - 并行生成图表和文档内容"""
-        # 使用线程池并行生成架构图和文档内容
-        from readmex.config import get_max_workers
-        max_workers = get_max_workers()
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交两个并行任务
-            drawio_future = executor.submit(self._generate_drawio_diagram, analysis)
-            content_future = executor.submit(self._generate_page_content, 'architecture', analysis)
-            
-            # 等待两个任务完成
-            drawio_content = drawio_future.result()
-            content = content_future.result()
+        prompt = self._create_full_page_prompt('architecture', analysis)
+        inputs = ('architecture', prompt, self._architecture_diagram_inputs(analysis))
+        self._generate_page_if_changed('architecture.md', inputs, lambda: self._render_architecture_page(prompt, analysis))
+    
+    def _architecture_diagram_inputs(self, analysis: Dict) -> Tuple:
+        """架构图的输入"""
+        diagram_config = get_architecture_diagram_config()
+        if diagram_config['mode'] == 'local':
+            module_graph = self._get_module_graph(analysis)
+            if module_graph.nodes:
+                return (
+                    analysis.get('git_info', {}).get('repo_name'),
+                    diagram_config,
+                    sorted(module_graph.nodes.items()),
+                    sorted(module_graph.edges.items()),
+                    # 节点说明根据各模块的类和函数生成
+                    [(cls['module'], cls['name']) for cls in analysis.get('classes', [])] if diagram_config['llm_labels'] else None,
+                    [(func['module'], func['name']) for func in analysis.get('functions', [])] if diagram_config['llm_labels'] else None,
+                )
+        
+        script_descriptions_file = self.project_dir / "script_descriptions.json"
+        return (
+            analysis.get('git_info', {}).get('repo_name'),
+            analysis.get('modules', []),
+            [(cls['module'], cls['name']) for cls in analysis.get('classes', [])],
+            [(func['module'], func['name']) for func in analysis.get('functions', [])],
+            sorted(analysis.get('dependencies', {})),
+            script_descriptions_file.read_text(encoding='utf-8', errors='replace') if script_descriptions_file.exists() else None,
+        )
+    
+    def _render_architecture_page(self, prompt: str, analysis: Dict) -> str:
+        # 在全局调度器上并行生成架构图（耗时最长，优先执行）和文档内容
+        drawio_task, content_task = self._run_tasks([
+            ('architecture:diagram', self._generate_drawio_diagram, (analysis,)),
+            ('architecture:content', self._complete_page_content, ('architecture', prompt, analysis)),
+        ], priority=TASK_PRIORITIES['architecture_diagram'])
+        drawio_content = drawio_task.result()
+        content = content_task.result()
         
         # 保存架构图文件
         drawio_file_path = self.docs_dir / 'architecture_diagram.drawio'
@@ -418,19 +633,15 @@ class WebsiteGenerator:
                 self.console.print(f"[red]保存架构图失败: {e}[/red]")
         
         # 后处理：替换占位符为 markdown 图片引用语法
-        content = self._post_process_architecture_content(content, drawio_content)
-        
-        self._write_page('architecture.md', content)
+        return self._post_process_architecture_content(content, drawio_content)
         
     def _generate_contributing_page(self, analysis: Dict) -> None:
         """生成贡献指南页面"""
-        content = self._generate_page_content('contributing', analysis)
-        self._write_page('contributing.md', content)
+        self._generate_llm_page('contributing', 'contributing.md', analysis)
         
     def _generate_changelog_page(self, analysis: Dict) -> None:
         """生成更新日志页面"""
-        content = self._generate_page_content('changelog', analysis)
-        self._write_page('changelog.md', content)
+        self._generate_llm_page('changelog', 'changelog.md', analysis)
         
     def _post_process_architecture_content(self, content: str, drawio_content: str) -> str:
         """
@@ -537,107 +748,67 @@ class WebsiteGenerator:
             dest_path: 目标图片路径
             max_height: 最大高度（像素）
         """
-        try:
-            from PIL import Image
-            
-            # 打开图片
-            with Image.open(source_path) as img:
-                # 获取原始尺寸
-                original_width, original_height = img.size
-                
-                # 如果高度超过最大值，按比例缩放
-                if original_height > max_height:
-                    ratio = max_height / original_height
-                    new_width = int(original_width * ratio)
-                    new_height = max_height
-                    
-                    # 调整大小
-                    resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    resized_img.save(dest_path, optimize=True, quality=95)
-                    
-                    if self.verbose:
-                        self.console.print(f"[green]🔧 图片已调整大小: {original_width}x{original_height} -> {new_width}x{new_height}[/green]")
-                else:
-                    # 直接复制
-                    img.save(dest_path, optimize=True, quality=95)
-                    
-        except ImportError:
-            # 如果没有安装PIL，直接复制
-            shutil.copy2(source_path, dest_path)
-            if self.verbose:
-                self.console.print(f"[yellow]⚠️  PIL未安装，无法调整图片大小，直接复制[/yellow]")
-        except Exception as e:
-            # 如果调整大小失败，直接复制
-            shutil.copy2(source_path, dest_path)
-            if self.verbose:
-                self.console.print(f"[yellow]⚠️  图片调整失败，直接复制: {e}[/yellow]")
-
+        self._process_images([(source_path, dest_path, max_height)])
+    
+    def _process_images(self, images: List[Tuple[Path, Path, int]]) -> None:
+        """通过图片资源流水线处理 (源文件, 目标文件, 最大高度) 列表：未变化的图片跳过，其余并行处理"""
+        results, skipped = self.asset_pipeline.process(images, console=self.console)
+        if not self.verbose:
+            return
+        
+        for dest in skipped:
+            self.console.print(f"[dim]跳过未变化的资源: {Path(dest).name}[/dim]")
+        for result in results:
+            name = Path(result['dest']).name
+            if not result['outputs']:
+                self.console.print(f"[yellow]⚠️  复制资源失败 {name}: {result['error']}[/yellow]")
+                continue
+            if result['error']:
+                self.console.print(f"[yellow]⚠️  {name}: {result['error']}[/yellow]")
+            elif result['resized']:
+                original_width, original_height, new_width, new_height = result['resized']
+                self.console.print(f"[green]🔧 图片已调整大小: {original_width}x{original_height} -> {new_width}x{new_height}[/green]")
+            self.console.print(f"[green]📁 已复制资源: {name}[/green]")
+    
+    @staticmethod
+    def _image_max_height(image_name: str) -> int:
+        """根据文件名确定图片的最大高度"""
+        name = image_name.lower()
+        if 'logo' in name:
+            return 100
+        if 'screenshot' in name:
+            return 400
+        return 300
+    
     def _copy_project_assets(self) -> None:
         """
         复制项目中的所有资源文件到docs/assets目录
-        包括logo、screenshot等图片资源
+        包括logo、screenshot等图片资源，PNG和JPG按文件名缩放，其他格式直接复制
         """
         # 确保docs/assets/images目录存在
         docs_assets_images_dir = self.docs_dir / "assets" / "images"
         docs_assets_images_dir.mkdir(parents=True, exist_ok=True)
         
-        # 查找项目根目录的images文件夹
-        project_images_dir = self.project_dir / "images"
+        images = []
         
+        # 项目根目录的images文件夹中的所有图片
+        project_images_dir = self.project_dir / "images"
         if project_images_dir.exists():
-            # 复制所有图片文件
             image_extensions = ['.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp']
-            
-            for image_file in project_images_dir.iterdir():
+            for image_file in sorted(project_images_dir.iterdir()):
                 if image_file.is_file() and image_file.suffix.lower() in image_extensions:
-                    dest_file = docs_assets_images_dir / image_file.name
-                    
-                    try:
-                        # 对PNG和JPG文件进行大小调整
-                        if image_file.suffix.lower() in ['.png', '.jpg', '.jpeg']:
-                            # 根据文件名判断是否需要特殊处理
-                            if 'logo' in image_file.name.lower():
-                                self._resize_and_copy_image(image_file, dest_file, max_height=100)
-                            elif 'screenshot' in image_file.name.lower():
-                                self._resize_and_copy_image(image_file, dest_file, max_height=400)
-                            else:
-                                self._resize_and_copy_image(image_file, dest_file, max_height=300)
-                        else:
-                            # SVG等矢量图直接复制
-                            shutil.copy2(image_file, dest_file)
-                        
-                        if self.verbose:
-                            self.console.print(f"[green]📁 已复制资源: {image_file.name}[/green]")
-                            
-                    except Exception as e:
-                        if self.verbose:
-                            self.console.print(f"[yellow]⚠️  复制资源失败 {image_file.name}: {e}[/yellow]")
+                    images.append((image_file, docs_assets_images_dir / image_file.name,
+                                   self._image_max_height(image_file.name)))
         
-        # 查找项目根目录的其他常见图片文件
+        # 项目根目录的其他常见图片文件（与images文件夹中的同名文件冲突时以根目录为准）
         common_image_files = ['logo.png', 'logo.svg', 'screenshot.png', 'banner.png', 'icon.png']
-        
         for image_name in common_image_files:
             image_file = self.project_dir / image_name
             if image_file.exists():
-                dest_file = docs_assets_images_dir / image_name
-                
-                try:
-                    if image_name.endswith('.png') or image_name.endswith('.jpg'):
-                        if 'logo' in image_name:
-                            self._resize_and_copy_image(image_file, dest_file, max_height=100)
-                        elif 'screenshot' in image_name:
-                            self._resize_and_copy_image(image_file, dest_file, max_height=400)
-                        else:
-                            self._resize_and_copy_image(image_file, dest_file, max_height=300)
-                    else:
-                        shutil.copy2(image_file, dest_file)
-                    
-                    if self.verbose:
-                        self.console.print(f"[green]📁 已复制根目录资源: {image_name}[/green]")
-                        
-                except Exception as e:
-                    if self.verbose:
-                        self.console.print(f"[yellow]⚠️  复制根目录资源失败 {image_name}: {e}[/yellow]")
+                images.append((image_file, docs_assets_images_dir / image_name, self._image_max_height(image_name)))
+        
+        if images:
+            self._process_images(images)
 
     def _write_mkdocs_config(self, config: Dict) -> None:
         """写入MkDocs配置文件"""
@@ -655,19 +826,47 @@ class WebsiteGenerator:
         
     def _generate_page_content(self, page_type: str, analysis: Dict) -> str:
         """使用LLM生成页面内容"""
-        if self.debug:
-            # Debug模式下跳过大模型调用，返回简单的占位符内容
-            self.console.print(f"[yellow]生成 {page_type} 页面 (debug模式 - 跳过大模型调用)...[/yellow]")
-            return self._generate_debug_page_content(page_type, analysis)
+        prompt = self._create_full_page_prompt(page_type, analysis)
+        return self._complete_page_content(page_type, prompt, analysis)
+    
+    def _generate_llm_page(self, page_type: str, filename: str, analysis: Dict) -> None:
+        """生成由单个LLM调用产生的页面，prompt（含RAG上下文）未变化时跳过"""
+        prompt = self._create_full_page_prompt(page_type, analysis)
+        self._generate_page_if_changed(
+            filename,
+            (page_type, prompt),
+            lambda: self._complete_page_content(page_type, prompt, analysis)
+        )
+    
+    def _generate_page_if_changed(self, filename: str, inputs: Tuple, render) -> bool:
+        """页面输入指纹与上次生成时相同则跳过，否则调用 render() 生成并写入页面
         
-        # 检查model_client是否可用
-        if self.model_client is None:
-            self.console.print(f"[yellow]⚠️  模型客户端不可用，使用debug模式生成 {page_type} 页面[/yellow]")
-            return self._generate_debug_page_content(page_type, analysis)
+        Returns:
+            bool: 是否重新生成了页面
+        """
+        page_fingerprint = self._page_fingerprint(inputs)
+        if self.page_manifest.is_fresh(filename, page_fingerprint) and self.incremental:
+            if self.verbose:
+                self.console.print(f"[dim]跳过未变化的页面: {filename}[/dim]")
+            return False
         
+        self._write_page(filename, render())
+        self.page_manifest.record(filename, page_fingerprint)
+        return True
+    
+    def _page_fingerprint(self, inputs: Tuple) -> str:
+        # debug模式和模型不可用时生成的是占位内容，需与正常内容区分
+        return fingerprint(inputs, self.debug, self.model_client is None)
+    
+    def _create_full_page_prompt(self, page_type: str, analysis: Dict) -> str:
+        """生成页面的完整prompt（模型可用时包含RAG上下文）"""
         # 生成基础prompt
         base_prompt = self._create_page_prompt(page_type, analysis)
         
+        # debug模式或模型不可用时不会调用模型，无需检索上下文
+        if self.debug or self.model_client is None:
+            return base_prompt
+        
         # 如果启用RAG，使用RAG增强prompt
         if self.enable_rag and self.code_rag is not None and analysis.get('rag_enabled', False):
             # 根据页面类型生成查询
@@ -683,9 +882,21 @@ class WebsiteGenerator:
             if self.verbose:
                 self.console.print(f"[green]🔍 使用RAG增强 {page_type} 页面prompt[/green]")
             
-            prompt = enhanced_prompt
-        else:
-            prompt = base_prompt
+            return enhanced_prompt
+        
+        return base_prompt
+    
+    def _complete_page_content(self, page_type: str, prompt: str, analysis: Dict) -> str:
+        """调用LLM根据prompt生成页面内容"""
+        if self.debug:
+            # Debug模式下跳过大模型调用，返回简单的占位符内容
+            self.console.print(f"[yellow]生成 {page_type} 页面 (debug模式 - 跳过大模型调用)...[/yellow]")
+            return self._generate_debug_page_content(page_type, analysis)
+        
+        # 检查model_client是否可用
+        if self.model_client is None:
+            self.console.print(f"[yellow]⚠️  模型客户端不可用，使用debug模式生成 {page_type} 页面[/yellow]")
+            return self._generate_debug_page_content(page_type, analysis)
         
         # 在verbose模式下打印prompt
         if self.verbose:
@@ -871,9 +1082,10 @@ print("Hello, {project_name}!")
         try:
             self.console.print("[bold cyan]📝 正在生成README内容作为首页...[/bold cyan]")
             
-            # 创建readmex实例，启用silent模式避免交互式输入
+            # 创建readmex实例，启用silent模式避免交互式输入，复用网站生成器的模型客户端
             from readmex.core import readmex
-            readme_generator = readmex(str(self.project_dir), silent=True, debug=self.debug)
+            readme_generator = readmex(str(self.project_dir), silent=True, debug=self.debug,
+                                       model_client=self.model_client)
             
             # 设置基本配置
             readme_generator.output_dir = str(self.project_dir / "temp_readme_output")
@@ -887,23 +1099,14 @@ print("Hello, {project_name}!")
             readme_generator._get_user_info()
             readme_generator._get_project_meta_info()
             
-            # 分析项目
-            structure = readme_generator._get_project_structure()
-            dependencies = readme_generator._get_project_dependencies()
-            descriptions = readme_generator._get_script_descriptions()
-            
-            # 自动生成项目描述等信息
-            if not readme_generator.config["project_description"]:
-                readme_generator.config["project_description"] = readme_generator._generate_project_description(structure, dependencies, descriptions)
+            # 复用网站的项目分析结果，不再重复遍历项目结构、分析依赖和逐文件调用模型生成描述
+            structure = analysis.get('structure', '')
+            dependencies = self._format_dependencies_for_readme(analysis.get('dependencies', {}))
+            descriptions = self._build_file_descriptions(analysis)
             
-            if not readme_generator.config["entry_file"]:
-                readme_generator.config["entry_file"] = readme_generator._generate_entry_file(structure, dependencies, descriptions)
-            
-            if not readme_generator.config["key_features"]:
-                readme_generator.config["key_features"] = readme_generator._generate_key_features(structure, dependencies, descriptions)
-            
-            if not readme_generator.config["additional_info"]:
-                readme_generator.config["additional_info"] = readme_generator._generate_additional_info(structure, dependencies, descriptions)
+            # 自动生成项目描述等信息（相互独立的模型调用作为全局调度器的任务并发执行）
+            readme_generator._generate_missing_meta_fields(structure, dependencies, descriptions,
+                                                           scheduler=self._scheduler)
             
             # 生成README内容（传递logo路径以保留logo）
             # 查找项目中的logo文件
@@ -951,6 +1154,59 @@ print("Hello, {project_name}!")
             # 回退到原始的页面生成方法
             return self._generate_page_content('home', analysis)
         
+    def _format_dependencies_for_readme(self, dependencies: Dict) -> str:
+        """将项目分析中的依赖转换为README生成使用的文本"""
+        sections = []
+        for label, key in [('Python', 'python'), ('Node.js', 'npm'), ('Other', 'other')]:
+            items = dependencies.get(key) or []
+            if items:
+                sections.append(f"# {label}\n" + "\n".join(items))
+        return "\n\n".join(sections) if sections else "No dependencies detected."
+    
+    def _build_file_descriptions(self, analysis: Dict, max_entries_per_file: int = 15) -> str:
+        """根据已提取的类和函数生成每个源文件的简要描述，格式与README生成的文件描述一致（JSON字符串）
+        
+        只列出顶层类和函数的签名及文档字符串首行，不调用模型。
+        """
+        entries_by_file: Dict[str, List[Tuple[int, int, str]]] = {}
+        for item in analysis.get('classes', []) + analysis.get('functions', []):
+            entries_by_file.setdefault(item['file_path'], []).append(
+                (item['line_start'], item['line_end'], self._summarize_definition(item['definition']))
+            )
+        
+        descriptions = {}
+        for file_path in sorted(entries_by_file):
+            # 按行号排序后跳过落在前一个顶层定义范围内的方法和嵌套定义
+            top_level, last_end = [], 0
+            for line_start, line_end, summary in sorted(entries_by_file[file_path]):
+                if line_start > last_end:
+                    top_level.append(summary)
+                    last_end = line_end
+            
+            try:
+                relative_path = str(Path(file_path).relative_to(self.project_dir))
+            except ValueError:
+                relative_path = file_path
+            
+            lines = top_level[:max_entries_per_file]
+            if len(top_level) > max_entries_per_file:
+                lines.append(f"... ({len(top_level) - max_entries_per_file} more)")
+            descriptions[relative_path] = "\n".join(lines)
+        
+        return json.dumps(descriptions, indent=2, ensure_ascii=False)
+    
+    @staticmethod
+    def _summarize_definition(definition: str) -> str:
+        """取定义的签名行和文档字符串首行"""
+        lines = [line.strip() for line in definition.split('\n') if line.strip()]
+        lines = [line for line in lines if not line.startswith('@')]
+        if not lines:
+            return ''
+        signature = lines[0]
+        doc_lines = [line.strip('"\' ') for line in lines[1:]]
+        doc_lines = [line for line in doc_lines if line]
+        return f"{signature}  # {doc_lines[0]}" if doc_lines else signature
+    
     def _fix_code_blocks(self, content: str) -> str:
         """修复代码块格式"""
         lines = content.split('\n')
@@ -978,8 +1234,10 @@ print("Hello, {project_name}!")
         return '\n'.join(fixed_lines)
     
     def _write_page(self, filename: str, content: str) -> None:
-        """写入页面文件"""
+        """写入页面文件，内容未变化时不重写"""
         file_path = self.docs_dir / filename
+        if page_unchanged(file_path, content):
+            return
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
         with open(file_path, 'w', encoding='utf-8') as f:
@@ -990,32 +1248,27 @@ print("Hello, {project_name}!")
         """获取项目依赖"""
         dependencies = {'python': [], 'npm': [], 'other': []}
         
+        # Node.js依赖只解析第一个找到的文件
+        npm_files = [filename for filename in NPM_MANIFESTS if self.dependency_manifests.exists(filename)][:1]
+        
+        # 一次性读取所有清单，未变化的清单直接使用缓存的解析结果，其余并行解析
+        manifests = self.dependency_manifests.parse(PYTHON_MANIFESTS + tuple(npm_files) + OTHER_MANIFESTS)
+        
         # 检查Python依赖
         python_deps = set()  # 使用set避免重复
         
         # 按优先级检查依赖文件
-        dep_files = [
-            ('pyproject.toml', 'pyproject'),
-            ('requirements.txt', 'requirements'),
-            ('setup.py', 'setup'),
-            ('Pipfile', 'pipfile'),
-            ('setup.cfg', 'setup_cfg'),
-            ('environment.yml', 'conda'),
-            ('poetry.lock', 'poetry')
-        ]
-        
-        for filename, file_type in dep_files:
-            file_path = self.project_dir / filename
-            if file_path.exists():
-                try:
-                    parsed_deps = self._parse_python_deps(file_path)
-                    if parsed_deps:
-                        python_deps.update(parsed_deps)
-                        if self.verbose:
-                            self.console.print(f"[green]Found {len(parsed_deps)} dependencies in {filename}[/green]")
-                except Exception as e:
-                    if self.verbose:
-                        self.console.print(f"[yellow]Warning: Could not parse {filename}: {e}[/yellow]")
+        for filename in PYTHON_MANIFESTS:
+            manifest = manifests.get(filename)
+            if manifest is None:
+                continue
+            if manifest.error is not None:
+                if self.verbose:
+                    self.console.print(f"[yellow]Warning: Could not parse {filename}: {manifest.error}[/yellow]")
+            elif manifest.dependencies:
+                python_deps.update(manifest.dependencies)
+                if self.verbose:
+                    self.console.print(f"[green]Found {len(manifest.dependencies)} dependencies in {filename}[/green]")
         
         # 如果没有找到依赖文件，尝试从代码中推断
         if not python_deps:
@@ -1027,18 +1280,15 @@ print("Hello, {project_name}!")
         dependencies['python'] = sorted(list(python_deps))
                 
         # 检查Node.js依赖
-        for js_file in ['package.json', 'package-lock.json', 'yarn.lock']:
-            js_path = self.project_dir / js_file
-            if js_path.exists():
-                try:
-                    npm_deps = self._parse_npm_deps(js_path)
-                    dependencies['npm'].extend(npm_deps)
-                    if npm_deps and self.verbose:
-                        self.console.print(f"[green]Found {len(npm_deps)} npm dependencies in {js_file}[/green]")
-                    break  # 只解析第一个找到的文件
-                except Exception as e:
-                    if self.verbose:
-                        self.console.print(f"[yellow]Warning: Could not parse {js_file}: {e}[/yellow]")
+        for js_file in npm_files:
+            manifest = manifests[js_file]
+            if manifest.error is not None:
+                if self.verbose:
+                    self.console.print(f"[yellow]Warning: Could not parse {js_file}: {manifest.error}[/yellow]")
+                continue
+            dependencies['npm'].extend(manifest.dependencies)
+            if manifest.dependencies and self.verbose:
+                self.console.print(f"[green]Found {len(manifest.dependencies)} npm dependencies in {js_file}[/green]")
         
         # 检查其他类型的依赖
         other_deps = self._detect_other_dependencies()
@@ -1046,43 +1296,53 @@ print("Hello, {project_name}!")
         
         return dependencies
         
+    def _extract_python_apis(self) -> Tuple[List[Dict], List[Dict]]:
+        """解析项目中的Python文件，一次解析同时提取函数和类
+
+        未变化的文件直接使用源文件缓存中的结果；其余文件数超过阈值时使用多进程并行解析，
+        否则复用与CodeRAG共享的解析结果。结果按文件路径顺序合并，并在本次运行内复用。
+        """
+        if self._python_apis is not None:
+            return self._python_apis
+
+        python_files = sorted(self.project_dir.rglob('*.py'))
+        tasks = [(str(file_path), str(self.project_dir)) for file_path in python_files]
+        results = self.source_cache.map_extract(
+            tasks,
+            key_fn=lambda t: f"python_apis:{PYTHON_API_CACHE_VERSION}:{t[0]}:{t[1]}",
+            local_fn=self._extract_cached_python_apis,
+            worker=_extract_python_apis_worker,
+            threshold=get_parallel_parse_threshold(),
+            console=self.console
+        )
+
+        functions, classes = [], []
+        for (file_path, _), (file_functions, file_classes, error) in zip(tasks, results):
+            if error is not None:
+                self.console.print(f"[yellow]Warning: Could not parse {file_path}: {error}[/yellow]")
+                continue
+            functions.extend(file_functions)
+            classes.extend(file_classes)
+
+        self._python_apis = (functions, classes)
+        return self._python_apis
+
+    def _extract_cached_python_apis(self, task: Tuple[str, str]) -> Tuple[List[Dict], List[Dict], Optional[str]]:
+        """当前进程内提取单个文件的函数和类，复用共享的解析结果"""
+        file_path, project_dir = task
+        try:
+            functions, classes = PythonAPIExtractor(Path(project_dir)).extract_parsed(self.source_cache.get(file_path))
+            return functions, classes, None
+        except Exception as e:
+            return [], [], str(e)
+
     def _extract_functions(self) -> List[Dict]:
         """提取项目中的函数"""
-        functions = []
-        python_files = list(self.project_dir.rglob('*.py'))
-        
-        for file_path in python_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                tree = ast.parse(content)
-                file_functions = self._extract_functions_from_ast(tree, file_path, content)
-                functions.extend(file_functions)
-                
-            except Exception as e:
-                self.console.print(f"[yellow]Warning: Could not parse {file_path}: {e}[/yellow]")
-                
-        return functions
+        return self._extract_python_apis()[0]
         
     def _extract_classes(self) -> List[Dict]:
         """提取项目中的类"""
-        classes = []
-        python_files = list(self.project_dir.rglob('*.py'))
-        
-        for file_path in python_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                tree = ast.parse(content)
-                file_classes = self._extract_classes_from_ast(tree, file_path, content)
-                classes.extend(file_classes)
-                
-            except Exception as e:
-                self.console.print(f"[yellow]Warning: Could not parse {file_path}: {e}[/yellow]")
-                
-        return classes
+        return self._extract_python_apis()[1]
         
     def _get_modules(self) -> List[str]:
         """获取项目模块列表"""
@@ -1125,18 +1385,11 @@ print("Hello, {project_name}!")
         git_info = {}
         
         try:
-            import subprocess
-            
-            # 获取远程仓库URL
-            result = subprocess.run(
-                ['git', 'remote', 'get-url', 'origin'],
-                cwd=self.project_dir,
-                capture_output=True,
-                text=True
-            )
+            # 获取远程仓库URL（直接读取 .git/config，失败时回退到git命令）
+            remote_url = get_remote_url(self.project_dir)
             
-            if result.returncode == 0:
-                git_info['remote_url'] = result.stdout.strip()
+            if remote_url:
+                git_info['remote_url'] = remote_url
                 
                 # 解析GitHub信息
                 github_match = re.search(
@@ -1154,129 +1407,64 @@ print("Hello, {project_name}!")
         return git_info
     
     def _get_git_commit_history(self, limit: int = 20) -> List[Dict]:
-        """获取增强的Git提交历史，包含文件变更统计"""
+        """获取增强的Git提交历史，包含文件变更统计（一次 git log --numstat 调用）"""
+        cache_key = ('commits', limit)
+        if cache_key in self._git_metadata:
+            return self._git_metadata[cache_key]
+        
         commits = []
         
         try:
-            import subprocess
-            
-            # 获取最近的提交历史，包含文件变更统计
-            result = subprocess.run(
-                ['git', 'log', f'--max-count={limit}', '--pretty=format:%H|%an|%ae|%ad|%s', '--date=short', '--stat', '--oneline'],
-                cwd=self.project_dir,
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')
-                i = 0
-                while i < len(lines):
-                    line = lines[i]
-                    if '|' in line and len(line.split('|')) >= 5:
-                        parts = line.split('|', 4)
-                        if len(parts) == 5:
-                            commit_hash = parts[0][:8]
-                            
-                            # 获取该提交的详细文件变更信息
-                            stat_result = subprocess.run(
-                                ['git', 'show', '--stat', '--format=', parts[0]],
-                                cwd=self.project_dir,
-                                capture_output=True,
-                                text=True
-                            )
-                            
-                            files_changed = []
-                            insertions = 0
-                            deletions = 0
-                            
-                            if stat_result.returncode == 0:
-                                stat_lines = stat_result.stdout.strip().split('\n')
-                                for stat_line in stat_lines:
-                                    if '|' in stat_line and ('+' in stat_line or '-' in stat_line):
-                                        file_info = stat_line.split('|')
-                                        if len(file_info) >= 2:
-                                            filename = file_info[0].strip()
-                                            changes = file_info[1].strip()
-                                            files_changed.append({
-                                                'file': filename,
-                                                'changes': changes
-                                            })
-                                    elif 'insertion' in stat_line or 'deletion' in stat_line:
-                                        # 解析插入和删除行数
-                                        import re
-                                        ins_match = re.search(r'(\d+) insertion', stat_line)
-                                        del_match = re.search(r'(\d+) deletion', stat_line)
-                                        if ins_match:
-                                            insertions = int(ins_match.group(1))
-                                        if del_match:
-                                            deletions = int(del_match.group(1))
-                            
-                            # 分析提交类型（基于 Conventional Commits）
-                            commit_type = self._analyze_commit_type(parts[4])
-                            
-                            commits.append({
-                                'hash': commit_hash,
-                                'author': parts[1],
-                                'email': parts[2],
-                                'date': parts[3],
-                                'message': parts[4],
-                                'files_changed': files_changed,
-                                'insertions': insertions,
-                                'deletions': deletions,
-                                'type': commit_type,
-                                'is_breaking': self._is_breaking_change(parts[4])
-                            })
-                    i += 1
-                            
+            for record in self.git_history.recent_commits(limit):
+                files_changed = [
+                    {
+                        'file': change.path,
+                        'changes': 'binary' if change.insertions is None
+                        else f"+{change.insertions} -{change.deletions}"
+                    }
+                    for change in record.files
+                ]
+                
+                commits.append({
+                    'hash': record.hash[:8],
+                    'author': record.author,
+                    'email': record.email,
+                    'date': record.date,
+                    'message': record.subject,
+                    'files_changed': files_changed,
+                    'insertions': record.insertions,
+                    'deletions': record.deletions,
+                    # 分析提交类型（基于 Conventional Commits）
+                    'type': self._analyze_commit_type(record.subject),
+                    'is_breaking': self._is_breaking_change(record.subject)
+                })
+            self._git_metadata[cache_key] = commits
+        
         except Exception as e:
             self.console.print(f"[yellow]Warning: Could not get git commit history: {e}[/yellow]")
-            
+        
         return commits
     
     def _get_git_contributors(self) -> List[Dict]:
         """获取Git贡献者信息"""
+        if 'contributors' in self._git_metadata:
+            return self._git_metadata['contributors']
+        
         contributors = []
         
         try:
-            import subprocess
-            
-            # 获取贡献者统计
-            result = subprocess.run(
-                ['git', 'shortlog', '-sn', '--all'],
-                cwd=self.project_dir,
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode == 0:
-                for line in result.stdout.strip().split('\n'):
-                    if line:
-                        parts = line.strip().split('\t', 1)
-                        if len(parts) == 2:
-                            commit_count = int(parts[0])
-                            author_name = parts[1]
-                            
-                            # 获取作者邮箱
-                            email_result = subprocess.run(
-                                ['git', 'log', '--author', author_name, '--pretty=format:%ae', '-1'],
-                                cwd=self.project_dir,
-                                capture_output=True,
-                                text=True
-                            )
-                            
-                            email = email_result.stdout.strip() if email_result.returncode == 0 else ''
-                            
-                            contributors.append({
-                                'name': author_name,
-                                'email': email,
-                                'commits': commit_count,
-                                'avatar_url': f'https://github.com/{author_name}.png' if email else ''
-                            })
-                            
+            for contributor in self.git_history.contributors():
+                contributors.append({
+                    'name': contributor['name'],
+                    'email': contributor['email'],
+                    'commits': contributor['commits'],
+                    'avatar_url': f"https://github.com/{contributor['name']}.png" if contributor['email'] else ''
+                })
+            self._git_metadata['contributors'] = contributors
+        
         except Exception as e:
             self.console.print(f"[yellow]Warning: Could not get git contributors: {e}[/yellow]")
-            
+        
         return contributors
     
     def _analyze_commit_statistics(self, commits: List[Dict]) -> Dict[str, int]:
@@ -1337,35 +1525,16 @@ print("Hello, {project_name}!")
         return any(indicator in message for indicator in breaking_indicators)
     
     def _get_git_tags(self) -> List[Dict]:
-        """获取Git标签信息"""
+        """获取Git标签信息（随提交历史一起缓存），按创建日期从新到旧排列"""
         tags = []
         
         try:
-            import subprocess
-            
-            # 获取标签列表，按日期排序
-            result = subprocess.run(
-                ['git', 'tag', '-l', '--sort=-creatordate', '--format=%(refname:short)|%(creatordate:short)|%(subject)'],
-                cwd=self.project_dir,
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode == 0:
-                for line in result.stdout.strip().split('\n'):
-                    if line:
-                        parts = line.split('|', 2)
-                        if len(parts) >= 2:
-                            tags.append({
-                                'name': parts[0],
-                                'date': parts[1],
-                                'message': parts[2] if len(parts) > 2 else ''
-                            })
-                            
+            tags = [dict(tag) for tag in self.git_history.tags()]
+        
         except Exception as e:
             if self.verbose:
                 self.console.print(f"[yellow]Warning: Could not get git tags: {e}[/yellow]")
-            
+        
         return tags
     
     def _validate_drawio_content(self, content: str) -> bool:
@@ -1406,17 +1575,141 @@ print("Hello, {project_name}!")
             # 如果没有xml模块或其他错误，使用基本验证
             return True
     
-    def _generate_drawio_diagram(self, analysis: Dict) -> str:
-        """
-        生成架构图的 drawio 代码（带重试逻辑）
+    def _get_module_graph(self, analysis: Dict) -> ModuleGraph:
+        """根据Python模块的导入关系（和CodeRAG中的调用、继承关系）构建模块依赖图，测试模块除外
         
-        Args:
-            analysis: 项目分析结果
-            
-        Returns:
-            str: drawio XML 代码
+        每个文件的导入按内容哈希缓存在源文件缓存中，未变化的文件不再解析。
         """
-        git_info = analysis.get('git_info', {})
+        if self._module_graph is not None:
+            return self._module_graph
+        
+        python_files = {}
+        for file_path in sorted(self.project_dir.rglob('*.py')):
+            relative_path = file_path.relative_to(self.project_dir)
+            module = str(relative_path).replace('/', '.').replace('\\', '.').replace('.py', '')
+            if module in analysis.get('modules', []) and not is_test_module(module):
+                python_files[module] = file_path
+        
+        tasks = [(str(file_path), module) for module, file_path in python_files.items()]
+        results = self.source_cache.map_extract(
+            tasks,
+            key_fn=lambda t: f"imports:{IMPORT_GRAPH_CACHE_VERSION}:{t[1]}",
+            local_fn=self._extract_cached_imports,
+            worker=_extract_imports_worker,
+            threshold=get_parallel_parse_threshold(),
+            console=self.console
+        )
+        imports = {module: file_imports for (_, module), (file_imports, _) in zip(tasks, results)}
+        
+        self._module_graph = build_module_graph(list(python_files), imports, self._code_relation_modules())
+        return self._module_graph
+    
+    def _extract_cached_imports(self, task: Tuple[str, str]) -> Tuple[List[List[str]], Optional[str]]:
+        """当前进程内提取单个文件的导入，复用共享的解析结果"""
+        file_path, module = task
+        try:
+            return extract_imports(self.source_cache.get(file_path).tree, module), None
+        except Exception as e:
+            return [], str(e)
+    
+    def _code_relation_modules(self) -> List[Tuple[str, str]]:
+        """CodeRAG中跨模块的调用和继承关系，按名称匹配时只保留目标唯一的关系"""
+        code_blocks = getattr(self.code_rag, 'code_blocks', None) or {}
+        relations = getattr(self.code_rag, 'relations', None) or []
+        if not code_blocks or not relations:
+            return []
+        
+        name_counts: Dict[str, int] = {}
+        for block in code_blocks.values():
+            name_counts[block.name] = name_counts.get(block.name, 0) + 1
+        
+        pairs = []
+        for relation in relations:
+            source = code_blocks.get(relation.source_id)
+            target = code_blocks.get(relation.target_id)
+            if source is None or target is None or source.module == target.module:
+                continue
+            if name_counts.get(target.name, 0) == 1:
+                pairs.append((source.module, target.module))
+        return pairs
+    
+    def _generate_drawio_diagram(self, analysis: Dict) -> str:
+        """
+        生成架构图的 drawio 代码
+        
+        默认根据模块依赖图在本地确定性地生成（可选地请求模型生成节点说明）；
+        配置为 llm 模式或项目中没有Python模块时由模型生成。
+        
+        Args:
+            analysis: 项目分析结果
+        
+        Returns:
+            str: drawio XML 代码
+        """
+        git_info = analysis.get('git_info', {})
+        project_name = git_info.get('repo_name', Path(self.project_dir).name)
+        diagram_config = get_architecture_diagram_config()
+        
+        if diagram_config['mode'] == 'local':
+            module_graph = self._get_module_graph(analysis)
+            if module_graph.nodes:
+                labels = None
+                if diagram_config['llm_labels'] and not self.debug and self.model_client is not None:
+                    labels = self._generate_diagram_labels(module_graph, analysis)
+                if self.verbose:
+                    self.console.print(f"[green]根据模块依赖图生成架构图: {len(module_graph.nodes)} 个节点, {len(module_graph.edges)} 条依赖[/green]")
+                return generate_architecture_drawio(module_graph, project_name, labels)
+            
+            if self.debug or self.model_client is None:
+                return self._get_default_drawio_diagram(project_name)
+        
+        return self._generate_llm_drawio_diagram(analysis)
+    
+    def _generate_diagram_labels(self, module_graph: ModuleGraph, analysis: Dict) -> Dict[str, str]:
+        """请求模型为架构图的每个节点生成简短说明，失败时返回空字典"""
+        node_of = {module: node for node, members in module_graph.members.items() for module in members}
+        symbols: Dict[str, List[str]] = {}
+        for item in analysis.get('classes', []) + analysis.get('functions', []):
+            node = node_of.get(item['module'])
+            if node is not None and len(symbols.setdefault(node, [])) < 8:
+                symbols[node].append(item['name'])
+        
+        node_lines = "\n".join(
+            f"- {node}: {', '.join(symbols.get(node, [])) or '（无公开的类和函数）'}"
+            for node in sorted(module_graph.nodes)
+        )
+        prompt = f"""
+以下是项目架构图中的模块及其主要的类和函数：
+
+{node_lines}
+
+请为每个模块写一句不超过12个字的中文功能说明。
+只返回一个JSON对象，键为上面列出的模块名，值为功能说明，不要包含其他文字。
+"""
+        try:
+            response = self.model_client.get_answer(prompt)
+            response = response[response.index('{'):response.rindex('}') + 1]
+            labels = json.loads(response)
+        except Exception as e:
+            if self.verbose:
+                self.console.print(f"[yellow]架构图节点说明生成失败: {e}[/yellow]")
+            return {}
+        
+        if not isinstance(labels, dict):
+            return {}
+        return {node: str(label).strip()[:30] for node, label in labels.items() if node in module_graph.nodes and label}
+    
+    def _generate_llm_drawio_diagram(self, analysis: Dict) -> str:
+        """
+        由模型生成架构图的 drawio 代码（带重试逻辑）
+        
+        Args:
+            analysis: 项目分析结果
+        
+        Returns:
+            str: drawio XML 代码
+        """
+        git_info = analysis.get('git_info', {})
         project_name = git_info.get('repo_name', Path(self.project_dir).name)
         modules = analysis.get('modules', [])
         functions = analysis.get('functions', [])
@@ -2295,379 +2588,7 @@ print("Hello, {project_name}!")
         else:
             return str(value)
     
-    # AST解析辅助方法
-    def _extract_functions_from_ast(self, tree: ast.AST, file_path: Path, content: str) -> List[Dict]:
-        """从AST中提取函数信息"""
-        functions = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                func_info = {
-                    'name': node.name,
-                    'module': self._get_module_name(file_path),
-                    'file_path': str(file_path),
-                    'line_start': node.lineno,
-                    'line_end': getattr(node, 'end_lineno', node.lineno),
-                    'definition': self._extract_function_definition(node, content),
-                    'context': self._extract_function_context(node, content),
-                    'metadata': self._extract_function_metadata(node),
-                    'lines': getattr(node, 'end_lineno', node.lineno) - node.lineno + 1
-                }
-                functions.append(func_info)
-                
-        return functions
-        
-    def _extract_classes_from_ast(self, tree: ast.AST, file_path: Path, content: str) -> List[Dict]:
-        """从AST中提取类信息"""
-        classes = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                class_info = {
-                    'name': node.name,
-                    'module': self._get_module_name(file_path),
-                    'file_path': str(file_path),
-                    'line_start': node.lineno,
-                    'line_end': getattr(node, 'end_lineno', node.lineno),
-                    'definition': self._extract_class_definition(node, content),
-                    'context': self._extract_class_context(node, content),
-                    'metadata': self._extract_class_metadata(node),
-                    'methods': self._extract_class_methods(node)
-                }
-                classes.append(class_info)
-                
-        return classes
-        
-    def _get_module_name(self, file_path: Path) -> str:
-        """获取模块名"""
-        relative_path = file_path.relative_to(self.project_dir)
-        return str(relative_path).replace('/', '.').replace('\\', '.').replace('.py', '')
-        
-    def _extract_function_definition(self, node: ast.FunctionDef, content: str) -> str:
-        """提取函数定义"""
-        lines = content.split('\n')
-        start_line = node.lineno - 1
-        end_line = getattr(node, 'end_lineno', node.lineno)
-        
-        # 提取函数签名和文档字符串
-        definition_lines = []
-        
-        # 添加装饰器
-        for decorator in node.decorator_list:
-            decorator_line = start_line - len(node.decorator_list) + node.decorator_list.index(decorator)
-            if 0 <= decorator_line < len(lines):
-                definition_lines.append(lines[decorator_line].strip())
-                
-        # 添加函数签名
-        if start_line < len(lines):
-            func_line = lines[start_line].strip()
-            definition_lines.append(func_line)
-            
-        # 添加文档字符串
-        if (isinstance(node.body[0], ast.Expr) and 
-            isinstance(node.body[0].value, ast.Constant) and 
-            isinstance(node.body[0].value.value, str)):
-            docstring = node.body[0].value.value
-            definition_lines.append(f'    """\n    {docstring}\n    """')
-            
-        return '\n'.join(definition_lines)
-        
-    def _extract_class_definition(self, node: ast.ClassDef, content: str) -> str:
-        """提取类定义"""
-        lines = content.split('\n')
-        start_line = node.lineno - 1
-        
-        definition_lines = []
-        
-        # 添加装饰器
-        for decorator in node.decorator_list:
-            decorator_line = start_line - len(node.decorator_list) + node.decorator_list.index(decorator)
-            if 0 <= decorator_line < len(lines):
-                definition_lines.append(lines[decorator_line].strip())
-                
-        # 添加类签名
-        if start_line < len(lines):
-            class_line = lines[start_line].strip()
-            definition_lines.append(class_line)
-            
-        # 添加文档字符串
-        if (node.body and isinstance(node.body[0], ast.Expr) and 
-            isinstance(node.body[0].value, ast.Constant) and 
-            isinstance(node.body[0].value.value, str)):
-            docstring = node.body[0].value.value
-            definition_lines.append(f'    """\n    {docstring}\n    """')
-            
-        return '\n'.join(definition_lines)
-        
-    def _extract_function_context(self, node: ast.FunctionDef, content: str) -> str:
-        """提取函数上下文信息"""
-        lines = content.split('\n')
-        start_line = max(0, node.lineno - 5)  # 前5行
-        end_line = min(len(lines), getattr(node, 'end_lineno', node.lineno) + 3)  # 后3行
-        
-        context_lines = lines[start_line:end_line]
-        return '\n'.join(context_lines)
-        
-    def _extract_class_context(self, node: ast.ClassDef, content: str) -> str:
-        """提取类上下文信息"""
-        lines = content.split('\n')
-        start_line = max(0, node.lineno - 3)
-        end_line = min(len(lines), node.lineno + 10)  # 类的前几行
-        
-        context_lines = lines[start_line:end_line]
-        return '\n'.join(context_lines)
-        
-    def _extract_function_metadata(self, node: ast.FunctionDef) -> Dict:
-        """提取函数元数据"""
-        metadata = {
-            'args': [arg.arg for arg in node.args.args],
-            'defaults': len(node.args.defaults),
-            'returns': bool(node.returns),
-            'is_async': isinstance(node, ast.AsyncFunctionDef),
-            'decorators': [ast.unparse(d) for d in node.decorator_list] if hasattr(ast, 'unparse') else [],
-            'complexity': self._calculate_complexity(node)
-        }
-        return metadata
-        
-    def _extract_class_metadata(self, node: ast.ClassDef) -> Dict:
-        """提取类元数据"""
-        metadata = {
-            'bases': [ast.unparse(base) for base in node.bases] if hasattr(ast, 'unparse') else [],
-            'decorators': [ast.unparse(d) for d in node.decorator_list] if hasattr(ast, 'unparse') else [],
-            'methods': len([n for n in node.body if isinstance(n, ast.FunctionDef)]),
-            'properties': len([n for n in node.body if isinstance(n, ast.FunctionDef) and 
-                             any(isinstance(d, ast.Name) and d.id == 'property' for d in n.decorator_list)])
-        }
-        return metadata
-        
-    def _extract_class_methods(self, node: ast.ClassDef) -> List[str]:
-        """提取类方法名列表"""
-        methods = []
-        for item in node.body:
-            if isinstance(item, ast.FunctionDef):
-                methods.append(item.name)
-        return methods
-        
-    def _calculate_complexity(self, node: ast.FunctionDef) -> int:
-        """计算函数复杂度（简单版本）"""
-        complexity = 1  # 基础复杂度
-        
-        for child in ast.walk(node):
-            if isinstance(child, (ast.If, ast.While, ast.For, ast.Try, ast.With)):
-                complexity += 1
-            elif isinstance(child, ast.BoolOp):
-                complexity += len(child.values) - 1
-                
-        return complexity
-        
     # 依赖解析辅助方法
-    def _parse_python_deps(self, file_path: Path) -> List[str]:
-        """解析Python依赖"""
-        deps = []
-        filename = file_path.name.lower()
-        
-        try:
-            if filename == 'requirements.txt' or filename.endswith('.txt'):
-                deps = self._parse_requirements_txt(file_path)
-            elif filename == 'pyproject.toml':
-                deps = self._parse_pyproject_toml(file_path)
-            elif filename == 'setup.py':
-                deps = self._parse_setup_py(file_path)
-            elif filename == 'pipfile':
-                deps = self._parse_pipfile(file_path)
-            elif filename == 'setup.cfg':
-                deps = self._parse_setup_cfg(file_path)
-            elif filename == 'environment.yml':
-                deps = self._parse_conda_env(file_path)
-            elif filename == 'poetry.lock':
-                deps = self._parse_poetry_lock(file_path)
-                
-        except Exception as e:
-            if self.verbose:
-                self.console.print(f"[yellow]Warning: Error parsing {file_path}: {e}[/yellow]")
-                
-        return deps
-    
-    def _parse_requirements_txt(self, file_path: Path) -> List[str]:
-        """解析requirements.txt文件"""
-        deps = []
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                # 跳过注释、空行和-r/-e选项
-                if line and not line.startswith('#') and not line.startswith('-'):
-                    # 处理git+https://等URL依赖
-                    if line.startswith('git+') or line.startswith('http'):
-                        # 尝试从URL中提取包名
-                        if '#egg=' in line:
-                            pkg_name = line.split('#egg=')[1].split('&')[0]
-                        else:
-                            continue
-                    else:
-                        # 提取包名（去除版本号和额外选项）
-                        pkg_name = re.split(r'[>=<!=\[\s]', line)[0].strip()
-                    
-                    if pkg_name and pkg_name not in deps:
-                        deps.append(pkg_name)
-        return deps
-    
-    def _parse_pyproject_toml(self, file_path: Path) -> List[str]:
-        """解析pyproject.toml文件"""
-        deps = []
-        
-        try:
-            import tomli
-            with open(file_path, 'rb') as f:
-                data = tomli.load(f)
-                
-            # 从project.dependencies中提取
-            project_deps = data.get('project', {}).get('dependencies', [])
-            for dep in project_deps:
-                pkg_name = re.split(r'[>=<!=\[\s]', dep)[0].strip()
-                if pkg_name:
-                    deps.append(pkg_name)
-            
-            # 从tool.poetry.dependencies中提取（Poetry格式）
-            poetry_deps = data.get('tool', {}).get('poetry', {}).get('dependencies', {})
-            for pkg_name in poetry_deps.keys():
-                if pkg_name != 'python':  # 排除python版本要求
-                    deps.append(pkg_name)
-                    
-        except ImportError:
-            # 如果没有tomli，尝试简单解析
-            deps = self._parse_toml_fallback(file_path)
-            
-        return deps
-    
-    def _parse_toml_fallback(self, file_path: Path) -> List[str]:
-        """TOML文件的fallback解析方法"""
-        deps = []
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # 匹配dependencies数组
-        deps_patterns = [
-            r'dependencies\s*=\s*\[(.*?)\]',
-            r'\[tool\.poetry\.dependencies\](.*?)(?=\[|$)'
-        ]
-        
-        for pattern in deps_patterns:
-            matches = re.findall(pattern, content, re.DOTALL)
-            for match in matches:
-                # 提取引号内的依赖
-                dep_matches = re.findall(r'["\']([^"\'><=!\[]+)', match)
-                for dep in dep_matches:
-                    if dep and dep != 'python':
-                        deps.append(dep)
-                        
-        return deps
-    
-    def _parse_setup_py(self, file_path: Path) -> List[str]:
-        """解析setup.py文件"""
-        deps = []
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # 匹配install_requires
-        install_requires_match = re.search(r'install_requires\s*=\s*\[(.*?)\]', content, re.DOTALL)
-        if install_requires_match:
-            deps_str = install_requires_match.group(1)
-            dep_matches = re.findall(r'["\']([^"\'><=!\[]+)', deps_str)
-            deps.extend(dep_matches)
-            
-        return deps
-    
-    def _parse_pipfile(self, file_path: Path) -> List[str]:
-        """解析Pipfile文件"""
-        deps = []
-        try:
-            import tomli
-            with open(file_path, 'rb') as f:
-                data = tomli.load(f)
-                
-            # 从packages和dev-packages中提取
-            for section in ['packages', 'dev-packages']:
-                if section in data:
-                    deps.extend(data[section].keys())
-                    
-        except ImportError:
-            # fallback解析
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            sections = re.findall(r'\[(packages|dev-packages)\](.*?)(?=\[|$)', content, re.DOTALL)
-            for section_name, section_content in sections:
-                dep_matches = re.findall(r'^([a-zA-Z0-9_-]+)\s*=', section_content, re.MULTILINE)
-                deps.extend(dep_matches)
-                
-        return deps
-    
-    def _parse_setup_cfg(self, file_path: Path) -> List[str]:
-        """解析setup.cfg文件"""
-        deps = []
-        try:
-            import configparser
-            config = configparser.ConfigParser()
-            config.read(file_path)
-            
-            if 'options' in config and 'install_requires' in config['options']:
-                install_requires = config['options']['install_requires']
-                for line in install_requires.split('\n'):
-                    line = line.strip()
-                    if line:
-                        pkg_name = re.split(r'[>=<!=\[\s]', line)[0].strip()
-                        if pkg_name:
-                            deps.append(pkg_name)
-                            
-        except Exception:
-            pass
-            
-        return deps
-    
-    def _parse_conda_env(self, file_path: Path) -> List[str]:
-        """解析conda environment.yml文件"""
-        deps = []
-        try:
-            import yaml
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
-                
-            if 'dependencies' in data:
-                for dep in data['dependencies']:
-                    if isinstance(dep, str):
-                        # 跳过conda-forge等channel信息
-                        if '::' not in dep:
-                            pkg_name = re.split(r'[>=<!=\s]', dep)[0].strip()
-                            if pkg_name:
-                                deps.append(pkg_name)
-                                
-        except ImportError:
-            pass
-        except Exception:
-            pass
-            
-        return deps
-    
-    def _parse_poetry_lock(self, file_path: Path) -> List[str]:
-        """解析poetry.lock文件"""
-        deps = []
-        try:
-            import tomli
-            with open(file_path, 'rb') as f:
-                data = tomli.load(f)
-                
-            if 'package' in data:
-                for package in data['package']:
-                    if 'name' in package:
-                        deps.append(package['name'])
-                        
-        except ImportError:
-            pass
-        except Exception:
-            pass
-            
-        return deps
-    
     def _infer_dependencies_from_code(self) -> List[str]:
         """从代码中推断依赖包"""
         deps = set()
@@ -2735,38 +2656,43 @@ print("Hello, {project_name}!")
     def _detect_other_dependencies(self) -> List[str]:
         """检测其他类型的依赖"""
         other_deps = []
+        manifests = self.dependency_manifests.parse(OTHER_MANIFESTS)
+        exists = self.dependency_manifests.exists
+        
+        def manifest_deps(filename: str) -> List[str]:
+            manifest = manifests.get(filename)
+            if manifest is None:
+                return []
+            if manifest.error is not None and self.verbose:
+                self.console.print(f"[yellow]Warning: Could not parse {manifest.path}: {manifest.error}[/yellow]")
+            return manifest.dependencies or []
         
         # Go语言
-        if (self.project_dir / 'go.mod').exists():
-            other_deps.extend(self._parse_go_mod(self.project_dir / 'go.mod'))
-        if (self.project_dir / 'go.sum').exists():
+        other_deps.extend(manifest_deps('go.mod'))
+        if exists('go.sum'):
             other_deps.append('Go modules')
-            
+        
         # Rust语言
-        if (self.project_dir / 'Cargo.toml').exists():
-            other_deps.extend(self._parse_cargo_toml(self.project_dir / 'Cargo.toml'))
-        if (self.project_dir / 'Cargo.lock').exists():
+        other_deps.extend(manifest_deps('Cargo.toml'))
+        if exists('Cargo.lock'):
             other_deps.append('Rust crates')
-            
+        
         # Java/Kotlin
-        if (self.project_dir / 'pom.xml').exists():
-            other_deps.extend(self._parse_maven_pom(self.project_dir / 'pom.xml'))
-        if (self.project_dir / 'build.gradle').exists() or (self.project_dir / 'build.gradle.kts').exists():
+        other_deps.extend(manifest_deps('pom.xml'))
+        if exists('build.gradle') or exists('build.gradle.kts'):
             other_deps.append('Gradle dependencies')
-            
+        
         # C/C++
-        if (self.project_dir / 'CMakeLists.txt').exists():
+        if exists('CMakeLists.txt'):
             other_deps.append('CMake')
-        if (self.project_dir / 'conanfile.txt').exists() or (self.project_dir / 'conanfile.py').exists():
+        if exists('conanfile.txt') or exists('conanfile.py'):
             other_deps.append('Conan packages')
-            
+        
         # Ruby
-        if (self.project_dir / 'Gemfile').exists():
-            other_deps.extend(self._parse_gemfile(self.project_dir / 'Gemfile'))
-            
+        other_deps.extend(manifest_deps('Gemfile'))
+        
         # PHP
-        if (self.project_dir / 'composer.json').exists():
-            other_deps.extend(self._parse_composer_json(self.project_dir / 'composer.json'))
+        other_deps.extend(manifest_deps('composer.json'))
         
         # 检查Docker
         if (self.project_dir / 'Dockerfile').exists():
@@ -2814,201 +2740,6 @@ print("Hello, {project_name}!")
                 
         return other_deps
         
-    def _parse_npm_deps(self, file_path: Path) -> List[str]:
-        """解析NPM依赖"""
-        deps = []
-        filename = file_path.name.lower()
-        
-        try:
-            if filename == 'package.json':
-                deps = self._parse_package_json(file_path)
-            elif filename == 'package-lock.json':
-                deps = self._parse_package_lock(file_path)
-            elif filename == 'yarn.lock':
-                deps = self._parse_yarn_lock(file_path)
-                
-        except Exception as e:
-            if self.verbose:
-                self.console.print(f"[yellow]Warning: Could not parse {file_path}: {e}[/yellow]")
-            
-        return deps
-    
-    def _parse_package_json(self, file_path: Path) -> List[str]:
-        """解析package.json文件"""
-        deps = []
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        # 提取dependencies和devDependencies
-        for dep_type in ['dependencies', 'devDependencies', 'peerDependencies', 'optionalDependencies']:
-            if dep_type in data:
-                deps.extend(data[dep_type].keys())
-                
-        return deps
-    
-    def _parse_package_lock(self, file_path: Path) -> List[str]:
-        """解析package-lock.json文件"""
-        deps = []
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        # 从dependencies中提取
-        if 'dependencies' in data:
-            deps.extend(data['dependencies'].keys())
-        elif 'packages' in data:
-            # npm v7+ 格式
-            for pkg_path, pkg_info in data['packages'].items():
-                if pkg_path.startswith('node_modules/'):
-                    pkg_name = pkg_path.replace('node_modules/', '')
-                    deps.append(pkg_name)
-                    
-        return deps
-    
-    def _parse_yarn_lock(self, file_path: Path) -> List[str]:
-        """解析yarn.lock文件"""
-        deps = set()
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # 匹配包名模式
-        # yarn.lock格式: "package-name@version":
-        pkg_patterns = [
-            r'^"?([a-zA-Z0-9@/_-]+)@',
-            r'^([a-zA-Z0-9@/_-]+)@'
-        ]
-        
-        for pattern in pkg_patterns:
-            matches = re.findall(pattern, content, re.MULTILINE)
-            for match in matches:
-                # 清理包名
-                pkg_name = match.split('@')[0] if '@' in match else match
-                if pkg_name and not pkg_name.startswith('.'):
-                    deps.add(pkg_name)
-                    
-        return list(deps)
-    
-    def _parse_go_mod(self, file_path: Path) -> List[str]:
-        """解析go.mod文件"""
-        deps = []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 匹配require块中的依赖
-            require_pattern = r'require\s*\(([^)]+)\)'
-            require_match = re.search(require_pattern, content, re.DOTALL)
-            if require_match:
-                require_block = require_match.group(1)
-                # 匹配每个依赖行
-                dep_pattern = r'([a-zA-Z0-9./\\-_]+)\s+v[0-9.]+'
-                deps.extend(re.findall(dep_pattern, require_block))
-            
-            # 匹配单行require
-            single_require_pattern = r'require\s+([a-zA-Z0-9./\\-_]+)\s+v[0-9.]+'
-            deps.extend(re.findall(single_require_pattern, content))
-            
-        except Exception as e:
-            if self.verbose:
-                self.console.print(f"[yellow]Warning: Could not parse {file_path}: {e}[/yellow]")
-        
-        return deps
-    
-    def _parse_cargo_toml(self, file_path: Path) -> List[str]:
-        """解析Cargo.toml文件"""
-        deps = []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 尝试使用tomli解析
-            try:
-                import tomli
-                data = tomli.loads(content)
-                
-                # 提取dependencies
-                for dep_type in ['dependencies', 'dev-dependencies', 'build-dependencies']:
-                    if dep_type in data:
-                        deps.extend(data[dep_type].keys())
-                        
-            except ImportError:
-                # 简单的正则匹配
-                dep_pattern = r'^([a-zA-Z0-9_\\-]+)\s*='
-                in_deps_section = False
-                
-                for line in content.split('\n'):
-                    line = line.strip()
-                    if line.startswith('[dependencies') or line.startswith('[dev-dependencies') or line.startswith('[build-dependencies'):
-                        in_deps_section = True
-                        continue
-                    elif line.startswith('[') and in_deps_section:
-                        in_deps_section = False
-                        continue
-                    elif in_deps_section and '=' in line:
-                        match = re.match(dep_pattern, line)
-                        if match:
-                            deps.append(match.group(1))
-                            
-        except Exception as e:
-            if self.verbose:
-                self.console.print(f"[yellow]Warning: Could not parse {file_path}: {e}[/yellow]")
-        
-        return deps
-    
-    def _parse_maven_pom(self, file_path: Path) -> List[str]:
-        """解析Maven pom.xml文件"""
-        deps = []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 匹配dependency标签中的artifactId
-            artifact_pattern = r'<artifactId>([^<]+)</artifactId>'
-            deps.extend(re.findall(artifact_pattern, content))
-            
-        except Exception as e:
-            if self.verbose:
-                self.console.print(f"[yellow]Warning: Could not parse {file_path}: {e}[/yellow]")
-        
-        return deps
-    
-    def _parse_gemfile(self, file_path: Path) -> List[str]:
-        """解析Ruby Gemfile"""
-        deps = []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 匹配gem声明
-            gem_pattern = r"gem\s+['\"]([^'\"]+)['\"]"
-            deps.extend(re.findall(gem_pattern, content))
-            
-        except Exception as e:
-            if self.verbose:
-                self.console.print(f"[yellow]Warning: Could not parse {file_path}: {e}[/yellow]")
-        
-        return deps
-    
-    def _parse_composer_json(self, file_path: Path) -> List[str]:
-        """解析PHP composer.json文件"""
-        deps = []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 提取require和require-dev
-            for dep_type in ['require', 'require-dev']:
-                if dep_type in data:
-                    deps.extend(data[dep_type].keys())
-                    
-        except Exception as e:
-            if self.verbose:
-                self.console.print(f"[yellow]Warning: Could not parse {file_path}: {e}[/yellow]")
-        
-        return deps
-        
     def _parse_pyproject_scripts(self, file_path: Path) -> List[str]:
         """解析pyproject.toml中的脚本"""
         scripts = []
@@ -3182,7 +2913,7 @@ class APIDocumentationFilter:
 
 
 class APIDocumentationGenerator:
-    """API文档生成器 - 为单个API生成详细文档"""
+    """API文档生成器 - 为单个API或同一模块的一批API生成详细文档"""
     
     def __init__(self, model_client: ModelClient, debug: bool = False):
         self.model_client = model_client
@@ -3201,6 +2932,43 @@ class APIDocumentationGenerator:
         prompt = self._create_api_documentation_prompt(definition, context, metadata)
         return self.model_client.generate_text(prompt)
     
+    def plan_batches(self, apis: List[Dict], token_budget: int, max_batch_size: int) -> List[List[Dict]]:
+        """按顺序将API分批：每批的定义与上下文不超过token预算，且不超过 max_batch_size 个"""
+        batches: List[List[Dict]] = []
+        current: List[Dict] = []
+        current_tokens = 0
+        for api in apis:
+            tokens = estimate_tokens(self._format_batch_entry(len(current) + 1, api))
+            if current and (current_tokens + tokens > token_budget or len(current) >= max(1, max_batch_size)):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(api)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    def generate_batch_documentation(self, apis: List[Dict]) -> List[str]:
+        """一次请求为一批API生成文档，返回与 apis 一一对应的markdown文档
+        
+        回复中缺失或无法解析的条目单独重新请求。
+        """
+        if self.debug or self.model_client is None or len(apis) == 1:
+            return [self.generate_api_documentation(api['definition'], api['context'], api['metadata'])
+                    for api in apis]
+        
+        try:
+            response = self.model_client.generate_text(self._create_batch_documentation_prompt(apis))
+            documents = self._split_batch_response(response, len(apis))
+        except Exception:
+            documents = [None] * len(apis)
+        
+        return [
+            document if document is not None
+            else self.generate_api_documentation(api['definition'], api['context'], api['metadata'])
+            for api, document in zip(apis, documents)
+        ]
+    
     def _generate_debug_api_documentation(self, definition: str, context: str, metadata: Dict) -> str:
         """在debug模式下生成简单的API文档"""
         api_name = metadata.get('name', 'Unknown API')
@@ -3251,4 +3019,260 @@ class APIDocumentationGenerator:
 {json.dumps(metadata, indent=2, ensure_ascii=False)}
 
 请生成markdown格式的文档，确保在"源代码"部分包含一个独立的代码块，显示完整的函数/类源代码并带有Python语法高亮：
-"""
\ No newline at end of file
+"""
+
+    def _format_batch_entry(self, index: int, api: Dict) -> str:
+        """批量prompt中单个API的输入部分"""
+        return f"""### API {index}: {api['name']}（{api.get('type', 'function')}）
+
+函数/类定义：
+```python
+{api['definition']}
+```
+
+上下文信息：
+{api['context']}
+
+元数据：
+{json.dumps(api['metadata'], indent=2, ensure_ascii=False)}
+"""
+
+    def _create_batch_documentation_prompt(self, apis: List[Dict]) -> str:
+        """创建批量API文档生成的提示词"""
+        entries = "\n".join(self._format_batch_entry(index, api) for index, api in enumerate(apis, 1))
+        return f"""
+请为以下 {len(apis)} 个来自模块 `{apis[0]['module']}` 的函数/类分别生成详细的API文档，每个API的文档包括：
+
+1. 功能描述
+2. 参数说明（类型、描述、默认值）
+3. 返回值说明（类型、描述）
+4. 源代码（在单独的代码块中显示完整的函数/类代码，包含正常的Python语法高亮）
+5. 使用示例
+6. 注意事项
+
+输出格式要求：每个API的markdown文档必须放在对应编号的起止标记之间，标记单独成行、保持原样，
+按编号顺序输出全部 {len(apis)} 个API，标记之外不要输出任何内容：
+
+<!-- API: 1 -->
+（API 1 的markdown文档）
+<!-- END API: 1 -->
+
+{entries}
+"""
+
+    @staticmethod
+    def _split_batch_response(response: str, count: int) -> List[Optional[str]]:
+        """按起止标记拆分批量回复，返回与编号 1..count 对应的文档，缺失、为空或未结束的条目为None"""
+        documents: List[Optional[str]] = [None] * count
+        starts = list(API_SECTION_START_RE.finditer(response or ''))
+        for position, match in enumerate(starts):
+            index = int(match.group(1))
+            if not 1 <= index <= count or documents[index - 1] is not None:
+                continue
+            
+            section_end = starts[position + 1].start() if position + 1 < len(starts) else len(response)
+            section = response[match.end():section_end]
+            end_match = API_SECTION_END_RE.search(section)
+            if end_match is None or int(end_match.group(1)) != index:
+                # 没有结束标记（如回复被截断）的条目需要重新生成
+                continue
+            
+            document = section[:end_match.start()].strip()
+            if document:
+                documents[index - 1] = document + "\n"
+        return documents
+
+
+class PythonAPIExtractor:
+    """Python源文件API提取器 - 从AST中提取函数和类的定义、上下文与元数据
+
+    不依赖WebsiteGenerator实例状态，可以在子进程中独立运行。
+    """
+
+    def __init__(self, project_dir: Path):
+        self.project_dir = Path(project_dir)
+
+    def extract_file(self, file_path: Path) -> Tuple[List[Dict], List[Dict]]:
+        """解析单个文件，同时提取函数和类"""
+        return self.extract_parsed(ParsedSource.from_file(file_path))
+
+    def extract_parsed(self, source: ParsedSource) -> Tuple[List[Dict], List[Dict]]:
+        """从共享的解析结果提取函数和类"""
+        file_path = Path(source.path)
+        return (self.extract_functions(source.tree, file_path, source),
+                self.extract_classes(source.tree, file_path, source))
+
+    def extract_functions(self, tree: ast.AST, file_path: Path, source: ParsedSource) -> List[Dict]:
+        """从AST中提取函数信息"""
+        functions = []
+        
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef):
+                func_info = {
+                    'name': node.name,
+                    'module': self._get_module_name(file_path),
+                    'file_path': str(file_path),
+                    'line_start': node.lineno,
+                    'line_end': getattr(node, 'end_lineno', node.lineno),
+                    'definition': self._extract_function_definition(node, source),
+                    'context': self._extract_function_context(node, source),
+                    'metadata': self._extract_function_metadata(node),
+                    'lines': getattr(node, 'end_lineno', node.lineno) - node.lineno + 1
+                }
+                functions.append(func_info)
+                
+        return functions
+        
+    def extract_classes(self, tree: ast.AST, file_path: Path, source: ParsedSource) -> List[Dict]:
+        """从AST中提取类信息"""
+        classes = []
+        
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ClassDef):
+                class_info = {
+                    'name': node.name,
+                    'module': self._get_module_name(file_path),
+                    'file_path': str(file_path),
+                    'line_start': node.lineno,
+                    'line_end': getattr(node, 'end_lineno', node.lineno),
+                    'definition': self._extract_class_definition(node, source),
+                    'context': self._extract_class_context(node, source),
+                    'metadata': self._extract_class_metadata(node),
+                    'methods': self._extract_class_methods(node)
+                }
+                classes.append(class_info)
+                
+        return classes
+        
+    def _get_module_name(self, file_path: Path) -> str:
+        """获取模块名"""
+        relative_path = file_path.relative_to(self.project_dir)
+        return str(relative_path).replace('/', '.').replace('\\', '.').replace('.py', '')
+        
+    def _extract_function_definition(self, node: ast.FunctionDef, source: ParsedSource) -> str:
+        """提取函数定义"""
+        start_line = node.lineno - 1
+        end_line = getattr(node, 'end_lineno', node.lineno)
+        
+        # 提取函数签名和文档字符串
+        definition_lines = []
+        
+        # 添加装饰器
+        for decorator in node.decorator_list:
+            decorator_line = start_line - len(node.decorator_list) + node.decorator_list.index(decorator)
+            if 0 <= decorator_line < len(source.lines):
+                definition_lines.append(source.segment(decorator_line + 1, decorator_line + 1).strip())
+                
+        # 添加函数签名
+        if start_line < len(source.lines):
+            func_line = source.segment(start_line + 1, start_line + 1).strip()
+            definition_lines.append(func_line)
+            
+        # 添加文档字符串
+        if (isinstance(node.body[0], ast.Expr) and 
+            isinstance(node.body[0].value, ast.Constant) and 
+            isinstance(node.body[0].value.value, str)):
+            docstring = node.body[0].value.value
+            definition_lines.append(f'    """\n    {docstring}\n    """')
+            
+        return '\n'.join(definition_lines)
+        
+    def _extract_class_definition(self, node: ast.ClassDef, source: ParsedSource) -> str:
+        """提取类定义"""
+        start_line = node.lineno - 1
+        
+        definition_lines = []
+        
+        # 添加装饰器
+        for decorator in node.decorator_list:
+            decorator_line = start_line - len(node.decorator_list) + node.decorator_list.index(decorator)
+            if 0 <= decorator_line < len(source.lines):
+                definition_lines.append(source.segment(decorator_line + 1, decorator_line + 1).strip())
+                
+        # 添加类签名
+        if start_line < len(source.lines):
+            class_line = source.segment(start_line + 1, start_line + 1).strip()
+            definition_lines.append(class_line)
+            
+        # 添加文档字符串
+        if (node.body and isinstance(node.body[0], ast.Expr) and 
+            isinstance(node.body[0].value, ast.Constant) and 
+            isinstance(node.body[0].value.value, str)):
+            docstring = node.body[0].value.value
+            definition_lines.append(f'    """\n    {docstring}\n    """')
+            
+        return '\n'.join(definition_lines)
+        
+    def _extract_function_context(self, node: ast.FunctionDef, source: ParsedSource) -> str:
+        """提取函数上下文信息"""
+        start_line = node.lineno - 4  # 前5行
+        end_line = getattr(node, 'end_lineno', node.lineno) + 3  # 后3行
+        
+        return source.segment(start_line, end_line)
+        
+    def _extract_class_context(self, node: ast.ClassDef, source: ParsedSource) -> str:
+        """提取类上下文信息"""
+        start_line = node.lineno - 2
+        end_line = node.lineno + 10  # 类的前几行
+        
+        return source.segment(start_line, end_line)
+        
+    def _extract_function_metadata(self, node: ast.FunctionDef) -> Dict:
+        """提取函数元数据"""
+        metadata = {
+            'args': [arg.arg for arg in node.args.args],
+            'defaults': len(node.args.defaults),
+            'returns': bool(node.returns),
+            'is_async': isinstance(node, ast.AsyncFunctionDef),
+            'decorators': [ast.unparse(d) for d in node.decorator_list] if hasattr(ast, 'unparse') else [],
+            'complexity': self._calculate_complexity(node)
+        }
+        return metadata
+        
+    def _extract_class_metadata(self, node: ast.ClassDef) -> Dict:
+        """提取类元数据"""
+        metadata = {
+            'bases': [ast.unparse(base) for base in node.bases] if hasattr(ast, 'unparse') else [],
+            'decorators': [ast.unparse(d) for d in node.decorator_list] if hasattr(ast, 'unparse') else [],
+            'methods': len([n for n in node.body if isinstance(n, ast.FunctionDef)]),
+            'properties': len([n for n in node.body if isinstance(n, ast.FunctionDef) and 
+                             any(isinstance(d, ast.Name) and d.id == 'property' for d in n.decorator_list)])
+        }
+        return metadata
+        
+    def _extract_class_methods(self, node: ast.ClassDef) -> List[str]:
+        """提取类方法名列表"""
+        methods = []
+        for item in node.body:
+            if isinstance(item, ast.FunctionDef):
+                methods.append(item.name)
+        return methods
+        
+    def _calculate_complexity(self, node: ast.FunctionDef) -> int:
+        """计算函数复杂度（简单版本）"""
+        complexity = 1  # 基础复杂度
+        
+        for child in ast.walk(node):
+            if isinstance(child, (ast.If, ast.While, ast.For, ast.Try, ast.With)):
+                complexity += 1
+            elif isinstance(child, ast.BoolOp):
+                complexity += len(child.values) - 1
+                
+        return complexity
+
+
+def _extract_python_apis_worker(task: Tuple[str, str]) -> Tuple[List[Dict], List[Dict], Optional[str]]:
+    """进程池任务：提取单个文件的函数和类
+
+    Args:
+        task: (文件路径, 项目目录)
+
+    Returns:
+        Tuple[List[Dict], List[Dict], Optional[str]]: 函数列表、类列表以及错误信息
+    """
+    file_path, project_dir = task
+    try:
+        functions, classes = PythonAPIExtractor(Path(project_dir)).extract_file(Path(file_path))
+        return functions, classes, None
+    except Exception as e:
+        return [], [], str(e)
@@ -0,0 +1,112 @@
+# tests/test_architecture_diagram.py
+# 测试根据模块依赖图在本地生成架构图
+
+import ast
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from readmex.utils.architecture_diagram import (
+    build_module_graph, extract_imports, generate_architecture_drawio, layout_module_graph
+)
+from readmex.website_core import WebsiteGenerator
+
+
+def _imports(source: str, module: str):
+    return extract_imports(ast.parse(source), module)
+
+
+class TestModuleGraph:
+    """导入解析、分层、合并和确定性输出"""
+
+    def test_import_resolution(self):
+        modules = ['src.pkg.__init__', 'src.pkg.core', 'src.pkg.utils.__init__', 'src.pkg.utils.io', 'src.pkg.cli']
+        imports = {
+            'src.pkg.cli': _imports("from pkg import core\nimport json\nfrom .utils import io", 'src.pkg.cli'),
+            'src.pkg.core': _imports("from pkg.utils.io import read\nfrom . import missing", 'src.pkg.core'),
+        }
+        graph = build_module_graph(modules, imports)
+
+        # 公共前缀 src 被去掉，__init__ 以包名表示
+        assert set(graph.nodes) == {'pkg', 'pkg.core', 'pkg.utils', 'pkg.utils.io', 'pkg.cli'}
+        assert graph.nodes['pkg.utils.io'] == 'pkg.utils'
+        assert graph.nodes['pkg.utils'] == 'pkg.utils'
+        assert graph.nodes['pkg.core'] == 'pkg'
+        # from . import missing 解析到包本身，标准库导入被忽略
+        assert set(graph.edges) == {
+            ('pkg.cli', 'pkg.core'), ('pkg.cli', 'pkg.utils.io'), ('pkg.core', 'pkg.utils.io'), ('pkg.core', 'pkg')
+        }
+
+    def test_layers_and_cycles(self):
+        modules = ['app', 'service', 'repo', 'model']
+        imports = {
+            'app': [['service']],
+            'service': [['repo'], ['model']],
+            'repo': [['model'], ['service']],
+        }
+        graph = build_module_graph(modules, imports)
+        layout = layout_module_graph(graph)
+        # service 与 repo 循环依赖，位于同一层；入口在最上层，基础模块在最下层
+        assert layout.rows == {'app': 0, 'service': 1, 'repo': 1, 'model': 2}
+
+    def test_collapse_and_deterministic_output(self):
+        modules = [f"pkg{i}.mod{j}" for i in range(4) for j in range(8)]
+        imports = {f"pkg{i}.mod0": [[f"pkg{(i + 1) % 4}.mod{j}"] for j in range(8)] for i in range(4)}
+        graph = build_module_graph(modules, imports, max_nodes=10)
+        # 32个模块合并为4个包
+        assert set(graph.nodes) == {'pkg0', 'pkg1', 'pkg2', 'pkg3'}
+        assert len(graph.members['pkg0']) == 8
+
+        drawio = generate_architecture_drawio(build_module_graph(modules, imports), 'demo')
+        assert drawio == generate_architecture_drawio(build_module_graph(modules, imports), 'demo')
+        root = ET.fromstring(drawio)
+        edges = [cell for cell in root.iter('mxCell') if cell.get('edge') == '1']
+        # 每个 mod0 指向另一个包的8条边合并为一条指向包容器的边
+        assert len(edges) == 4
+        assert all(edge.get('target').startswith('group-') and edge.get('value') == '8' for edge in edges)
+
+
+class RecordingModelClient:
+    def __init__(self):
+        self.prompts = []
+
+    def get_answer(self, prompt):
+        self.prompts.append(prompt)
+        return '{"core": "核心逻辑", "cli": "命令行入口"}'
+
+
+class TestWebsiteArchitectureDiagram:
+    """网站生成默认使用本地架构图，不请求模型生成XML"""
+
+    def test_local_diagram(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmp:
+            project_dir = Path(tmp)
+            (project_dir / "core.py").write_text("def run():\n    return 1\n", encoding="utf-8")
+            (project_dir / "cli.py").write_text("import core\n\ncore.run()\n", encoding="utf-8")
+            (project_dir / "tests").mkdir()
+            (project_dir / "tests" / "test_core.py").write_text("import core\n", encoding="utf-8")
+
+            model_client = RecordingModelClient()
+            generator = WebsiteGenerator(str(project_dir), model_client=model_client, enable_rag=False)
+            generator._create_directory_structure()
+            analysis = {'modules': generator._get_modules(), 'git_info': {'repo_name': 'demo'}, 'functions': [
+                {'module': 'core', 'name': 'run'}
+            ]}
+
+            drawio = generator._generate_drawio_diagram(analysis)
+            assert model_client.prompts == []
+            assert generator._validate_drawio_content(drawio)
+            values = {cell.get('value') for cell in ET.fromstring(drawio).iter('mxCell')}
+            assert '<b>core</b>' in values and '<b>cli</b>' in values
+            assert not any('test_core' in (value or '') for value in values)
+
+            # 可选的节点说明只需要一次模型请求
+            monkeypatch.setattr('readmex.website_core.get_architecture_diagram_config',
+                                lambda: {'mode': 'local', 'llm_labels': True})
+            drawio = generator._generate_drawio_diagram(analysis)
+            assert len(model_client.prompts) == 1
+            assert '核心逻辑' in drawio
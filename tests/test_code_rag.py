@@ -0,0 +1,921 @@
+# tests/test_code_rag.py
+# 测试 CodeRAG 的代码块提取与检索功能
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from readmex.code_rag import CodeRAG
+from readmex.sharded_rag import ShardedCodeRAG, discover_shards
+from readmex.utils.text_index import BM25Index, tokenize
+from readmex.utils.query_engine import BatchedQueryEngine
+from readmex.utils.batch_encoding import encode_sorted_batches
+from readmex.utils.context_packer import BLOCK_OVERHEAD_TOKENS, pack_context
+from readmex.utils.dedup import group_duplicate_texts
+from readmex.utils.hash_embedding import HashingEmbeddingModel
+from readmex.utils.web_embedding import WebEmbeddingClient, estimate_tokens
+from readmex.utils.embedding_server import EmbeddingServer, connect_embedding_worker
+from readmex.utils.rag_service import SERVICE_FILE_NAME, RAGServer, RAGServiceClient
+from readmex.utils.source_cache import ParsedSource, SourceCache
+from readmex.utils.vector_index import benchmark_index_strategies, choose_index_strategy, numpy_top_k
+
+
+SAMPLE_FILES = {
+    "http_server.py": '''
+class HTTPServer:
+    """Simple HTTP server that handles incoming requests"""
+
+    def handle_request(self, request):
+        """Dispatch a request to the matching route"""
+        return self.route(request)
+
+    def route(self, request):
+        return request
+''',
+    "config_loader.py": '''
+def load_config_file(path):
+    """Load configuration from a JSON file"""
+    import json
+    with open(path) as f:
+        return json.load(f)
+
+
+def parseJSONData(text):
+    return text
+''',
+}
+
+
+def _make_project(temp_dir: str) -> Path:
+    project_dir = Path(temp_dir) / "project"
+    project_dir.mkdir()
+    for filename, content in SAMPLE_FILES.items():
+        (project_dir / filename).write_text(content, encoding="utf-8")
+    return project_dir
+
+
+class FakeEmbeddingModel:
+    """基于词哈希的确定性嵌入模型，避免下载真实模型"""
+
+    def __init__(self, dimension=32):
+        self.dimension = dimension
+        self.encode_calls = 0
+
+    def encode(self, texts, show_progress_bar=False, **kwargs):
+        self.encode_calls += 1
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in tokenize(text):
+                vectors[i, sum(token.encode()) % self.dimension] += 1.0
+        return vectors
+
+
+def _make_rag(project_dir, cache_dir, model_name="fake-model", dimension=32):
+    rag = CodeRAG(str(project_dir), cache_dir=str(cache_dir), model_name=model_name, use_local_embedding=True)
+    rag.embedding_model = FakeEmbeddingModel(dimension)
+    return rag
+
+
+class TestTextIndex:
+    """测试 BM25 文本索引"""
+
+    def test_tokenize_splits_identifiers(self):
+        tokens = tokenize("parseJSONData load_config_file HTTPServer")
+        assert "parsejsondata" in tokens
+        assert {"parse", "json", "data"} <= set(tokens)
+        assert {"load", "config", "file"} <= set(tokens)
+        assert {"http", "server"} <= set(tokens)
+
+    def test_tokenize_cjk_bigrams(self):
+        assert tokenize("安装依赖") == ["安装", "装依", "依赖"]
+
+    def test_incremental_sync(self):
+        index = BM25Index()
+        assert index.sync({"a": {"name": "load_config"}, "b": {"name": "http_server"}})
+        assert not index.sync({"a": {"name": "load_config"}, "b": {"name": "http_server"}})
+
+        assert index.sync({"a": {"name": "load_config"}})
+        assert len(index) == 1
+        assert "http" not in index.postings
+
+    def test_search_ranks_name_matches_first(self):
+        index = BM25Index()
+        index.sync({
+            "name_hit": {"name": "load_config", "content": "return 1"},
+            "content_hit": {"name": "helper", "content": "config = load_config()"},
+            "miss": {"name": "render", "content": "return html"},
+        })
+        results = index.search("config", top_k=5)
+        assert [doc_id for doc_id, _ in results] == ["name_hit", "content_hit"]
+        assert results[0][1] == 1.0 and 0 < results[1][1] < 1
+
+
+class TestCodeRAGTextSearch:
+    """测试 CodeRAG 在无向量嵌入时的文本检索"""
+
+    def test_text_search_uses_persisted_index(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            cache_dir = Path(temp_dir) / "cache"
+
+            rag = CodeRAG(str(project_dir), cache_dir=str(cache_dir), use_local_embedding=True)
+            rag.extract_code_blocks(force_refresh=True)
+            assert rag.text_index_cache_file.exists()
+
+            results = rag._text_search("handle request", top_k=3, min_score=0.0)
+            assert results
+            assert results[0][0].name.endswith("handle_request")
+
+            # 新实例从缓存加载代码块与索引
+            rag2 = CodeRAG(str(project_dir), cache_dir=str(cache_dir), use_local_embedding=True)
+            rag2.extract_code_blocks()
+            results2 = rag2._text_search("json config", top_k=3, min_score=0.0)
+            assert results2[0][0].name == "load_config_file"
+
+    def test_page_style_query_passes_default_threshold(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            rag = CodeRAG(str(project_dir), cache_dir=str(Path(temp_dir) / "cache"), use_local_embedding=True)
+            rag.extract_code_blocks(force_refresh=True)
+
+            # 与 WebsiteGenerator._generate_rag_query 相同形式的查询：大部分词在代码中没有出现
+            query = "项目 project 使用方法 API 接口 主要函数 示例代码 load config request server"
+            results = rag._text_search(query, top_k=10, min_score=0.3)
+            names = {block.name for block, _ in results}
+            assert {"load_config_file", "HTTPServer"} <= names
+
+
+class TestCodeBlockExtractor:
+    """测试单次遍历的代码块提取"""
+
+    SOURCE = '''
+import os
+
+
+class Service:
+    @staticmethod
+    def build(x):
+        if x and os.path.exists(x):
+            return helper(x)
+        return None
+
+    async def fetch(self):
+        async with self.session() as s:
+            return await s.get()
+
+
+def outer():
+    def inner(y):
+        for i in y:
+            print(i)
+    return inner([1])
+
+
+async def main():
+    await Service().fetch()
+'''
+
+    def _extract(self):
+        from readmex.code_rag import CodeBlockExtractor
+        blocks = CodeBlockExtractor().extract_source(self.SOURCE, "sample.py", "sample")
+        return {block.name: block for block in blocks if block.type != 'import'}, blocks
+
+    def test_each_definition_extracted_once(self):
+        by_name, blocks = self._extract()
+        assert len(blocks) == len({block.id for block in blocks})
+        assert sorted(by_name) == ['Service', 'Service.build', 'Service.fetch', 'inner', 'main', 'outer']
+        assert by_name['Service.build'].type == 'method'
+        assert by_name['inner'].type == 'function'
+        assert by_name['inner'].metadata['qualname'] == 'outer.inner'
+        assert by_name['Service'].metadata['methods'] == ['build', 'fetch']
+
+    def test_async_definitions(self):
+        by_name, _ = self._extract()
+        assert by_name['main'].metadata['is_async']
+        assert by_name['main'].signature.startswith('async def main(')
+        assert by_name['Service.fetch'].complexity == 2
+
+    def test_dependencies_and_complexity_per_scope(self):
+        by_name, _ = self._extract()
+        build = by_name['Service.build']
+        assert build.dependencies == ['os.path.exists', 'helper']
+        assert build.complexity == 3
+        assert build.metadata['decorators'] == ['staticmethod']
+
+        # 嵌套函数的调用和控制流只计入最内层函数
+        assert by_name['inner'].dependencies == ['print']
+        assert by_name['inner'].complexity == 2
+        assert by_name['outer'].dependencies == ['inner']
+        assert by_name['outer'].complexity == 1
+
+
+class TestContextPacking:
+    """测试增强prompt的token预算上下文打包"""
+
+    def _candidates(self, temp_dir):
+        project_dir = _make_project(temp_dir)
+        rag = CodeRAG(str(project_dir), cache_dir=str(Path(temp_dir) / "cache"))
+        rag.extract_code_blocks()
+        by_name = {block.name: block for block in rag.code_blocks.values()}
+        candidates = [
+            (by_name["HTTPServer.handle_request"], 0.9),
+            (by_name["HTTPServer"], 0.8),
+            (by_name["HTTPServer.route"], 0.7),
+            (by_name["load_config_file"], 0.2),
+        ]
+        return rag, candidates
+
+    def test_container_replaces_contained_blocks(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            rag, candidates = self._candidates(temp_dir)
+            packed = pack_context(candidates, 10000, rag._render_context_block)
+
+            names = [item.block.name for item in packed]
+            assert names == ["HTTPServer", "load_config_file"]
+            assert all(item.full for item in packed)
+
+    def test_tight_budget_prefers_signatures(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            rag, candidates = self._candidates(temp_dir)
+            candidates = [candidates[0], candidates[2], candidates[3]]
+            summaries = [rag._render_context_block(block, False) for block, _ in candidates]
+            budget = sum(estimate_tokens(text) + BLOCK_OVERHEAD_TOKENS for text in summaries)
+
+            packed = pack_context(candidates, budget, rag._render_context_block)
+            assert [item.block.name for item in packed] == [
+                "HTTPServer.handle_request", "HTTPServer.route", "load_config_file"
+            ]
+            assert not any(item.full for item in packed)
+            assert sum(item.tokens for item in packed) <= budget
+            assert "代码:" not in packed[0].text
+
+
+class TestParallelExtraction:
+    """测试多进程代码块提取"""
+
+    def test_parallel_extraction_matches_serial(self, monkeypatch):
+        import readmex.code_rag as code_rag_module
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+
+            monkeypatch.setattr(code_rag_module, "get_parallel_parse_threshold", lambda: 0)
+            serial = CodeRAG(str(project_dir), cache_dir=str(Path(temp_dir) / "serial"))
+            serial.extract_code_blocks(force_refresh=True)
+
+            monkeypatch.setattr(code_rag_module, "get_parallel_parse_threshold", lambda: 1)
+            parallel = CodeRAG(str(project_dir), cache_dir=str(Path(temp_dir) / "parallel"))
+            parallel.extract_code_blocks(force_refresh=True)
+
+            assert list(parallel.code_blocks) == list(serial.code_blocks)
+            assert list(parallel.code_blocks.values()) == list(serial.code_blocks.values())
+
+
+class TestSourceCache:
+    """测试共享的源文件解析缓存"""
+
+    def test_segment_matches_line_slice(self):
+        content = "a = 1\nb = 2\nc = 3"
+        source = ParsedSource("m.py", content)
+
+        assert source.segment(2, 3) == "b = 2\nc = 3"
+        assert source.segment(1, 1) == "a = 1"
+        assert source.segment(3, 10) == "c = 3"
+        assert source.segment(3, 2) == ""
+
+    def test_results_persist_across_instances(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            tasks = [(str(project_dir / name),) for name in sorted(SAMPLE_FILES)]
+            calls = []
+
+            def local_fn(task):
+                calls.append(task)
+                return len(cache.get(task[0]).tree.body)
+
+            cache = SourceCache(Path(temp_dir) / "cache")
+            first = cache.map_extract(tasks, lambda t: "body", local_fn, worker=None, threshold=0)
+            assert len(calls) == 2
+
+            cache = SourceCache(Path(temp_dir) / "cache")
+            assert cache.map_extract(tasks, lambda t: "body", local_fn, worker=None, threshold=0) == first
+            assert len(calls) == 2
+
+            # 内容变化后重新计算
+            (project_dir / "http_server.py").write_text("x = 1\n", encoding="utf-8")
+            cache = SourceCache(Path(temp_dir) / "cache")
+            assert cache.map_extract(tasks, lambda t: "body", local_fn, worker=None, threshold=0)[1] == 1
+            assert len(calls) == 3
+
+    def test_stale_results_are_pruned(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            cache_dir = Path(temp_dir) / "cache"
+            paths = [str(project_dir / name) for name in sorted(SAMPLE_FILES)]
+
+            def extract(cache, selected):
+                return cache.map_extract([(path,) for path in selected], lambda t: "body",
+                                         lambda t: len(cache.get(t[0]).tree.body), worker=None, threshold=0)
+
+            extract(SourceCache(cache_dir), paths)
+            assert len(list((cache_dir / "source_cache").glob("*.pkl"))) == 2
+
+            # 只读取部分文件的运行不删除其他文件的缓存
+            extract(SourceCache(cache_dir), paths[:1])
+            assert len(list((cache_dir / "source_cache").glob("*.pkl"))) == 2
+
+            # 文件内容变化后旧版本的缓存被删除，文件删除后其缓存也被删除
+            old_hash = SourceCache().get(paths[0]).content_hash
+            Path(paths[0]).write_text("x = 1\n", encoding="utf-8")
+            Path(paths[1]).unlink()
+            cache = SourceCache(cache_dir)
+            extract(cache, paths[:1])
+            assert [f.stem for f in (cache_dir / "source_cache").glob("*.pkl")] == [cache.get(paths[0]).content_hash]
+            assert cache.get(paths[0]).content_hash != old_hash
+
+    def test_code_rag_and_website_share_parsed_tree(self, monkeypatch):
+        import readmex.code_rag as code_rag_module
+        from readmex.website_core import PythonAPIExtractor
+
+        monkeypatch.setattr(code_rag_module, "get_parallel_parse_threshold", lambda: 0)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            cache = SourceCache()
+            rag = CodeRAG(str(project_dir), cache_dir=str(Path(temp_dir) / "rag"), source_cache=cache)
+            rag.extract_code_blocks(force_refresh=True)
+
+            source = cache.get(project_dir / "http_server.py")
+            tree = source.tree
+            functions, classes = PythonAPIExtractor(project_dir).extract_parsed(source)
+
+            assert cache.get(project_dir / "http_server.py").tree is tree
+            assert [cls['name'] for cls in classes] == ["HTTPServer"]
+            assert {func['name'] for func in functions} == {"handle_request", "route"}
+
+
+class TestShardedCodeRAG:
+    """测试按顶层目录分片的索引"""
+
+    def _make_monorepo(self, temp_dir: str) -> Path:
+        project_dir = Path(temp_dir) / "monorepo"
+        for package, (filename, content) in zip(["server", "config"], SAMPLE_FILES.items()):
+            (project_dir / package).mkdir(parents=True)
+            (project_dir / package / filename).write_text(content, encoding="utf-8")
+        (project_dir / "setup.py").write_text("def setup_package():\n    return None\n", encoding="utf-8")
+        return project_dir
+
+    def _make_sharded(self, project_dir, cache_dir, model):
+        rag = ShardedCodeRAG(str(project_dir), cache_dir=str(cache_dir), model_name="fake-model", use_local_embedding=True)
+        rag.embedding_model = model
+        return rag
+
+    def test_sharded_search_matches_single_index(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = self._make_monorepo(temp_dir)
+            assert discover_shards(project_dir) == [".", "config", "server"]
+
+            single = _make_rag(project_dir, Path(temp_dir) / "single")
+            single.extract_code_blocks()
+            single.build_embeddings()
+
+            sharded = self._make_sharded(project_dir, Path(temp_dir) / "sharded", FakeEmbeddingModel())
+            sharded.extract_code_blocks()
+            assert sharded.build_embeddings()
+
+            assert set(sharded.code_blocks) == set(single.code_blocks)
+            for query in ["handle request", "load config file"]:
+                expected = [(block.id, round(score, 5)) for block, score in single.semantic_search(query, top_k=3, min_score=0.0)]
+                actual = [(block.id, round(score, 5)) for block, score in sharded.semantic_search(query, top_k=3, min_score=0.0)]
+                assert [score for _, score in actual] == [score for _, score in expected]
+                assert actual[0] == expected[0]
+
+    def test_only_changed_shard_is_rebuilt(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = self._make_monorepo(temp_dir)
+            cache_dir = Path(temp_dir) / "cache"
+
+            model = FakeEmbeddingModel()
+            rag = self._make_sharded(project_dir, cache_dir, model)
+            rag.extract_code_blocks()
+            rag.build_embeddings()
+            assert model.encode_calls == 3
+
+            (project_dir / "server" / "http_server.py").write_text(
+                SAMPLE_FILES["http_server.py"] + "\n\ndef shutdown_server():\n    pass\n", encoding="utf-8"
+            )
+
+            model = FakeEmbeddingModel()
+            rag = self._make_sharded(project_dir, cache_dir, model)
+            rag.extract_code_blocks()
+            rag.build_embeddings()
+            assert model.encode_calls == 1
+            assert any(block.name == "shutdown_server" for block in rag.code_blocks.values())
+
+
+class TestBatchedQueryEngine:
+    """测试微批处理查询引擎"""
+
+    def _make_engine(self, calls, batch_window=0.05):
+        corpus = np.eye(4, dtype=np.float32)
+
+        def encode_fn(texts):
+            calls.append(list(texts))
+            return np.stack([corpus[int(text[-1])] for text in texts])
+
+        def search_fn(vectors, top_k):
+            scores = vectors @ corpus.T
+            indices = np.argsort(-scores, axis=1)[:, :top_k]
+            return np.take_along_axis(scores, indices, axis=1), indices
+
+        return BatchedQueryEngine(encode_fn, search_fn, batch_window=batch_window)
+
+    def test_concurrent_queries_are_batched(self):
+        calls = []
+        engine = self._make_engine(calls)
+        results = {}
+
+        def worker(i):
+            scores, indices = engine.search(f"query {i % 4}", top_k=2)
+            results[i] = (scores, indices)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(results) == 8
+        for i, (scores, indices) in results.items():
+            assert indices[0] == i % 4
+            assert scores[0] == pytest.approx(1.0)
+            assert len(indices) == 2
+
+        # 并发查询被合并，且相同查询文本只编码一次
+        encoded = [text for batch in calls for text in batch]
+        assert len(encoded) == len(set(encoded)) == 4
+        assert engine.batches_processed < 8
+
+    def test_query_embedding_cache(self):
+        calls = []
+        engine = self._make_engine(calls, batch_window=0)
+        engine.search("query 1", top_k=1)
+        engine.search("query 1", top_k=1)
+        assert len(calls) == 1
+        assert engine.cache_hits == 1
+
+    def test_errors_are_propagated(self):
+        def encode_fn(texts):
+            raise RuntimeError("model unavailable")
+
+        engine = BatchedQueryEngine(encode_fn, lambda v, k: (v, v), batch_window=0)
+        with pytest.raises(RuntimeError):
+            engine.search("query", top_k=1)
+
+
+class TestEmbeddingWorker:
+    """测试本地嵌入常驻服务"""
+
+    def test_remote_encode_matches_local_model(self):
+        model = FakeEmbeddingModel(16)
+        server = EmbeddingServer("fake-model", port=0, idle_timeout=0, model=model)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            client = connect_embedding_worker("fake-model", port=server.port, autostart=False)
+            assert client is not None
+
+            texts = ["load config file", "http server request"]
+            np.testing.assert_allclose(client.encode(texts), FakeEmbeddingModel(16).encode(texts))
+
+            # 模型不一致时不复用服务
+            assert connect_embedding_worker("other-model", port=server.port, autostart=False) is None
+        finally:
+            server.shutdown()
+            thread.join(timeout=5)
+
+    def test_idle_timeout_shuts_down_server(self):
+        server = EmbeddingServer("fake-model", port=0, idle_timeout=0.2, model=FakeEmbeddingModel())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+
+class TestRAGService:
+    """测试常驻RAG查询服务"""
+
+    def test_client_transparently_uses_service(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            cache_dir = Path(temp_dir) / "cache"
+
+            server = RAGServer(_make_rag(project_dir, cache_dir), port=0)
+            server.start()
+            try:
+                assert (cache_dir / SERVICE_FILE_NAME).exists()
+
+                # 客户端不加载模型，检索结果与服务端一致
+                client = CodeRAG(str(project_dir), cache_dir=str(cache_dir), model_name="fake-model", use_local_embedding=True)
+                client.extract_code_blocks()
+                assert client.build_embeddings()
+                assert client.embedding_model is None
+
+                expected = server.rag.semantic_search("handle request", top_k=3, min_score=0.0)
+                actual = client.semantic_search("handle request", top_k=3, min_score=0.0)
+                assert [(block.id, score) for block, score in actual] == [(block.id, score) for block, score in expected]
+                assert client.generate_enhanced_prompt("base", "load config") == \
+                    server.rag.generate_enhanced_prompt("base", "load config")
+
+                # 源文件变化后，新的客户端会让服务增量重建索引
+                (project_dir / "extra.py").write_text("def shutdown_server():\n    pass\n", encoding="utf-8")
+                client = CodeRAG(str(project_dir), cache_dir=str(cache_dir), model_name="fake-model", use_local_embedding=True)
+                results = client.semantic_search("shutdown server", top_k=1, min_score=0.0)
+                assert results[0][0].name == "shutdown_server"
+
+                # 模型不一致时不使用服务
+                other = CodeRAG(str(project_dir), cache_dir=str(cache_dir), model_name="other-model", use_local_embedding=True)
+                assert other._get_rag_service() is None
+            finally:
+                server.shutdown()
+
+            assert not (cache_dir / SERVICE_FILE_NAME).exists()
+
+    def test_refresh_picks_up_edited_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            server = RAGServer(_make_rag(project_dir, Path(temp_dir) / "cache"), port=0)
+            server.start()
+            try:
+                client = RAGServiceClient(server.base_url)
+                names = lambda: {item['block']['name'] for item in client.search("server", top_k=20, min_score=0.0)}
+                assert "HTTPServer" in names()
+
+                # 修改已解析过的文件后刷新，服务使用新的内容而不是内存中的旧解析结果
+                (project_dir / "http_server.py").write_text(
+                    "def start_server():\n    pass\n\n\ndef stop_server():\n    pass\n", encoding="utf-8")
+                assert client.refresh()["refreshed"]
+                assert {"start_server", "stop_server"} <= names()
+                assert "HTTPServer" not in names()
+            finally:
+                server.shutdown()
+
+    def test_concurrent_fallback_connects_and_rebuilds_once(self, monkeypatch):
+        import readmex.code_rag as code_rag_module
+
+        class FailingService:
+            base_url = "http://127.0.0.1:0"
+
+            def search(self, *args):
+                raise ConnectionError("service stopped")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            rag = _make_rag(project_dir, Path(temp_dir) / "cache")
+            rag.extract_code_blocks()
+
+            connects, builds = [], []
+
+            def connect(*args):
+                connects.append(args)
+                time.sleep(0.05)
+                return FailingService()
+
+            original_build = rag.build_embeddings
+
+            def build():
+                builds.append(1)
+                time.sleep(0.05)
+                return original_build()
+
+            monkeypatch.setattr(code_rag_module, "connect_rag_service", connect)
+            monkeypatch.setattr(rag, "build_embeddings", build)
+
+            def run_concurrently(fn):
+                barrier = threading.Barrier(8)
+                results = []
+
+                def target():
+                    barrier.wait()
+                    results.append(fn())
+
+                threads = [threading.Thread(target=target) for _ in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                return results
+
+            # 并发的首次查询共用一次连接，且都等待连接完成
+            services = run_concurrently(rag._get_rag_service)
+            assert len(connects) == 1
+            assert all(isinstance(service, FailingService) for service in services)
+
+            # 服务失效后只重建一次本地向量索引
+            run_concurrently(lambda: rag.semantic_search("handle request", top_k=1, min_score=0.0))
+            assert len(builds) == 1
+            assert rag._get_rag_service() is None
+
+
+class TestSortedBatchEncoding:
+    """测试按长度排序的分批编码"""
+
+    def test_batches_are_length_sorted_and_order_restored(self):
+        class RecordingModel(FakeEmbeddingModel):
+            def __init__(self):
+                super().__init__(16)
+                self.batches = []
+
+            def encode(self, texts, **kwargs):
+                self.batches.append([len(text) for text in texts])
+                return super().encode(texts)
+
+        texts = ["x" * n + " load config" for n in (5, 300, 1, 80, 40, 200, 3)]
+        model = RecordingModel()
+        progress = []
+        embeddings = encode_sorted_batches(model, texts, batch_size=3,
+                                           progress_callback=lambda done, total: progress.append((done, total)))
+
+        np.testing.assert_allclose(embeddings, FakeEmbeddingModel(16).encode(texts))
+        lengths = [length for batch in model.batches for length in batch]
+        assert lengths == sorted(lengths, reverse=True)
+        assert [len(batch) for batch in model.batches] == [3, 3, 1]
+        assert progress == [(3, 7), (6, 7), (7, 7)]
+
+
+class TestEmbeddingDedup:
+    """测试重复嵌入文本的合并"""
+
+    def test_group_exact_and_near_duplicates(self):
+        base = " ".join(f"token{i}" for i in range(60))
+        texts = [base, "def  other():\n    pass", base.replace("  ", " "), base + " token_extra", "def other(): pass"]
+
+        assert group_duplicate_texts(texts) == [[0, 2], [1, 4], [3]]
+        assert group_duplicate_texts(texts, near_duplicate_threshold=0.8) == [[0, 2, 3], [1, 4]]
+
+    def test_duplicate_blocks_share_one_vector(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            vendored = project_dir / "vendored"
+            vendored.mkdir()
+            (vendored / "http_server.py").write_text(SAMPLE_FILES["http_server.py"], encoding="utf-8")
+
+            rag = _make_rag(project_dir, Path(temp_dir) / "cache")
+            rag.extract_code_blocks()
+            assert rag.build_embeddings()
+
+            assert len(rag.embeddings) < len(rag.code_blocks)
+            assert set(rag.id_to_index) == set(rag.code_blocks)
+            results = rag.semantic_search("handle request route", top_k=10, min_score=0.0)
+            handlers = [block for block, _ in results if block.name == "HTTPServer.handle_request"]
+            assert len({block.file_path for block in handlers}) == 2
+
+
+class TestHashingEmbedding:
+    """测试内置哈希嵌入后端"""
+
+    CORPUS = [
+        "def load_config_file(path): read configuration from json file",
+        "class HTTPServer: handle incoming http requests and route them",
+        "def parse_json_data(text): parse json text into objects",
+        "def render_template(name): render html template with context",
+    ]
+
+    @pytest.mark.parametrize("reduction", ["projection", "svd"])
+    def test_query_matches_related_text(self, reduction):
+        model = HashingEmbeddingModel(dimension=64, reduction=reduction)
+        # 拟合必须显式进行，未拟合时编码不会在查询文本上隐式拟合
+        with pytest.raises(RuntimeError, match="model is not fitted"):
+            model.encode(["loadConfig json configuration"])
+        documents = model.fit_transform(self.CORPUS)
+        query = model.encode(["loadConfig json configuration"])
+
+        assert documents.shape == (4, 64)
+        scores = (query @ documents.T)[0]
+        assert int(np.argmax(scores)) == 0
+
+    def test_save_and_load_preserve_vectors(self, tmp_path):
+        model = HashingEmbeddingModel(dimension=32, reduction="svd")
+        model.fit(self.CORPUS)
+        model.save(tmp_path / "state.npz")
+
+        loaded = HashingEmbeddingModel.load(tmp_path / "state.npz")
+        assert loaded.name == model.name
+        np.testing.assert_allclose(loaded.encode(self.CORPUS), model.encode(self.CORPUS), rtol=1e-5, atol=1e-6)
+
+    def test_code_rag_hashing_backend(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            cache_dir = Path(temp_dir) / "cache"
+
+            rag = CodeRAG(str(project_dir), cache_dir=str(cache_dir), model_name="hashing-tfidf:512:projection")
+            rag.extract_code_blocks()
+            assert rag.build_embeddings()
+            assert rag.semantic_search("load config file", top_k=1, min_score=0.0)[0][0].name == "load_config_file"
+
+            # 重新加载时恢复拟合状态并直接使用嵌入缓存
+            reloaded = CodeRAG(str(project_dir), cache_dir=str(cache_dir), model_name="hashing-tfidf:512:projection")
+            reloaded.extract_code_blocks()
+            assert reloaded.build_embeddings()
+            assert isinstance(reloaded.embeddings, np.memmap)
+            assert reloaded.semantic_search("load config file", top_k=1, min_score=0.0)[0][0].name == "load_config_file"
+
+    def test_rebuild_discards_cached_query_vectors(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            rag = CodeRAG(str(project_dir), cache_dir=str(Path(temp_dir) / "cache"),
+                          model_name="hashing-tfidf:512:projection")
+            rag.extract_code_blocks()
+            assert rag.build_embeddings()
+            rag.semantic_search("load config file", top_k=1, min_score=0.0)
+
+            # 重新拟合后查询向量必须在新的向量空间中计算
+            (project_dir / "extra.py").write_text("def render_page(template):\n    return template\n", encoding="utf-8")
+            rag.extract_code_blocks()
+            assert rag.build_embeddings(force_rebuild=True)
+            rag.semantic_search("load config file", top_k=1, min_score=0.0)
+            cached = rag.query_engine._embedding_cache["load config file"]
+            np.testing.assert_allclose(cached, rag.embedding_model.encode(["load config file"])[0], rtol=1e-5)
+
+
+class FakeEmbeddingAPI:
+    """模拟 OpenAI 兼容 /embeddings 接口的本地HTTP服务"""
+
+    def __init__(self):
+        import json
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.requests = []
+        self.rate_limit_once = False
+        self.fail_texts = set()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                api.requests.append(payload["input"])
+                if api.rate_limit_once:
+                    api.rate_limit_once = False
+                    self.send_response(429)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+                if api.fail_texts & set(payload["input"]):
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                data = [{"index": i, "embedding": [float(len(text)), 1.0]} for i, text in enumerate(payload["input"])]
+                body = json.dumps({"data": list(reversed(data))}).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestWebEmbeddingClient:
+    """测试并发、按token分批的web嵌入客户端"""
+
+    TEXTS = ["a" * (4 * n) for n in range(1, 21)]
+
+    def test_token_budget_batches_and_order(self):
+        api = FakeEmbeddingAPI()
+        try:
+            client = WebEmbeddingClient("key", api.base_url, "model", max_concurrency=4, max_batch_tokens=30)
+            batches = client.make_batches(self.TEXTS)
+            assert len(batches) > 1
+            assert [i for batch in batches for i in batch] == list(range(len(self.TEXTS)))
+
+            api.rate_limit_once = True
+            embeddings = client.embed(self.TEXTS, resume=False)
+            assert embeddings[:, 0].tolist() == [float(len(text)) for text in self.TEXTS]
+            assert len(api.requests) == len(batches) + 1
+        finally:
+            api.close()
+
+    def test_failed_batch_resumes_from_checkpoint(self, tmp_path):
+        api = FakeEmbeddingAPI()
+        try:
+            client = WebEmbeddingClient("key", api.base_url, "model", max_batch_tokens=30,
+                                        max_retries=0, checkpoint_dir=tmp_path)
+            num_batches = len(client.make_batches(self.TEXTS))
+
+            api.fail_texts = {self.TEXTS[-1]}
+            with pytest.raises(Exception):
+                client.embed(self.TEXTS)
+            assert len(api.requests) == num_batches
+
+            # 重跑时只请求失败的批次
+            api.fail_texts = set()
+            api.requests.clear()
+            embeddings = client.embed(self.TEXTS)
+            assert len(api.requests) == 1
+            assert embeddings.shape == (len(self.TEXTS), 2)
+            assert not list(tmp_path.glob("*.npy"))
+        finally:
+            api.close()
+
+
+class TestVectorIndex:
+    """测试向量索引策略"""
+
+    def test_choose_index_strategy(self):
+        assert choose_index_strategy(100) == 'flat'
+        assert choose_index_strategy(50000) == 'hnsw'
+        assert choose_index_strategy(500000) == 'ivf'
+        assert choose_index_strategy(100, 'hnsw') == 'hnsw'
+
+    def test_numpy_top_k_matches_full_sort(self):
+        rng = np.random.default_rng(0)
+        similarities = rng.standard_normal((3, 50))
+        scores, indices = numpy_top_k(similarities, 5)
+        expected = np.argsort(-similarities, axis=1)[:, :5]
+        assert np.array_equal(indices, expected)
+        assert np.allclose(scores, np.take_along_axis(similarities, expected, axis=1))
+
+        # top_k 大于候选数时返回全部结果
+        scores, indices = numpy_top_k(np.array([[0.1, 0.5, 0.3]]), 10)
+        assert indices.tolist() == [[1, 2, 0]]
+
+    def test_benchmark_reports_exact_recall_for_flat(self):
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((200, 16)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        results = benchmark_index_strategies(embeddings, embeddings[:10], top_k=5, strategies=['flat'])
+        by_strategy = {row['strategy']: row for row in results}
+        assert by_strategy['numpy']['recall'] == 1.0
+        if 'flat' in by_strategy:
+            assert by_strategy['flat']['recall'] == pytest.approx(1.0)
+
+
+class TestEmbeddingCache:
+    """测试mmap版本化的嵌入缓存"""
+
+    def test_embeddings_are_memory_mapped_from_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            cache_dir = Path(temp_dir) / "cache"
+
+            rag = _make_rag(project_dir, cache_dir)
+            rag.extract_code_blocks(force_refresh=True)
+            assert rag.build_embeddings(force_rebuild=True)
+            expected = rag.semantic_search("handle request", top_k=2, min_score=0.0)
+
+            rag2 = _make_rag(project_dir, cache_dir)
+            rag2.extract_code_blocks()
+            assert rag2.build_embeddings()
+            assert isinstance(rag2.embeddings, np.memmap)
+            assert rag2.embedding_model.encode_calls == 0
+
+            results = rag2.semantic_search("handle request", top_k=2, min_score=0.0)
+            assert [b.id for b, _ in results] == [b.id for b, _ in expected]
+
+    def test_model_change_invalidates_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            cache_dir = Path(temp_dir) / "cache"
+
+            rag = _make_rag(project_dir, cache_dir)
+            rag.extract_code_blocks(force_refresh=True)
+            assert rag.build_embeddings(force_rebuild=True)
+
+            rag2 = _make_rag(project_dir, cache_dir, model_name="other-model", dimension=16)
+            rag2.extract_code_blocks()
+            assert rag2.build_embeddings()
+            assert rag2.embedding_model.encode_calls == 1
+            assert rag2.embeddings.shape[1] == 16
+
+    def test_float16_storage(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = _make_project(temp_dir)
+            cache_dir = Path(temp_dir) / "cache"
+
+            rag = _make_rag(project_dir, cache_dir)
+            rag.rag_config['embedding_dtype'] = 'float16'
+            rag.extract_code_blocks(force_refresh=True)
+            assert rag.build_embeddings(force_rebuild=True)
+
+            rag2 = _make_rag(project_dir, cache_dir)
+            rag2.extract_code_blocks()
+            assert rag2.build_embeddings()
+            assert rag2.embeddings.dtype == np.float16
+            assert rag2.semantic_search("json config", top_k=1, min_score=0.0)
@@ -0,0 +1,89 @@
+# tests/test_dependency_manifests.py
+# 测试README和网站生成共用的依赖清单引擎
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import readmex.utils.dependency_manifests as manifests_module
+from readmex.utils.dependency_analyzer import DependencyAnalyzer
+from readmex.utils.dependency_manifests import DependencyManifestEngine
+from readmex.website_core import WebsiteGenerator
+
+
+def _write_project(project_dir: Path):
+    (project_dir / "requirements.txt").write_text("requests>=2.0\n# comment\nrich[jupyter]==13.0\n", encoding="utf-8")
+    (project_dir / "package.json").write_text(json.dumps({"dependencies": {"react": "^18.0.0"}}), encoding="utf-8")
+    (project_dir / "package-lock.json").write_text(json.dumps({"packages": {
+        "": {}, "node_modules/react": {}, "node_modules/loose-envify": {}
+    }}), encoding="utf-8")
+    (project_dir / "go.mod").write_text("module demo\n\nrequire (\n\tgithub.com/pkg/errors v0.9.1\n)\n", encoding="utf-8")
+    (project_dir / "App.csproj").write_text("<Project />\n", encoding="utf-8")
+
+
+class TestDependencyManifestEngine:
+    """一次扫描、按内容哈希缓存和两条生成路径的共用"""
+
+    def test_parse_and_content_hash_cache(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as tmp:
+            project_dir = Path(tmp)
+            _write_project(project_dir)
+            cache_file = project_dir / "out" / ".dependency_cache.json"
+            monkeypatch.setattr(manifests_module, "_parsed_cache", {})
+
+            engine = DependencyManifestEngine(project_dir, cache_file)
+            assert engine.find("*.csproj") == ["App.csproj"]
+            result = engine.parse(["requirements.txt", "package-lock.json", "go.mod", "Pipfile"])
+            assert set(result) == {"requirements.txt", "package-lock.json", "go.mod"}
+            assert result["requirements.txt"].dependencies == ["requests", "rich"]
+            assert result["package-lock.json"].dependencies == ["react", "loose-envify"]
+            assert result["go.mod"].dependencies == ["github.com/pkg/errors"]
+
+            # 新进程（清空进程内缓存）从持久化文件恢复，内容未变化的清单不再解析
+            monkeypatch.setattr(manifests_module, "_parsed_cache", {})
+            calls = []
+            original = manifests_module.MANIFEST_PARSERS["requirements.txt"]
+            monkeypatch.setitem(manifests_module.MANIFEST_PARSERS, "requirements.txt",
+                                lambda content: calls.append(content) or original(content))
+            engine = DependencyManifestEngine(project_dir, cache_file)
+            assert engine.get("requirements.txt").dependencies == ["requests", "rich"]
+            assert calls == []
+
+            # 内容变化后重新解析
+            (project_dir / "requirements.txt").write_text("flask\n", encoding="utf-8")
+            engine = DependencyManifestEngine(project_dir, cache_file)
+            assert engine.get("requirements.txt").dependencies == ["flask"]
+            assert len(calls) == 1
+
+    def test_parse_errors_are_reported(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            project_dir = Path(tmp)
+            (project_dir / "package.json").write_text("{not json", encoding="utf-8")
+            manifest = DependencyManifestEngine(project_dir).get("package.json")
+            assert manifest.dependencies == [] and manifest.error
+
+    def test_shared_by_readme_and_website(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            project_dir = Path(tmp)
+            _write_project(project_dir)
+
+            # README路径：锁文件以包名摘要代替完整内容
+            analyzer = DependencyAnalyzer(str(project_dir), primary_language="javascript")
+            existing = analyzer.get_existing_requirements()
+            assert "=== package.json ===" in existing
+            assert "=== package-lock.json (2 locked packages) ===\nloose-envify\nreact" in existing
+
+            # 支持通配符形式的清单
+            analyzer.set_language("csharp")
+            assert "=== App.csproj ===" in analyzer.get_existing_requirements()
+
+            generator = WebsiteGenerator(str(project_dir), model_client=None, enable_rag=False)
+            dependencies = generator._get_dependencies()
+            assert dependencies['python'] == ["requests", "rich"]
+            # 只使用第一个找到的Node.js清单
+            assert dependencies['npm'] == ["react"]
+            assert "github.com/pkg/errors" in dependencies['other']
@@ -0,0 +1,199 @@
+# tests/test_git_history.py
+# 测试批量Git历史读取
+
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import readmex.utils.git_history as git_history
+from readmex.utils.git_history import GitHistoryReader, parse_git_log_stream, read_refs
+from readmex.utils.git_repo import GitRepository, get_remote_url
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+
+
+def _git(repo: Path, *args, author: str = "Alice", email: str = "alice@example.com", date: str = "2024-01-02"):
+    env = {
+        'GIT_AUTHOR_NAME': author, 'GIT_AUTHOR_EMAIL': email,
+        'GIT_COMMITTER_NAME': author, 'GIT_COMMITTER_EMAIL': email,
+        'GIT_AUTHOR_DATE': f'{date}T00:00:00', 'GIT_COMMITTER_DATE': f'{date}T00:00:00',
+        'HOME': str(repo), 'PATH': '/usr/bin:/bin:/usr/local/bin',
+    }
+    subprocess.run(['git', *args], cwd=repo, env=env, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        repo = Path(temp_dir)
+        _git(repo, 'init', '-q')
+        (repo / 'a.py').write_text("x = 1\ny = 2\n")
+        (repo / 'logo.bin').write_bytes(b'\x00\x01\x02')
+        _git(repo, 'add', '.')
+        _git(repo, 'commit', '-q', '-m', 'feat: initial')
+        _git(repo, 'tag', 'v1.0')
+
+        _git(repo, 'mv', 'a.py', 'b.py')
+        (repo / 'b.py').write_text("x = 1\ny = 2\nz = 3\n")
+        _git(repo, 'add', '.')
+        _git(repo, 'commit', '-q', '-m', 'refactor: rename module', author="Bob", email="bob@example.com",
+             date="2024-01-03")
+
+        (repo / 'c.py').write_text("w = 0\n")
+        _git(repo, 'add', '.')
+        _git(repo, 'commit', '-q', '-m', 'fix: add c', author="Bob", email="bob@example.com", date="2024-01-04")
+        yield repo
+
+
+class TestGitHistoryReader:
+    """一次 git log 调用解析提交、numstat、重命名、二进制文件和标签"""
+
+    def test_recent_commits(self, repo):
+        commits = GitHistoryReader(repo).recent_commits(limit=10)
+        assert [c.subject for c in commits] == ['fix: add c', 'refactor: rename module', 'feat: initial']
+
+        renamed = commits[1].files
+        assert len(renamed) == 1
+        assert renamed[0].path == 'b.py' and renamed[0].old_path == 'a.py'
+        assert renamed[0].insertions == 1
+
+        initial = {change.path: change for change in commits[2].files}
+        assert initial['a.py'].insertions == 2
+        assert initial['logo.bin'].insertions is None
+        assert commits[2].tags == ['v1.0']
+
+        assert len(GitHistoryReader(repo).recent_commits(limit=1)) == 1
+
+    def test_contributors_and_tags(self, repo):
+        reader = GitHistoryReader(repo)
+        assert reader.contributors() == [
+            {'name': 'Bob', 'email': 'bob@example.com', 'commits': 2},
+            {'name': 'Alice', 'email': 'alice@example.com', 'commits': 1},
+        ]
+        assert reader.tags() == [{'name': 'v1.0', 'date': '2024-01-02', 'message': 'feat: initial'}]
+
+    def test_stream_split_across_chunks(self):
+        data = (b'\x1eabc\x1fA\x1fa@x\x1f2024-01-01\x1f\x1fmsg\0\n1\t2\tf.py\0'
+                b'0\t0\t\0old.py\0new.py\0\x1edef\x1fB\x1fb@x\x1f2024-01-02\x1ftag: v2\x1fsecond\0')
+        chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+        commits = list(parse_git_log_stream(chunks))
+        assert [c.hash for c in commits] == ['abc', 'def']
+        assert [(f.path, f.old_path) for f in commits[0].files] == [('f.py', None), ('new.py', 'old.py')]
+        assert commits[1].tags == ['v2']
+
+    def test_cache_appends_new_commits(self, repo, monkeypatch):
+        cache_file = repo / '.git_metadata.json'
+        assert GitHistoryReader(repo, cache_file).contributors()[0]['commits'] == 2
+        assert cache_file.exists()
+
+        (repo / 'd.py').write_text("v = 1\n")
+        _git(repo, 'add', '.')
+        _git(repo, 'commit', '-q', '-m', 'feat: add d', author="Alice", email="alice@new.example.com",
+             date="2024-01-05")
+
+        # HEAD 快进且标签未变化时不完整重新读取
+        def fail_scan(self, refs):
+            raise AssertionError("full scan")
+
+        monkeypatch.setattr(GitHistoryReader, '_scan', fail_scan)
+        reader = GitHistoryReader(repo, cache_file)
+        assert [c.subject for c in reader.recent_commits(limit=2)] == ['feat: add d', 'fix: add c']
+        assert reader.contributors() == [
+            {'name': 'Alice', 'email': 'alice@new.example.com', 'commits': 2},
+            {'name': 'Bob', 'email': 'bob@example.com', 'commits': 2},
+        ]
+        monkeypatch.undo()
+
+        # 新增标签时完整读取
+        _git(repo, 'tag', 'v2.0')
+        tags = GitHistoryReader(repo, cache_file).tags()
+        assert [tag['name'] for tag in tags] == ['v2.0', 'v1.0']
+
+
+class TestNativeGitRepository:
+    """直接读取 .git 目录的结果与git命令一致"""
+
+    def test_refs_tags_and_commits_from_packs(self, repo):
+        _git(repo, 'tag', '-a', 'v1.1', '-m', 'annotated', 'HEAD~1')
+        _git(repo, 'remote', 'add', 'origin', 'git@github.com:someone/demo.git')
+        _git(repo, 'gc', '-q')
+        # gc 之后再产生一个 loose 提交
+        (repo / 'e.py').write_text("e = 1\n")
+        _git(repo, 'add', '.')
+        _git(repo, 'commit', '-q', '-m', 'chore: loose commit', date="2024-01-05")
+
+        native = GitRepository.discover(repo / 'logo.bin')
+        show_ref = subprocess.run(['git', 'show-ref', '--head'], cwd=repo, capture_output=True, text=True)
+        expected_refs = {name: sha for sha, name in (line.split(' ', 1) for line in show_ref.stdout.splitlines())}
+        assert native.refs() == expected_refs
+        assert read_refs(repo) == expected_refs
+
+        log = subprocess.run(['git', 'log', '--format=%H|%an|%ae|%ad|%s', '--date=short'],
+                             cwd=repo, capture_output=True, text=True).stdout.splitlines()
+        commits = list(native.iter_commits([native.head()]))
+        assert ['|'.join([c.sha, c.author, c.email, c.date, c.subject]) for c in commits] == log
+
+        tags = native.tags()
+        assert tags['v1.1'] == commits[2].sha and tags['v1.0'] == commits[3].sha
+        assert get_remote_url(repo) == 'git@github.com:someone/demo.git'
+
+    def test_annotated_tags_use_their_own_date_and_message(self, repo, monkeypatch):
+        _git(repo, 'tag', '-a', 'v2.0', '-m', 'Release 2.0', '-m', 'Details', 'HEAD~1', date="2024-02-01")
+        expected = [
+            {'name': 'v2.0', 'date': '2024-02-01', 'message': 'Release 2.0'},
+            {'name': 'v1.0', 'date': '2024-01-02', 'message': 'feat: initial'},
+        ]
+        for_each_ref = subprocess.run(
+            ['git', 'for-each-ref', '--sort=-creatordate', '--format=%(refname:short)|%(creatordate:short)|%(subject)',
+             'refs/tags'], cwd=repo, capture_output=True, text=True).stdout.splitlines()
+        assert ['|'.join(tag.values()) for tag in expected] == for_each_ref
+
+        assert GitHistoryReader(repo).tags() == expected
+        assert GitRepository.discover(repo).tag_details() == expected
+
+    def test_reader_without_git_binary(self, repo, monkeypatch):
+        def missing_git(*args, **kwargs):
+            raise FileNotFoundError('git')
+
+        cache_file = repo / '.git_metadata.json'
+        monkeypatch.setattr(git_history, 'iter_git_log', missing_git)
+        reader = GitHistoryReader(repo, cache_file)
+        assert [c.subject for c in reader.recent_commits(limit=2)] == ['fix: add c', 'refactor: rename module']
+        assert reader.contributors()[0] == {'name': 'Bob', 'email': 'bob@example.com', 'commits': 2}
+        assert reader.tags() == [{'name': 'v1.0', 'date': '2024-01-02', 'message': 'feat: initial'}]
+        assert reader.recent_commits(limit=1)[0].files == []
+
+        # 仍未安装git时直接使用缓存
+        monkeypatch.setattr(GitHistoryReader, '_scan_native', lambda self, refs: pytest.fail("native rescan"))
+        assert GitHistoryReader(repo, cache_file).recent_commits(limit=1)[0].subject == 'fix: add c'
+        monkeypatch.undo()
+
+        # 安装git后不使用不含文件变更统计的缓存
+        files = GitHistoryReader(repo, cache_file).recent_commits(limit=1)[0].files
+        assert [change.path for change in files] == ['c.py']
+
+    def test_remote_url_respects_global_config(self, repo, monkeypatch):
+        _git(repo, 'remote', 'add', 'origin', 'gh:someone/demo.git')
+        home = repo / 'home'
+        home.mkdir()
+        monkeypatch.setenv('HOME', str(home))
+        monkeypatch.setenv('GIT_CONFIG_NOSYSTEM', '1')
+        monkeypatch.delenv('XDG_CONFIG_HOME', raising=False)
+        monkeypatch.delenv('GIT_CONFIG_GLOBAL', raising=False)
+        native = GitRepository.discover(repo)
+        assert native.remote_url() == 'gh:someone/demo.git'
+
+        # 全局配置通过 include.path 引入的 url.insteadOf 改写交给git命令处理
+        (home / '.gitconfig').write_text("[include]\n\tpath = ~/rewrites.gitconfig\n", encoding='utf-8')
+        (home / 'rewrites.gitconfig').write_text(
+            '[url "git@github.com:"]\n\tinsteadOf = gh:\n', encoding='utf-8')
+        with pytest.raises(ValueError):
+            native.remote_url()
+        assert get_remote_url(repo) == 'git@github.com:someone/demo.git'
@@ -0,0 +1,90 @@
+# tests/test_image_assets.py
+# 测试带缓存的图片资源处理流水线
+
+import sys
+import tempfile
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from PIL import Image
+
+from readmex.utils.image_assets import ImageAssetPipeline
+
+
+class TestImageAssetPipeline:
+    """缩放、跳过未变化的图片、WebP输出和非位图直接复制"""
+
+    def _setup(self, root: Path):
+        images = root / "images"
+        images.mkdir()
+        Image.new("RGB", (400, 200), (200, 30, 30)).save(images / "logo.png")
+        (images / "diagram.svg").write_text("<svg xmlns='http://www.w3.org/2000/svg'/>", encoding="utf-8")
+        dest_dir = root / "assets"
+        return [
+            (images / "logo.png", dest_dir / "logo.png", 100),
+            (images / "diagram.svg", dest_dir / "diagram.svg", 300),
+        ]
+
+    def test_resize_and_skip_unchanged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            jobs = self._setup(root)
+            manifest = root / ".asset_manifest.json"
+
+            results, skipped = ImageAssetPipeline(manifest).process(jobs)
+            assert skipped == []
+            logo = next(result for result in results if result['dest'].endswith("logo.png"))
+            assert logo['resized'] == [400, 200, 200, 100]
+            with Image.open(root / "assets" / "logo.png") as img:
+                assert img.size == (200, 100)
+            assert (root / "assets" / "diagram.svg").read_text(encoding="utf-8").startswith("<svg")
+
+            # 新实例从清单恢复，源文件未变化时全部跳过
+            results, skipped = ImageAssetPipeline(manifest).process(jobs)
+            assert results == []
+            assert len(skipped) == 2
+
+            # 输出被删除或目标尺寸变化时重新处理
+            (root / "assets" / "logo.png").unlink()
+            results, skipped = ImageAssetPipeline(manifest).process(jobs)
+            assert [Path(result['dest']).name for result in results] == ["logo.png"]
+
+    def test_webp_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            jobs = self._setup(root)
+            manifest = root / ".asset_manifest.json"
+            ImageAssetPipeline(manifest).process(jobs)
+
+            # 启用WebP后之前的结果不再有效
+            results, skipped = ImageAssetPipeline(manifest, webp=True).process(jobs)
+            assert [Path(result['dest']).name for result in results] == ["logo.png"]
+            with Image.open(root / "assets" / "logo.webp") as img:
+                assert img.size == (200, 100)
+            # SVG不输出WebP
+            assert not (root / "assets" / "diagram.webp").exists()
+
+    def test_failed_images_are_reported_and_not_recorded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            jobs = self._setup(root)
+            manifest = root / ".asset_manifest.json"
+            (root / "images" / "broken.png").write_bytes(b"not a png")
+            jobs += [
+                (root / "images" / "broken.png", root / "assets" / "broken.png", 300),
+                (root / "images" / "missing.png", root / "assets" / "missing.png", 300),
+            ]
+
+            results, skipped = ImageAssetPipeline(manifest).process(jobs)
+            by_name = {Path(result['dest']).name: result for result in results}
+            # 源文件不存在时只报告该图片，不影响其他图片
+            assert by_name["missing.png"]['outputs'] == [] and by_name["missing.png"]['error']
+            assert by_name["logo.png"]['error'] is None
+            # 无法解码的图片直接复制，但不记录为已处理
+            assert by_name["broken.png"]['error'] and (root / "assets" / "broken.png").exists()
+
+            results, skipped = ImageAssetPipeline(manifest).process(jobs)
+            assert sorted(Path(result['dest']).name for result in results) == ["broken.png", "missing.png"]
+            assert len(skipped) == 2
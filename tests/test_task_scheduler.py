@@ -0,0 +1,101 @@
+# tests/test_task_scheduler.py
+# 测试全局优先级任务调度器
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from readmex.utils.task_scheduler import TaskScheduler
+
+
+class RecordingListener:
+    def __init__(self):
+        self.events = []
+
+    def task_submitted(self, task):
+        self.events.append(('submitted', task.name))
+
+    def task_started(self, task):
+        self.events.append(('started', task.name))
+
+    def task_finished(self, task):
+        self.events.append(('finished', task.name))
+
+
+class TestTaskScheduler:
+    """优先级、全局并发上限、嵌套等待和进度回调"""
+
+    def test_priority_order(self):
+        order = []
+        gate = threading.Event()
+        with TaskScheduler(1) as scheduler:
+            # 第一个任务占住唯一的工作线程，其余任务按优先级排队
+            scheduler.submit('blocker', gate.wait, priority=1000)
+            for name, priority in [('low', 1), ('high', 50), ('mid', 10)]:
+                scheduler.submit(name, order.append, name, priority=priority)
+            gate.set()
+        assert order == ['high', 'mid', 'low']
+
+    def test_nested_wait_with_single_worker(self):
+        with TaskScheduler(1) as scheduler:
+            def parent():
+                # 子任务继承父任务的优先级；唯一的工作线程在等待时自己执行子任务
+                return sum(scheduler.map('child', lambda x: x * x, range(5)))
+
+            assert scheduler.submit('parent', parent).result() == 30
+
+    def test_global_concurrency_limit(self):
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work(_):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        with TaskScheduler(3) as scheduler:
+            outer = [scheduler.submit(f"outer{i}", scheduler.map, 'inner', work, range(6)) for i in range(4)]
+            for task in outer:
+                task.result()
+        assert peak[0] <= 3
+
+    def test_errors_and_progress_events(self):
+        listener = RecordingListener()
+
+        def fail():
+            raise ValueError("boom")
+
+        with TaskScheduler(2, listener=listener) as scheduler:
+            task = scheduler.submit('fail', fail)
+            try:
+                task.result()
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+        assert listener.events == [('submitted', 'fail'), ('started', 'fail'), ('finished', 'fail')]
+
+    def test_wait_does_not_run_unrelated_tasks(self):
+        order = []
+        child_queued, unrelated_queued = threading.Event(), threading.Event()
+
+        with TaskScheduler(1) as scheduler:
+            def parent():
+                child = scheduler.submit('child', order.append, 'child', priority=1)
+                child_queued.set()
+                unrelated_queued.wait()
+                # 队列中优先级更高的无关任务不应在等待子任务期间被执行
+                scheduler.wait([child])
+                order.append('parent')
+
+            scheduler.submit('parent', parent)
+            child_queued.wait()
+            scheduler.submit('unrelated', order.append, 'unrelated', priority=100)
+            unrelated_queued.set()
+        assert order == ['child', 'parent', 'unrelated']
@@ -0,0 +1,145 @@
+# tests/test_website_incremental.py
+# 测试网站页面的增量生成
+
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from readmex.website_core import APIDocumentationGenerator, WebsiteGenerator
+
+
+class CountingModelClient:
+    """记录调用次数的模型客户端"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_text(self, prompt):
+        self.calls += 1
+        return f"# Page {self.calls}\n\ngenerated content\n"
+
+
+def _make_generator(project_dir: Path, model_client) -> WebsiteGenerator:
+    generator = WebsiteGenerator(str(project_dir), model_client=model_client, enable_rag=False)
+    generator._create_directory_structure()
+    return generator
+
+
+def _api(definition: str) -> dict:
+    return {
+        'name': 'load_config',
+        'module': 'config',
+        'definition': definition,
+        'context': definition,
+        'metadata': {'args': ['path']},
+    }
+
+
+class TestIncrementalWebsite:
+    """页面输入未变化时不调用模型、不重写文件"""
+
+    def test_unchanged_pages_are_skipped(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = Path(temp_dir) / "project"
+            project_dir.mkdir()
+            analysis = {'structure': 'project/\n  config.py', 'dependencies': {'python': ['rich']},
+                        'entry_points': [], 'git_info': {}}
+
+            model = CountingModelClient()
+            generator = _make_generator(project_dir, model)
+            generator._generate_llm_page('installation', 'installation.md', analysis)
+            generator._generate_single_api_page(_api("def load_config(path):"))
+            generator.page_manifest.save()
+            assert model.calls == 2
+
+            page = generator.docs_dir / "installation.md"
+            mtime = page.stat().st_mtime_ns
+
+            # 重新运行：输入未变化的页面被跳过
+            model = CountingModelClient()
+            generator = _make_generator(project_dir, model)
+            assert not generator._generate_llm_page('installation', 'installation.md', analysis)
+            generator._generate_single_api_page(_api("def load_config(path):"))
+            assert model.calls == 0
+            assert page.stat().st_mtime_ns == mtime
+
+            # API定义变化时只重新生成该页面
+            generator._generate_single_api_page(_api("def load_config(path, strict=False):"))
+            assert model.calls == 1
+
+            # 关闭增量模式时全部重新生成
+            generator = _make_generator(project_dir, model)
+            generator.incremental = False
+            generator._generate_llm_page('installation', 'installation.md', analysis)
+            assert model.calls == 2
+
+    def test_removed_api_pages_are_pruned(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = Path(temp_dir) / "project"
+            project_dir.mkdir()
+
+            generator = _make_generator(project_dir, CountingModelClient())
+            generator._generate_single_api_page(_api("def load_config(path):"))
+            generator.page_manifest.save()
+            stale_page = generator.docs_dir / "api" / "config" / "load_config.md"
+            assert stale_page.exists()
+
+            generator = _make_generator(project_dir, CountingModelClient())
+            generator._generate_api_documentation({'functions': [], 'classes': []})
+            assert not stale_page.exists()
+
+
+class BatchModelClient:
+    """按批量prompt中的编号返回文档，省略最后一个条目以触发单独重试"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_text(self, prompt):
+        self.prompts.append(prompt)
+        indexes = [int(n) for n in re.findall(r'^### API (\d+):', prompt, re.MULTILINE)]
+        if not indexes:
+            return "# single page\n"
+        return "\n".join(f"<!-- API: {i} -->\n# batched {i}\n<!-- END API: {i} -->" for i in indexes[:-1])
+
+
+class TestBatchedAPIDocumentation:
+    """同一模块的API一次请求生成，缺失的条目单独重试"""
+
+    def test_module_batch_with_retry(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_dir = Path(temp_dir) / "project"
+            project_dir.mkdir()
+
+            model = BatchModelClient()
+            generator = _make_generator(project_dir, model)
+            apis = [dict(_api(f"def load_{i}(path):"), name=f"load_{i}") for i in range(3)]
+            apis.append(dict(_api("def other(path):"), name='other', module='other'))
+            generator._generate_individual_api_pages(apis)
+
+            # config 模块一次批量请求 + 最后一个条目的重试；other 模块只有一个API，单独请求
+            assert len(model.prompts) == 3
+            api_dir = generator.docs_dir / "api"
+            assert (api_dir / "config" / "load_0.md").read_text(encoding='utf-8') == "# batched 1\n"
+            assert (api_dir / "config" / "load_1.md").read_text(encoding='utf-8') == "# batched 2\n"
+            assert (api_dir / "config" / "load_2.md").read_text(encoding='utf-8') == "# single page\n"
+            assert (api_dir / "other" / "other.md").exists()
+
+            # 输入未变化时不再请求
+            generator.page_manifest.save()
+            model = BatchModelClient()
+            generator = _make_generator(project_dir, model)
+            generator._generate_individual_api_pages(apis)
+            assert model.prompts == []
+
+    def test_plan_batches_respects_limits(self):
+        api_generator = APIDocumentationGenerator(CountingModelClient())
+        apis = [dict(_api(f"def load_{i}(path):"), name=f"load_{i}") for i in range(5)]
+        batches = api_generator.plan_batches(apis, token_budget=10000, max_batch_size=2)
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        batches = api_generator.plan_batches(apis, token_budget=1, max_batch_size=10)
+        assert [len(batch) for batch in batches] == [1, 1, 1, 1, 1]